@@ -0,0 +1,270 @@
+"""
+Benchmark suite for code rendering, persistence and list loading.
+
+Runs headless in a scratch directory against SQLite (default) or a MySQL
+server, for each requested dataset size, and reports throughput, p50/p95
+latency and peak RSS. Results are saved as JSON; pass an earlier result file
+to --compare to see the change between runs.
+
+    python benchmark.py --sizes 100 1000 --output bench.json
+    python benchmark.py --sizes 100 1000 --compare bench.json
+    python benchmark.py --backend mysql --config config.ini
+"""
+import argparse
+import configparser
+import datetime
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MYSQL_BENCH_DATABASE = 'code_manager_benchmark'
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values)))) - 1
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its finished children (batch workers), in MB."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / scale, 1)
+
+
+def summarize(name, size, latencies, elapsed, operations=None):
+    latencies = sorted(latencies)
+    operations = operations if operations is not None else len(latencies)
+    return {
+        'name': name,
+        'size': size,
+        'operations': operations,
+        'seconds': round(elapsed, 4),
+        'throughput_per_s': round(operations / elapsed, 1) if elapsed > 0 else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def timed_calls(func, args_list):
+    """Calls func(*args) for each entry; returns (latencies, total elapsed, results)."""
+    latencies, results = [], []
+    started = time.perf_counter()
+    for args in args_list:
+        call_started = time.perf_counter()
+        results.append(func(*args))
+        latencies.append(time.perf_counter() - call_started)
+    return latencies, time.perf_counter() - started, results
+
+
+def run_size(db_utils, size, workers, page_loads):
+    """Runs every benchmark once for a dataset of `size` codes. Returns the result dicts."""
+    results = []
+    tag = f"n{size}"
+
+    # Single-code paths (each payload is new, so the render cache misses)
+    latencies, elapsed, _ = timed_calls(db_utils.generate_qr,
+                                        [(f"https://example.com/{tag}/qr/{i}", f"{tag}_qr_{i}") for i in range(size)])
+    results.append(summarize('generate_qr', size, latencies, elapsed))
+
+    latencies, elapsed, _ = timed_calls(db_utils.generate_barcode,
+                                        [(f"{tag}BAR{i:08d}", f"{tag}_bar_{i}") for i in range(size)])
+    results.append(summarize('generate_barcode', size, latencies, elapsed))
+
+    # Barcode renderers side by side, without the render cache or the database
+    for renderer in db_utils.BARCODE_RENDERERS:
+        latencies, elapsed, _ = timed_calls(db_utils.render_barcode, [
+            (f"{tag}{renderer[0].upper()}{i:08d}", f"{tag}_render_{renderer}_{i}", renderer) for i in range(size)])
+        results.append(summarize(f"render_barcode_{renderer}", size, latencies, elapsed))
+
+    # Output formats: codes/s and bytes on disk per code
+    for code_type, render in (('QR', db_utils.render_qr), ('BAR', db_utils.render_barcode)):
+        for output_format in db_utils.OUTPUT_FORMATS:
+            latencies, elapsed, paths = timed_calls(
+                lambda data, filename: render(data, filename, output_format=output_format),
+                [(f"{tag}-{output_format}-{i:08d}", f"{tag}_format_{output_format}_{i}") for i in range(size)])
+            result = summarize(f"render_{code_type.lower()}_{output_format}", size, latencies, elapsed)
+            result['bytes_per_code'] = round(sum(os.path.getsize(path) for path in paths) / max(len(paths), 1))
+            results.append(result)
+
+    meta_rows = [('QR', f"{tag}-meta-{i}", os.path.join(db_utils.CODES_DIR, f"{tag}_meta_{i}.png")) for i in range(size)]
+    latencies, elapsed, _ = timed_calls(db_utils.insert_code_metadata, meta_rows)
+    results.append(summarize('insert_code_metadata', size, latencies, elapsed))
+
+    # Batch generation is measured as a whole; latency is per rendered code
+    for lazy in (False, True):
+        name = 'generate_batch_codes_lazy' if lazy else 'generate_batch_codes'
+        marks = []
+        started = time.perf_counter()
+        generated, errors = db_utils.generate_batch_codes(
+            'QR', f"{tag}{'L' if lazy else 'B'}", 1, size, len(str(size)), workers=workers, lazy=lazy,
+            progress=lambda done: marks.append(time.perf_counter()))
+        elapsed = time.perf_counter() - started
+        latencies = [later - earlier for earlier, later in zip([started] + marks, marks)]
+        result = summarize(name, size, latencies, elapsed, operations=generated)
+        result['errors'] = len(errors)
+        results.append(result)
+
+    # Regenerate the single QR codes created above
+    records = db_utils.fetch_code_page('id', limit=size, filters={'data_contains': f"/{tag}/qr/"})[0]
+    latencies, elapsed, _ = timed_calls(db_utils.update_code_and_regenerate,
+                                        [(rec[0], rec[1], rec[2] + "?v=2", rec[4]) for rec in records])
+    results.append(summarize('update_code_and_regenerate', size, latencies, elapsed))
+
+    # The update_code_list path: the first page, scrolling through every page, and a search
+    def first_page(filters=None):
+        db_utils.fetch_code_page('date_created', limit=200, filters=filters)
+
+    def all_pages(filters=None):
+        rows, _, last_key = db_utils.fetch_code_page('date_created', limit=200, filters=filters)
+        while len(rows) == 200:
+            rows, _, last_key = db_utils.fetch_code_page('date_created', after=last_key, limit=200, filters=filters)
+
+    for name, func, filters in (('list_first_page', first_page, None),
+                                ('list_scroll_all_pages', all_pages, None),
+                                ('list_search_contains', first_page, {'data_contains': f"{tag}BAR0000"})):
+        latencies, elapsed, _ = timed_calls(func, [(filters,)] * page_loads)
+        results.append(summarize(name, size, latencies, elapsed))
+
+    return results
+
+
+def prepare_workdir(backend, config_path):
+    """Creates a scratch directory with a config.ini for the chosen backend and returns its path."""
+    workdir = tempfile.mkdtemp(prefix='code_manager_bench_')
+    config = configparser.ConfigParser()
+    if backend == 'mysql':
+        config.read(config_path)
+        if not config.has_section('mysql'):
+            raise SystemExit(f"No [mysql] section in {config_path}")
+    else:
+        config['mysql'] = {'host': 'localhost', 'user': 'root', 'password': ''}  # unused, but always loaded
+    config['mysql']['database'] = MYSQL_BENCH_DATABASE
+    config['storage'] = {'backend': backend, 'sqlite_path': 'benchmark.db'}
+    with open(os.path.join(workdir, 'config.ini'), 'w') as configfile:
+        config.write(configfile)
+    return workdir
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=False)
+        return result.stdout.strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def print_report(report, baseline=None):
+    previous = {(r['name'], r['size']): r for r in baseline['results']} if baseline else {}
+    header = f"{'benchmark':<28}{'size':>7}{'ops/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'rss MB':>9}{'bytes':>9}"
+    if previous:
+        header += f"{'ops/s vs base':>15}{'p95 vs base':>13}"
+    print(header)
+    for r in report['results']:
+        line = (f"{r['name']:<28}{r['size']:>7}{r['throughput_per_s'] or 0:>11.1f}{r['p50_ms']:>10.3f}"
+                f"{r['p95_ms']:>10.3f}{r['peak_rss_mb'] or 0:>9.1f}{r.get('bytes_per_code', ''):>9}")
+        base = previous.get((r['name'], r['size']))
+        if base:
+            line += f"{change(base['throughput_per_s'], r['throughput_per_s']):>15}"
+            line += f"{change(base['p95_ms'], r['p95_ms']):>13}"
+        print(line)
+
+
+def change(before, after):
+    if not before or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark code rendering, persistence and list loading.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000], help="dataset sizes to run")
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite')
+    parser.add_argument('--config', default='config.ini', help="config file with the [mysql] settings")
+    parser.add_argument('--workers', type=int, default=None, help="batch worker processes (default: [batch])")
+    parser.add_argument('--page-loads', type=int, default=20, help="repetitions of each list query benchmark")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON file of an earlier run to compare against")
+    parser.add_argument('--keep', action='store_true', help="keep the scratch directory")
+    parser.add_argument('--metrics', help="record per-stage timing histograms and write them to this JSON file")
+    args = parser.parse_args(argv)
+
+    config_path = os.path.abspath(args.config)
+    output_path = os.path.abspath(args.output) if args.output else None
+    metrics_path = os.path.abspath(args.metrics) if args.metrics else None
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    workdir = prepare_workdir(args.backend, config_path)
+    original_dir = os.getcwd()
+    os.chdir(workdir)  # db_utils resolves config.ini and codes_generated/ against the working directory
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        import db_utils
+        import metrics
+
+        metrics.enable(metrics_path is not None)
+        success, message = db_utils.setup_database_tables()
+        if not success:
+            raise SystemExit(f"Database setup failed: {message}")
+
+        report = {
+            'meta': {
+                'started_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'backend': args.backend,
+                'sizes': args.sizes,
+                'workers': args.workers or db_utils.load_batch_config()['workers'],
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'revision': git_revision()
+            },
+            'results': []
+        }
+        for size in args.sizes:
+            report['results'].extend(run_size(db_utils, size, args.workers, args.page_loads))
+
+        if args.backend == 'mysql':
+            db_utils.drop_database()
+        db_utils.get_storage().close()
+        if metrics_path:
+            metrics.export(metrics_path, 'json')
+    finally:
+        os.chdir(original_dir)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report, baseline)
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {output_path}")
+    if metrics_path:
+        print(f"Stage metrics written to {metrics_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,190 @@
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import shutil
 import os
-import mysql.connector
+import datetime
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Import all backend logic from db_utils
 import db_utils
+from thumbnails import ThumbnailCache
+
+# Rows fetched per keyset page, and pages kept in a list view at once
+PAGE_SIZE = 200
+MAX_LOADED_PAGES = 5
+# Quiet period after the last keystroke before a search query is sent
+SEARCH_DEBOUNCE_MS = 300
+# Shown in the printer list until background printer detection finishes
+DETECTING_PRINTERS = "Detecting printers..."
+
+
+class BackgroundTasks:
+    """
+    Runs slow work (DB queries, batch generation, backups, printing) on worker
+    threads. Results are handed back through a queue that the Tk main loop
+    polls with after(), since widgets may only be touched from the main thread.
+    """
+
+    POLL_MS = 50
+
+    def __init__(self, master, max_workers=4):
+        self.master = master
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='code-manager')
+        self.results = queue.Queue()
+        self.master.after(self.POLL_MS, self.poll)
+
+    def submit(self, func, *args, on_done=None, on_error=None, **kwargs):
+        """Runs func(*args, **kwargs) in the background, then on_done(result) or on_error(exc) on the main loop."""
+
+        def run():
+            try:
+                self.results.put((on_done, func(*args, **kwargs), None))
+            except Exception as e:
+                self.results.put((on_error, None, e))
+
+        return self.executor.submit(run)
+
+    def poll(self):
+        while True:
+            try:
+                callback, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if error is not None:
+                if callback:
+                    callback(error)
+                else:
+                    messagebox.showerror("Background Task Failed", f"An unexpected error occurred:\n{error}")
+            elif callback:
+                callback(result)
+        self.master.after(self.POLL_MS, self.poll)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PagedTreeview:
+    """
+    Shows created_codes in a Treeview through keyset pagination. Only a sliding
+    window of pages is kept in the widget; pages are fetched in the background
+    as the user scrolls towards either end, so opening the list costs one page
+    query no matter how large the table is.
+    """
+
+    def __init__(self, tree, scrollbar, tasks, order_by, error_title):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.tasks = tasks
+        self.order_by = order_by
+        self.error_title = error_title
+        self.pages = deque()  # (first_key, last_key, item_ids), top to bottom
+        self.has_newer = False  # pages were dropped above the window
+        self.has_older = False
+        self.loading = False
+        self.generation = 0  # bumped on reload so stale page results are ignored
+        self.pending = None  # future of the page query in flight
+        self.filters = None  # search filters passed to db_utils.fetch_code_page
+
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.scrollbar.configure(command=self.tree.yview)
+
+    def set_filters(self, filters):
+        self.filters = filters
+        self.reload()
+
+    def reload(self):
+        self.generation += 1
+        if self.pending is not None:
+            self.pending.cancel()  # Drops a superseded query that has not started yet
+        self.tree.delete(*self.tree.get_children())
+        self.tree.yview_moveto(0)
+        self.pages.clear()
+        self.has_newer = False
+        self.has_older = True
+        self.load_older()
+
+    def request(self, on_page, **position):
+        generation = self.generation
+        self.loading = True
+
+        def done(page):
+            if generation == self.generation:
+                self.loading = False
+                on_page(*page)
+
+        def failed(err):
+            if generation != self.generation:
+                return
+            self.loading = False
+            if not isinstance(err, db_utils.StorageConnectionError):  # Nothing to show until configured
+                messagebox.showerror("DB Error", f"{self.error_title}: {err}")
+
+        self.pending = self.tasks.submit(db_utils.fetch_code_page, self.order_by, limit=PAGE_SIZE,
+                                         filters=self.filters, on_done=done, on_error=failed, **position)
+
+    def insert_rows(self, rows, index):
+        item_ids = []
+        for offset, rec in enumerate(rows):
+            date_str = rec[3].strftime("%Y-%m-%d %H:%M:%S")
+            position = 'end' if index == 'end' else index + offset
+            item_ids.append(self.tree.insert('', position, values=(rec[0], rec[1], rec[2], date_str, rec[4])))
+        return item_ids
+
+    def load_older(self):
+        after = self.pages[-1][1] if self.pages else None
+        self.request(self.append_page, after=after)
+
+    def append_page(self, rows, first_key, last_key):
+        self.has_older = len(rows) == PAGE_SIZE
+        if not rows:
+            return
+
+        self.pages.append((first_key, last_key, self.insert_rows(rows, 'end')))
+        if len(self.pages) > MAX_LOADED_PAGES:
+            dropped = self.pages.popleft()[2]
+            self.tree.delete(*dropped)
+            # Keep the same rows on screen after removing rows above them
+            self.tree.yview_scroll(-len(dropped), 'units')
+            self.has_newer = True
+
+    def load_newer(self):
+        self.request(self.prepend_page, before=self.pages[0][0])
+
+    def prepend_page(self, rows, first_key, last_key):
+        if len(rows) < PAGE_SIZE:
+            self.has_newer = False
+        if not rows:
+            return
+
+        self.pages.appendleft((first_key, last_key, self.insert_rows(rows, 0)))
+        self.tree.yview_scroll(len(rows), 'units')
+        if len(self.pages) > MAX_LOADED_PAGES:
+            self.tree.delete(*self.pages.pop()[2])
+            self.has_older = True
+
+    def remove_records(self, record_ids):
+        """Drops deleted records from the loaded pages without querying the database again."""
+        record_ids = {str(record_id) for record_id in record_ids}
+        for index, (first_key, last_key, item_ids) in enumerate(self.pages):
+            removed = {item for item in item_ids if str(self.tree.item(item, 'values')[0]) in record_ids}
+            if removed:
+                self.tree.delete(*removed)
+                # The page keys stay valid positions for fetching its neighbours
+                self.pages[index] = (first_key, last_key, [item for item in item_ids if item not in removed])
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self.loading:
+            return
+        if float(last) >= 0.95 and self.has_older:
+            self.load_older()
+        elif float(first) <= 0.05 and self.has_newer and self.pages:
+            self.load_newer()
 
 
 class CodeManagerApp:
@@ -14,6 +192,15 @@ class CodeManagerApp:
         self.master = master
         master.title("Configurable Code Manager App (CRUD, Printing & Batch)")
 
+        self.tasks = BackgroundTasks(master)
+        self.batch_cancel_event = None
+        self.export_cancel_event = None
+        self.print_queue = db_utils.start_print_queue()
+        thumbnail_config = db_utils.load_thumbnail_config()
+        self.thumbnails = ThumbnailCache(thumbnail_config['disk_dir'], thumbnail_config['max_bytes'],
+                                         thumbnail_config['disk_max_bytes'])
+        master.protocol("WM_DELETE_WINDOW", self.handle_close)
+
         self.notebook = ttk.Notebook(master)
         self.notebook.pack(pady=10, padx=10, expand=True, fill="both")
 
@@ -21,19 +208,56 @@ class CodeManagerApp:
         self.tab_create = ttk.Frame(self.notebook)
         self.tab_list = ttk.Frame(self.notebook)
         self.tab_crud = ttk.Frame(self.notebook)
+        self.tab_queue = ttk.Frame(self.notebook)
 
         self.notebook.add(self.tab_setup, text='Database Setup/Backup')
         self.notebook.add(self.tab_create, text='Create Code (Single/Batch)')
         self.notebook.add(self.tab_list, text='Manage Codes (View/Print/Export)')
         self.notebook.add(self.tab_crud, text='Edit/Delete Records')
-
-        self.setup_tab_setup()
-        self.setup_tab_create()
-        self.setup_tab_list()
-        self.setup_tab_crud()
+        self.notebook.add(self.tab_queue, text='Print Queue')
 
         self.tkimage = None
         self.temp_tkimage = None
+        self.code_pager = None  # Set once the list tabs are built
+        self.crud_pager = None
+
+        # Each tab is built the first time it is selected, so the window appears without waiting on the DB
+        self.tab_builders = {
+            str(self.tab_setup): self.setup_tab_setup,
+            str(self.tab_create): self.setup_tab_create,
+            str(self.tab_list): self.setup_tab_list,
+            str(self.tab_crud): self.setup_tab_crud,
+            str(self.tab_queue): self.setup_tab_queue
+        }
+        self.notebook.bind('<<NotebookTabChanged>>', self.handle_tab_changed)
+        self.handle_tab_changed()
+
+        # Slow startup work runs in the background: printer detection (cached in db_utils) and
+        # resuming print jobs left over from the last run once the database is reachable
+        self.tasks.submit(db_utils.get_installed_printers)
+        self.tasks.submit(db_utils.restore_print_jobs, self.print_queue,
+                          on_error=lambda err: self.report_queue_error("Could not load print jobs", err))
+        self.tasks.submit(db_utils.schema_error, on_done=self.report_schema_error, on_error=lambda err: None)
+
+    def report_schema_error(self, error):
+        if error:
+            messagebox.showwarning("Database Schema Not Updated",
+                                   f"{error}\n\nUse 'Setup Database & Tables' on the Database Setup/Backup tab.")
+
+    def handle_tab_changed(self, event=None):
+        builder = self.tab_builders.pop(str(self.notebook.select()), None)
+        if builder is not None:
+            builder()
+
+    def handle_close(self):
+        if self.batch_cancel_event is not None:
+            self.batch_cancel_event.set()
+        if self.export_cancel_event is not None:
+            self.export_cancel_event.set()
+        self.print_queue.shutdown()  # Queued jobs stay in print_jobs and resume on the next start
+        self.tasks.shutdown()
+        db_utils.export_metrics()  # No-op unless enabled in [metrics]
+        self.master.destroy()
 
     # ----------------------------------------------------
     # --- SETUP TAB LAYOUT
@@ -41,6 +265,11 @@ class CodeManagerApp:
     def setup_tab_setup(self):
         ttk.Label(self.tab_setup, text="MySQL Database Management", font=('Arial', 14, 'bold')).pack(pady=10)
 
+        storage_config = db_utils.load_storage_config()
+        backend_text = "MySQL server" if storage_config['backend'] == 'mysql' else \
+            f"Embedded SQLite ({storage_config['sqlite_path']})"
+        ttk.Label(self.tab_setup, text=f"Storage backend: {backend_text}  (set in config.ini [storage])").pack()
+
         config_frame = ttk.LabelFrame(self.tab_setup, text=" MySQL Connection Configuration ")
         config_frame.pack(pady=10, padx=20, fill='x')
 
@@ -91,37 +320,50 @@ class CodeManagerApp:
         new_settings = {key: entry.get() for key, entry in self.config_entries.items()}
         db_utils.save_config(new_settings)
 
-        temp_config = new_settings.copy()
-        temp_config.pop('database', None)
-        if not temp_config.get('password'):
-            temp_config.pop('password', None)
+        success, message = db_utils.test_db_connection()
+        if success:
+            messagebox.showinfo("Success", f"Configuration saved.\n{message}")
+        else:
+            messagebox.showerror("Error", f"Configuration saved, but {message}")
+
+    def handle_setup_db(self):
+        success, message = db_utils.setup_database_tables()
+        if success:
+            messagebox.showinfo("Success", message)
+            return
 
         try:
-            conn = mysql.connector.connect(**temp_config)
-            conn.close()
-            messagebox.showinfo("Success", "Configuration saved and connection test successful!")
-        except mysql.connector.Error as err:
-            messagebox.showerror("Error",
-                                 f"Configuration saved, but connection test failed:\n{err}\n\nCheck your MySQL settings.")
+            duplicate_count = db_utils.count_duplicate_codes()
+        except db_utils.StorageError:
+            duplicate_count = 0
+        if not duplicate_count:
+            messagebox.showerror("DB Setup Error", message)
+            return
 
-    def handle_setup_db(self):
-        db_config = db_utils.load_config()
-        success, message = db_utils.setup_database_tables(db_config)
+        # Removing records is never part of a migration; it needs the user's consent and a backup
+        if not messagebox.askyesno("Duplicate Code Records",
+                                   f"{message}\n\n{duplicate_count} older records point at an image file that a "
+                                   f"newer record overwrote. Back up the database and delete these older records?"):
+            return
+        success, message = db_utils.remove_duplicate_codes()
         if success:
             messagebox.showinfo("Success", message)
+            self.refresh_code_lists()
         else:
             messagebox.showerror("DB Setup Error", message)
 
     def handle_backup_db(self):
-        db_config = db_utils.load_config()
-        success, message = db_utils.backup_database(db_config)
+        self.tasks.submit(db_utils.backup_database, on_done=self.finish_backup_db)
+
+    def finish_backup_db(self, result):
+        success, message = result
         if success:
             messagebox.showinfo("Success", message)
         else:
             messagebox.showerror("Backup Error", message)
 
     def handle_delete_db(self):
-        db_name = db_utils.load_config()['database']
+        db_name = db_utils.get_storage().display_name
 
         if not messagebox.askyesno("CONFIRM PERMANENT DELETION",
                                    f"WARNING: You are about to PERMANENTLY delete the database: '{db_name}'. This action cannot be undone. Are you absolutely sure?"):
@@ -131,34 +373,24 @@ class CodeManagerApp:
                                    f"🚨 DOUBLE CHECK! Is the database name you want to delete correct: '{db_name}'?"):
             return
 
-        conn = db_utils.get_db_connection(use_db_name=False)
-        if not conn:
-            messagebox.showerror("DB Error", "Cannot connect to MySQL server to perform deletion. Check config.")
-            return
-
         try:
-            cursor = conn.cursor()
-            cursor.execute(f"DROP DATABASE `{db_name}`")
-            conn.commit()
+            db_utils.drop_database()
 
             file_msg = ""
             if os.path.exists(db_utils.CODES_DIR):
                 shutil.rmtree(db_utils.CODES_DIR)
                 os.makedirs(db_utils.CODES_DIR)
+                self.thumbnails.clear()
                 file_msg = "\n(Associated local code files folder also reset.)"
 
             messagebox.showinfo("Success", f"Database '{db_name}' has been PERMANENTLY deleted." + file_msg)
 
-            self.update_code_list()
-            self.update_crud_list()
+            self.refresh_code_lists()
 
-        except mysql.connector.Error as err:
+        except db_utils.StorageConnectionError:
+            messagebox.showerror("DB Error", "Cannot connect to the database server to perform deletion. Check config.")
+        except db_utils.StorageError as err:
             messagebox.showerror("DB Deletion Error", f"Failed to delete database '{db_name}': {err}")
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
-            if conn:
-                conn.close()
 
     # ----------------------------------------------------
     # --- CREATE TAB LAYOUT (MODIFIED FOR SINGLE/BATCH) ---
@@ -205,6 +437,21 @@ class CodeManagerApp:
         self.image_preview_label = ttk.Label(self.tab_create, text="Code Preview")
         self.image_preview_label.grid(row=9, column=0, columnspan=2, pady=10)
 
+        # Batch progress (shown while a batch runs in the background)
+        progress_frame = ttk.Frame(self.tab_create)
+        progress_frame.grid(row=10, column=0, columnspan=2, padx=10, pady=5, sticky='ew')
+
+        self.batch_progress = ttk.Progressbar(progress_frame, orient='horizontal', length=300, mode='determinate')
+        self.batch_progress.grid(row=0, column=0, padx=5, pady=2, sticky='w')
+        self.batch_cancel_button = ttk.Button(progress_frame, text="Cancel Batch", command=self.handle_cancel_batch,
+                                              state='disabled')
+        self.batch_cancel_button.grid(row=0, column=1, padx=5, pady=2)
+        self.batch_resume_button = ttk.Button(progress_frame, text="Resume Unfinished Batch",
+                                              command=self.handle_resume_batch)
+        self.batch_resume_button.grid(row=0, column=2, padx=5, pady=2)
+        self.batch_status_label = ttk.Label(progress_frame, text="")
+        self.batch_status_label.grid(row=1, column=0, columnspan=3, padx=5, pady=2, sticky='w')
+
     def update_create_fields(self):
         for widget in self.input_frame.winfo_children():
             widget.destroy()
@@ -276,6 +523,18 @@ class CodeManagerApp:
             self.batch_padding.insert(0, '4')
             self.batch_padding.grid(row=row, column=1, padx=5, pady=2, sticky='w')
 
+            row += 1
+            self.batch_lazy = tk.BooleanVar(value=db_utils.load_batch_config()['lazy_render'])
+            ttk.Checkbutton(self.input_frame, text="Metadata only (render images on first view/print/export)",
+                            variable=self.batch_lazy).grid(row=row, column=0, columnspan=2, padx=5, pady=2, sticky='w')
+
+            row += 1
+            ttk.Label(self.input_frame, text="Output Format:").grid(row=row, column=0, padx=5, pady=2, sticky='w')
+            self.batch_format = ttk.Combobox(self.input_frame, values=list(db_utils.OUTPUT_FORMATS), state='readonly',
+                                             width=12)
+            self.batch_format.set(db_utils.load_render_config()['output_format'])
+            self.batch_format.grid(row=row, column=1, padx=5, pady=2, sticky='w')
+
             self.generate_button.config(text=f"Generate & Save Batch ({'QR' if mode == 'QR_BATCH' else 'BAR'})")
 
         self.generate_button.config(command=self.handle_generate_code_or_batch)
@@ -329,9 +588,10 @@ class CodeManagerApp:
 
         if path:
             messagebox.showinfo("Success", f"{code_name} saved and recorded successfully.")
-            self.show_image_preview(path)
-            self.update_code_list()
-            self.update_crud_list()
+            # SVG codes are previewed through a PNG copy
+            self.show_image_preview(db_utils.ensure_code_image('QR' if 'QR' in mode else 'BAR', data, path, raster=True)
+                                    or path)
+            self.refresh_code_lists()
 
     def handle_generate_batch(self):
         """Handles the new batch code generation logic."""
@@ -364,10 +624,92 @@ class CodeManagerApp:
                                        f"You are about to generate {total_count} codes. This may take time. Proceed?"):
                 return
 
-        # Call the utility function
-        generated_count, errors = db_utils.generate_batch_codes(
-            code_type, prefix, start_num, end_num, padding, suffix
-        )
+        self.start_batch_progress(total_count)
+        self.tasks.submit(db_utils.generate_batch_codes,
+                          code_type, prefix, start_num, end_num, padding, suffix,
+                          progress=self.record_batch_progress, cancel_event=self.batch_cancel_event,
+                          lazy=self.batch_lazy.get(), output_format=self.batch_format.get(),
+                          on_done=lambda result: self.finish_batch(code_type, result),
+                          on_error=lambda err: self.finish_batch(code_type, (0, [f"Batch failed: {err}"])))
+        self.refresh_batch_progress()
+
+    def start_batch_progress(self, total_count):
+        # Run the batch in the background; progress is polled from the main loop
+        self.batch_cancel_event = threading.Event()
+        self.batch_done = 0
+        self.batch_total = total_count
+        self.batch_started = time.monotonic()
+        self.batch_progress.config(maximum=total_count, value=0)
+        self.batch_cancel_button.config(state='normal')
+        self.batch_resume_button.config(state='disabled')
+        self.generate_button.config(state='disabled')
+
+    def handle_resume_batch(self):
+        """Offers to continue the most recent unfinished batch job from its last checkpoint."""
+        self.batch_resume_button.config(state='disabled')
+        self.tasks.submit(db_utils.list_batch_jobs, limit=1,
+                          on_done=self.confirm_resume_batch,
+                          on_error=lambda err: self.confirm_resume_batch(None, err))
+
+    def confirm_resume_batch(self, jobs, error=None):
+        if self.batch_cancel_event is not None:
+            return  # A batch was started meanwhile
+
+        self.batch_resume_button.config(state='normal')
+        if error is not None:
+            messagebox.showerror("Resume Batch", f"Could not load batch jobs: {error}")
+            return
+        if not jobs:
+            messagebox.showinfo("Resume Batch", "There is no unfinished batch to resume.")
+            return
+
+        job = jobs[0]
+        pending_count = job.end_num - job.resume_from + 1
+        if not messagebox.askyesno("Resume Batch",
+                                   f"{job.describe()}.\n\nContinue with the remaining {pending_count} codes?"):
+            return
+
+        self.start_batch_progress(pending_count)
+        self.tasks.submit(db_utils.resume_batch_job, job.id,
+                          progress=self.record_batch_progress, cancel_event=self.batch_cancel_event,
+                          on_done=lambda result: self.finish_batch(job.code_type, result),
+                          on_error=lambda err: self.finish_batch(job.code_type, (0, [f"Batch failed: {err}"])))
+        self.refresh_batch_progress()
+
+    def record_batch_progress(self, done):
+        # Called from the worker thread; the main loop picks the value up
+        self.batch_done = done
+
+    def refresh_batch_progress(self):
+        if self.batch_cancel_event is None:
+            return
+
+        done = self.batch_done
+        elapsed = time.monotonic() - self.batch_started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = f"{(self.batch_total - done) / rate:.0f}s" if rate > 0 else "--"
+        self.batch_progress.config(value=done)
+        self.batch_status_label.config(
+            text=f"{done}/{self.batch_total} codes  |  {rate:.1f} codes/s  |  ETA {eta}")
+        self.master.after(200, self.refresh_batch_progress)
+
+    def handle_cancel_batch(self):
+        if self.batch_cancel_event is not None:
+            self.batch_cancel_event.set()
+            self.batch_cancel_button.config(state='disabled')
+            self.batch_status_label.config(text="Cancelling...")
+
+    def finish_batch(self, code_type, result):
+        generated_count, errors = result
+        total_count = self.batch_total
+        elapsed = time.monotonic() - self.batch_started
+
+        self.batch_cancel_event = None
+        self.batch_progress.config(value=self.batch_done)
+        self.batch_cancel_button.config(state='disabled')
+        self.batch_resume_button.config(state='normal')
+        self.generate_button.config(state='normal')
+        self.batch_status_label.config(text=f"Last batch: {generated_count} codes in {elapsed:.1f}s")
 
         if errors:
             error_msg = "\n".join(errors[:5])  # Show first 5 errors
@@ -378,13 +720,11 @@ class CodeManagerApp:
             messagebox.showinfo("Batch Generation Success",
                                 f"Successfully generated and saved {generated_count} {code_type} codes.")
 
-        self.update_code_list()
-        self.update_crud_list()
+        self.refresh_code_lists()
 
     def show_image_preview(self, path):
         try:
-            img = Image.open(path)
-            img = img.resize((200, 200), Image.LANCZOS)
+            img = self.thumbnails.get(path, (200, 200))
             self.tkimage = ImageTk.PhotoImage(img)
             self.image_preview_label.config(image=self.tkimage, text="")
         except Exception:
@@ -396,7 +736,40 @@ class CodeManagerApp:
     def setup_tab_list(self):
         ttk.Label(self.tab_list, text="List of Created Codes", font=('Arial', 14, 'bold')).pack(pady=10)
 
-        self.tree = ttk.Treeview(self.tab_list, columns=("ID", "Type", "Data", "Date Created", "Path"), show='headings')
+        # --- Search Bar (filtered on the database server) ---
+        search_frame = ttk.Frame(self.tab_list)
+        search_frame.pack(fill='x', padx=10, pady=(0, 5))
+
+        self.search_var = tk.StringVar()
+        self.search_mode_var = tk.StringVar(value='Contains')
+        self.search_type_var = tk.StringVar(value='All')
+        self.search_from_var = tk.StringVar()
+        self.search_to_var = tk.StringVar()
+        self.search_after_id = None
+
+        ttk.Label(search_frame, text="Search Data:").pack(side='left')
+        ttk.Entry(search_frame, textvariable=self.search_var, width=25).pack(side='left', padx=5)
+        ttk.Combobox(search_frame, textvariable=self.search_mode_var, values=['Contains', 'Starts with'],
+                     state='readonly', width=10).pack(side='left', padx=5)
+        ttk.Label(search_frame, text="Type:").pack(side='left')
+        ttk.Combobox(search_frame, textvariable=self.search_type_var, values=['All', 'QR', 'BAR'], state='readonly',
+                     width=5).pack(side='left', padx=5)
+        ttk.Label(search_frame, text="From:").pack(side='left')
+        ttk.Entry(search_frame, textvariable=self.search_from_var, width=11).pack(side='left', padx=5)
+        ttk.Label(search_frame, text="To:").pack(side='left')
+        ttk.Entry(search_frame, textvariable=self.search_to_var, width=11).pack(side='left', padx=5)
+        ttk.Button(search_frame, text="Clear", command=self.handle_clear_search).pack(side='left', padx=5)
+        self.search_status = ttk.Label(search_frame, text="Dates: YYYY-MM-DD")
+        self.search_status.pack(side='left', padx=5)
+
+        for var in (self.search_var, self.search_mode_var, self.search_type_var, self.search_from_var,
+                    self.search_to_var):
+            var.trace_add('write', self.schedule_search)
+
+        tree_frame = ttk.Frame(self.tab_list)
+        tree_frame.pack(fill='both', expand=True, padx=10)
+
+        self.tree = ttk.Treeview(tree_frame, columns=("ID", "Type", "Data", "Date Created", "Path"), show='headings')
         self.tree.heading("ID", text="ID")
         self.tree.heading("Type", text="Type")
         self.tree.heading("Data", text="Data")
@@ -409,19 +782,24 @@ class CodeManagerApp:
         self.tree.column("Date Created", width=150)
         self.tree.column("Path", width=0, stretch=tk.NO)
 
-        self.tree.pack(fill='both', expand=True, padx=10)
+        tree_scroll = ttk.Scrollbar(tree_frame, orient='vertical')
+        tree_scroll.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.code_pager = PagedTreeview(self.tree, tree_scroll, self.tasks, 'date_created', "Failed to load records")
 
         # --- Printer Selection and Action Frame ---
         print_frame = ttk.LabelFrame(self.tab_list, text=" Actions on Selected Code ")
         print_frame.pack(pady=10, padx=10, fill='x')
 
-        printers = db_utils.get_installed_printers()
-        self.printer_var = tk.StringVar(value=printers[0] if printers else "No Printers Found")
+        self.printer_var = tk.StringVar(value=DETECTING_PRINTERS)
 
         ttk.Label(print_frame, text="Select Printer:").grid(row=0, column=0, padx=5, pady=5, sticky='w')
-        self.printer_combo = ttk.Combobox(print_frame, textvariable=self.printer_var, values=printers, state='readonly',
+        self.printer_combo = ttk.Combobox(print_frame, textvariable=self.printer_var, values=[], state='readonly',
                                           width=30)
         self.printer_combo.grid(row=0, column=1, padx=5, pady=5, sticky='ew')
+        ttk.Button(print_frame, text="Refresh Printers",
+                   command=lambda: self.load_printers(refresh=True)).grid(row=0, column=2, padx=5, pady=5, sticky='ew')
+        self.load_printers()
 
         action_row = 1
         ttk.Button(print_frame, text="Refresh List", command=self.update_code_list).grid(row=action_row, column=0,
@@ -435,32 +813,254 @@ class CodeManagerApp:
                                                                                                  column=0, padx=5,
                                                                                                  pady=5, sticky='ew')
         ttk.Button(print_frame,
-                   text="Print Selected Code",
+                   text="Print Selected Codes",
                    command=self.handle_print_selected_code).grid(row=print_row, column=1, padx=5, pady=5, sticky='ew')
+        self.print_status_label = ttk.Label(print_frame, text="")
+        self.print_status_label.grid(row=3, column=0, columnspan=2, padx=5, pady=2, sticky='w')
+
+        # --- Bulk Export Frame ---
+        export_frame = ttk.LabelFrame(self.tab_list, text=" Bulk Export & Label Sheets ")
+        export_frame.pack(pady=(0, 10), padx=10, fill='x')
+
+        self.export_scope_var = tk.StringVar(value='selection')
+        ttk.Radiobutton(export_frame, text="Selected Rows", variable=self.export_scope_var,
+                        value='selection').grid(row=0, column=0, padx=5, pady=5, sticky='w')
+        ttk.Radiobutton(export_frame, text="Current Search", variable=self.export_scope_var,
+                        value='search').grid(row=0, column=1, padx=5, pady=5, sticky='w')
+        ttk.Radiobutton(export_frame, text="Batch Job:", variable=self.export_scope_var,
+                        value='job').grid(row=0, column=2, padx=5, pady=5, sticky='w')
+        self.export_job_var = tk.StringVar()
+        self.export_jobs = {}  # entry shown in the combobox -> batch job id
+        self.export_job_combo = ttk.Combobox(export_frame, textvariable=self.export_job_var, state='readonly', width=50)
+        self.export_job_combo.grid(row=0, column=3, columnspan=2, padx=5, pady=5, sticky='w')
+
+        ttk.Label(export_frame, text="Manifest:").grid(row=1, column=0, padx=5, pady=5, sticky='w')
+        self.export_manifest_var = tk.StringVar(value='CSV')
+        ttk.Combobox(export_frame, textvariable=self.export_manifest_var, values=['CSV', 'JSON'], state='readonly',
+                     width=6).grid(row=1, column=1, padx=5, pady=5, sticky='w')
+        self.export_buttons = [
+            ttk.Button(export_frame, text="Export Archive...", command=self.handle_bulk_export),
+            ttk.Button(export_frame, text="Save Label PDF...", command=self.handle_save_label_pdf),
+            ttk.Button(export_frame, text="Print Label Sheets", command=self.handle_print_label_sheets)
+        ]
+        for column, button in enumerate(self.export_buttons, start=2):
+            button.grid(row=1, column=column, padx=5, pady=5, sticky='ew')
+
+        self.export_progress = ttk.Progressbar(export_frame, orient='horizontal', length=300, mode='determinate')
+        self.export_progress.grid(row=2, column=0, columnspan=3, padx=5, pady=2, sticky='w')
+        self.export_cancel_button = ttk.Button(export_frame, text="Cancel", command=self.handle_cancel_export,
+                                               state='disabled')
+        self.export_cancel_button.grid(row=2, column=3, padx=5, pady=2, sticky='ew')
+        self.export_status_label = ttk.Label(export_frame, text="")
+        self.export_status_label.grid(row=3, column=0, columnspan=5, padx=5, pady=2, sticky='w')
 
         self.update_code_list()
 
     def update_code_list(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        if self.code_pager is not None:
+            self.code_pager.reload()
+            self.load_export_jobs()
 
-        conn = db_utils.get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            sql = "SELECT id, type, data, date_created, image_path FROM created_codes ORDER BY date_created DESC"
-            try:
-                cursor.execute(sql)
-                records = cursor.fetchall()
+    def load_export_jobs(self):
+        self.tasks.submit(db_utils.list_batch_jobs, None, 50, on_done=self.show_export_jobs, on_error=lambda err: None)
+
+    def show_export_jobs(self, jobs):
+        self.export_jobs = {job.describe(): job.id for job in jobs}
+        self.export_job_combo.config(values=list(self.export_jobs))
+        if self.export_job_var.get() not in self.export_jobs:
+            self.export_job_var.set("")
+
+    def refresh_code_lists(self):
+        """Reloads both code lists after records were added, changed or removed."""
+        self.update_code_list()
+        self.update_crud_list()
+
+    def load_printers(self, refresh=False):
+        # Printer detection can block on the spooler, so it never runs on the main loop
+        self.printer_var.set(DETECTING_PRINTERS)
+        self.printer_combo.config(values=[])
+        self.tasks.submit(db_utils.get_installed_printers, refresh, on_done=self.show_printers)
+
+    def show_printers(self, printers):
+        self.printer_combo.config(values=printers)
+        if self.printer_var.get() == DETECTING_PRINTERS:
+            self.printer_var.set(printers[0] if printers else "No Printers Found")
+
+    def selected_printer(self):
+        """Returns the chosen printer name, or None after warning the user."""
+        printer_name = self.printer_var.get()
+        if printer_name == DETECTING_PRINTERS:
+            messagebox.showinfo("Printer Detection", "Printers are still being detected. Please try again in a moment.")
+            return None
+        if not printer_name or printer_name == "No Printers Found":
+            messagebox.showwarning("Printer Error",
+                                   "No printer is selected or detected. Please check your system settings.")
+            return None
+        return printer_name
+
+    def bulk_scope(self):
+        """
+        Returns the (ids, filters, batch job id) chosen in the bulk frame, only
+        one of them set, or None after warning the user.
+        """
+        scope = self.export_scope_var.get()
+        if scope == 'selection':
+            ids = [int(self.tree.item(item, 'values')[0]) for item in self.tree.selection()]
+            if not ids:
+                messagebox.showwarning("Selection Error", "Please select one or more codes from the list.")
+                return None
+            return ids, None, None
+        if scope == 'search':
+            return None, self.code_pager.filters, None
+
+        job_id = self.export_jobs.get(self.export_job_var.get())
+        if job_id is None:
+            messagebox.showwarning("Input Error", "Please choose a batch job.")
+            return None
+        return None, None, job_id
+
+    def handle_bulk_export(self):
+        scope = self.bulk_scope()
+        if scope is None:
+            return
+
+        archive_path = filedialog.asksaveasfilename(
+            defaultextension=".zip",
+            initialfile="codes_export.zip",
+            filetypes=[("ZIP archive", "*.zip"), ("TAR archive", "*.tar"), ("Gzipped TAR archive", "*.tar.gz")],
+            title="Export Codes As"
+        )
+        if archive_path:
+            self.start_bulk_job(scope, "Export", f"exported to:\n{archive_path}",
+                                db_utils.export_code_archive, archive_path, self.export_manifest_var.get().lower())
+
+    def handle_save_label_pdf(self):
+        scope = self.bulk_scope()
+        if scope is None:
+            return
+
+        pdf_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            initialfile="label_sheets.pdf",
+            filetypes=[("PDF files", "*.pdf")],
+            title="Save Label Sheets As"
+        )
+        if pdf_path:
+            self.start_bulk_job(scope, "Label Sheets", f"placed on label sheets:\n{pdf_path}",
+                                db_utils.compose_label_sheets, pdf_path)
+
+    def handle_print_label_sheets(self):
+        printer_name = self.selected_printer()
+        if printer_name is None:
+            return
+
+        scope = self.bulk_scope()
+        if scope is not None:
+            self.start_bulk_job(scope, "Label Printing", f"sent to the printer as one job ({printer_name}).",
+                                db_utils.print_label_sheets, printer_name)
+
+    def start_bulk_job(self, scope, title, success_text, func, *args):
+        ids, filters, job_id = scope
+        self.export_cancel_event = threading.Event()
+        self.export_done = 0
+        self.export_total = len(ids) if ids is not None else 0  # counted in the background otherwise
+        self.export_started = time.monotonic()
+        for button in self.export_buttons:
+            button.config(state='disabled')
+        self.export_cancel_button.config(state='normal')
+
+        self.tasks.submit(self.run_bulk_job, func, ids, filters, job_id, *args,
+                          on_done=lambda result: self.finish_bulk_job(title, success_text, result),
+                          on_error=lambda err: self.finish_bulk_job(title, success_text,
+                                                                    (0, [f"{title} failed: {err}"])))
+        self.refresh_export_progress()
+
+    def run_bulk_job(self, func, ids, filters, job_id, *args):
+        # Runs on a worker thread
+        if job_id is not None:
+            ids = db_utils.batch_job_code_ids(job_id)
+            self.export_total = len(ids)
+        elif ids is None:
+            self.export_total = db_utils.count_code_records(filters)
+        return func(*args, ids=ids, filters=filters, progress=self.record_export_progress,
+                    cancel_event=self.export_cancel_event)
+
+    def record_export_progress(self, done):
+        # Called from the worker thread; the main loop picks the value up
+        self.export_done = done
+
+    def refresh_export_progress(self):
+        if self.export_cancel_event is None:
+            return
 
-                for rec in records:
-                    date_str = rec[3].strftime("%Y-%m-%d %H:%M:%S")
-                    self.tree.insert('', 'end', values=(rec[0], rec[1], rec[2], date_str, rec[4]))
+        done = self.export_done
+        elapsed = time.monotonic() - self.export_started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        self.export_progress.config(maximum=max(self.export_total, 1), value=done)
+        self.export_status_label.config(text=f"{done}/{self.export_total} codes  |  {rate:.1f} codes/s")
+        self.master.after(200, self.refresh_export_progress)
+
+    def handle_cancel_export(self):
+        if self.export_cancel_event is not None:
+            self.export_cancel_event.set()
+            self.export_cancel_button.config(state='disabled')
+            self.export_status_label.config(text="Cancelling...")
+
+    def finish_bulk_job(self, title, success_text, result):
+        done_count, errors = result
+        elapsed = time.monotonic() - self.export_started
+
+        self.export_cancel_event = None
+        self.export_progress.config(value=self.export_done)
+        self.export_cancel_button.config(state='disabled')
+        for button in self.export_buttons:
+            button.config(state='normal')
+        self.export_status_label.config(text=f"Last job: {done_count} codes in {elapsed:.1f}s")
 
-            except mysql.connector.Error as err:
-                messagebox.showerror("DB Error", f"Failed to load records: {err}")
-            finally:
-                cursor.close()
-                conn.close()
+        if errors:
+            error_msg = "\n".join(errors[:5])  # Show first 5 errors
+            messagebox.showwarning(f"{title} Finished with Errors",
+                                   f"{done_count} codes processed.\nFirst few errors:\n{error_msg}")
+        else:
+            messagebox.showinfo(f"{title} Success", f"{done_count} codes {success_text}")
+
+    def schedule_search(self, *_):
+        # Debounce: only the last change within SEARCH_DEBOUNCE_MS triggers a query
+        if self.search_after_id is not None:
+            self.master.after_cancel(self.search_after_id)
+        self.search_after_id = self.master.after(SEARCH_DEBOUNCE_MS, self.apply_search)
+
+    def apply_search(self):
+        self.search_after_id = None
+        filters = {}
+
+        text = self.search_var.get().strip()
+        if text:
+            key = 'data_prefix' if self.search_mode_var.get() == 'Starts with' else 'data_contains'
+            filters[key] = text
+        if self.search_type_var.get() != 'All':
+            filters['type'] = self.search_type_var.get()
+
+        try:
+            date_from = self.search_from_var.get().strip()
+            if date_from:
+                filters['date_from'] = datetime.datetime.strptime(date_from, "%Y-%m-%d")
+            date_to = self.search_to_var.get().strip()
+            if date_to:
+                # Inclusive end date: everything before the following midnight
+                filters['date_to'] = datetime.datetime.strptime(date_to, "%Y-%m-%d") + datetime.timedelta(days=1)
+        except ValueError:
+            self.search_status.config(text="Dates must be YYYY-MM-DD", foreground='red')
+            return
+
+        self.search_status.config(text="Filtered" if filters else "Dates: YYYY-MM-DD", foreground='')
+        self.code_pager.set_filters(filters or None)
+
+    def handle_clear_search(self):
+        for var in (self.search_var, self.search_from_var, self.search_to_var):
+            var.set("")
+        self.search_mode_var.set('Contains')
+        self.search_type_var.set('All')
 
     def handle_view_image(self):
         selected_item = self.tree.focus()
@@ -469,15 +1069,16 @@ class CodeManagerApp:
             return
 
         item_values = self.tree.item(selected_item, 'values')
-        image_path = item_values[4]
+        # Codes from lazy batches are rendered on first use; SVG codes are shown through a PNG copy
+        image_path = (db_utils.ensure_code_image(item_values[1], item_values[2], item_values[4], raster=True)
+                      or item_values[4])
 
         if os.path.exists(image_path):
             try:
                 img_window = tk.Toplevel(self.master)
                 img_window.title(f"Code Image: ID {item_values[0]}")
 
-                img = Image.open(image_path)
-                img = img.resize((300, 300), Image.LANCZOS)
+                img = self.thumbnails.get(image_path, (300, 300))
 
                 self.temp_tkimage = ImageTk.PhotoImage(img)
 
@@ -497,7 +1098,7 @@ class CodeManagerApp:
             return
 
         item_values = self.tree.item(selected_item, 'values')
-        source_path = item_values[4]
+        source_path = db_utils.ensure_code_image(item_values[1], item_values[2], item_values[4]) or item_values[4]
 
         if not os.path.exists(source_path):
             messagebox.showerror("File Error", f"Image file not found at path:\n{source_path}")
@@ -511,7 +1112,7 @@ class CodeManagerApp:
         save_path = filedialog.asksaveasfilename(
             defaultextension=ext,
             initialfile=suggested_name,
-            filetypes=[("PNG files", "*.png"), ("All files", "*.*")],
+            filetypes=[("PNG files", "*.png"), ("SVG files", "*.svg"), ("All files", "*.*")],
             title="Export Code Image As"
         )
 
@@ -523,31 +1124,127 @@ class CodeManagerApp:
                 messagebox.showerror("Export Failed", f"Could not export file:\n{e}")
 
     def handle_print_selected_code(self):
-        selected_item = self.tree.focus()
-        if not selected_item:
-            messagebox.showwarning("Selection Error", "Please select a code from the list to print.")
+        selected_items = self.tree.selection() or ((self.tree.focus(),) if self.tree.focus() else ())
+        if not selected_items:
+            messagebox.showwarning("Selection Error", "Please select one or more codes from the list to print.")
             return
 
-        item_values = self.tree.item(selected_item, 'values')
-        image_path = item_values[4]
-        printer_name = self.printer_var.get()
+        printer_name = self.selected_printer()
+        if printer_name is None:
+            return
 
-        if not os.path.exists(image_path):
-            messagebox.showerror("File Error", f"Image file not found at path:\n{image_path}")
+        records = [self.tree.item(item, 'values') for item in selected_items]
+        self.print_status_label.config(text=f"Queueing {len(records)} print job(s)...")
+        self.tasks.submit(self.queue_print_jobs, records, printer_name, on_done=self.finish_print_selected_code)
+
+    def queue_print_jobs(self, records, printer_name):
+        # Runs on a worker thread: lazy images are rendered and each job is recorded before it is queued
+        queued, errors = 0, []
+        for item_values in records:
+            image_path = (db_utils.ensure_code_image(item_values[1], item_values[2], item_values[4], raster=True)
+                          or item_values[4])
+            if not os.path.exists(image_path):
+                errors.append(f"Image file not found at path: {image_path}")
+                continue
+            try:
+                self.print_queue.submit(image_path, printer_name)
+                queued += 1
+            except db_utils.StorageError as e:
+                errors.append(f"Could not queue {os.path.basename(image_path)}: {e}")
+        return queued, errors
+
+    def finish_print_selected_code(self, result):
+        queued, errors = result
+        self.print_status_label.config(text=f"{queued} print job(s) queued. See the Print Queue tab for progress.")
+
+        if errors:
+            error_msg = "\n".join(errors[:5])  # Show first 5 errors
+            messagebox.showerror("Printing Failed",
+                                 f"{len(errors)} code(s) could not be queued for printing.\nFirst few errors:\n{error_msg}")
+
+    # ----------------------------------------------------
+    # --- PRINT QUEUE TAB LAYOUT ---
+    # ----------------------------------------------------
+    def setup_tab_queue(self):
+        ttk.Label(self.tab_queue, text="Print Queue", font=('Arial', 14, 'bold')).pack(pady=10)
+
+        queue_frame = ttk.Frame(self.tab_queue)
+        queue_frame.pack(fill='both', expand=True, padx=10)
+
+        columns = ("Job", "Printer", "File", "Status", "Attempts", "Last Error")
+        self.queue_tree = ttk.Treeview(queue_frame, columns=columns, show='headings')
+        for column in columns:
+            self.queue_tree.heading(column, text=column)
+        self.queue_tree.column("Job", width=50, anchor='center')
+        self.queue_tree.column("Printer", width=120)
+        self.queue_tree.column("File", width=200)
+        self.queue_tree.column("Status", width=80, anchor='center')
+        self.queue_tree.column("Attempts", width=70, anchor='center')
+        self.queue_tree.column("Last Error", width=250)
+
+        queue_scroll = ttk.Scrollbar(queue_frame, orient='vertical', command=self.queue_tree.yview)
+        queue_scroll.pack(side='right', fill='y')
+        self.queue_tree.configure(yscrollcommand=queue_scroll.set)
+        self.queue_tree.pack(side='left', fill='both', expand=True)
+
+        button_frame = ttk.Frame(self.tab_queue)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Cancel Selected", command=self.handle_cancel_print_jobs).pack(side='left',
+                                                                                                     padx=5)
+        ttk.Button(button_frame, text="Retry Selected", command=self.handle_retry_print_jobs).pack(side='left',
+                                                                                                   padx=5)
+        ttk.Button(button_frame, text="Clear Finished", command=self.handle_clear_print_jobs).pack(side='left',
+                                                                                                   padx=5)
+
+        self.queue_rows = {}  # job id -> values currently shown
+        self.queue_view_version = None
+        self.refresh_queue_view()
+
+    def refresh_queue_view(self):
+        if self.print_queue.version != self.queue_view_version:
+            self.queue_view_version = self.print_queue.version
+            snapshot = self.print_queue.snapshot()
+            current_ids = {job[0] for job in snapshot}
+
+            for job_id in [job_id for job_id in self.queue_rows if job_id not in current_ids]:
+                self.queue_tree.delete(str(job_id))
+                del self.queue_rows[job_id]
+
+            # Oldest first, each new job inserted on top, so the newest ends up first
+            for job_id, printer, file_path, status, attempts, last_error in reversed(snapshot):
+                values = (job_id, printer, os.path.basename(file_path), status, attempts, last_error or "")
+                if job_id not in self.queue_rows:
+                    self.queue_tree.insert('', 0, iid=str(job_id), values=values)
+                elif self.queue_rows[job_id] != values:
+                    self.queue_tree.item(str(job_id), values=values)
+                self.queue_rows[job_id] = values
+
+        self.master.after(500, self.refresh_queue_view)
+
+    def selected_print_job_ids(self):
+        return [int(item) for item in self.queue_tree.selection()]
+
+    def handle_cancel_print_jobs(self):
+        job_ids = self.selected_print_job_ids()
+        if not job_ids:
+            messagebox.showwarning("Selection Error", "Please select one or more queued jobs to cancel.")
             return
+        self.tasks.submit(lambda: [self.print_queue.cancel(job_id) for job_id in job_ids])
 
-        if not printer_name or printer_name == "No Printers Found":
-            messagebox.showwarning("Printer Error",
-                                   "No printer is selected or detected. Please check your system settings.")
+    def handle_retry_print_jobs(self):
+        job_ids = self.selected_print_job_ids()
+        if not job_ids:
+            messagebox.showwarning("Selection Error", "Please select one or more failed or cancelled jobs to retry.")
             return
+        self.tasks.submit(lambda: [self.print_queue.retry(job_id) for job_id in job_ids])
 
-        success, message = db_utils.print_file_os(image_path, printer_name)
+    def handle_clear_print_jobs(self):
+        self.tasks.submit(db_utils.clear_finished_print_jobs, self.print_queue,
+                          on_error=lambda err: self.report_queue_error("Could not clear finished jobs", err))
 
-        if success:
-            messagebox.showinfo("Printing Success", f"Successfully sent file to printer.\n{message}")
-        else:
-            messagebox.showerror("Printing Failed",
-                                 f"Could not initiate printing. Please check permissions and the selected printer.\nError Details: {message}")
+    def report_queue_error(self, title, err):
+        if not isinstance(err, db_utils.StorageConnectionError):  # Nothing to show until configured
+            messagebox.showerror("DB Error", f"{title}: {err}")
 
     # ----------------------------------------------------
     # --- CRUD TAB LAYOUT (UPDATE/DELETE) ---
@@ -555,8 +1252,11 @@ class CodeManagerApp:
     def setup_tab_crud(self):
         ttk.Label(self.tab_crud, text="Edit or Delete Existing Codes", font=('Arial', 14, 'bold')).pack(pady=10)
 
-        self.crud_tree = ttk.Treeview(self.tab_crud, columns=("ID", "Type", "Data", "Date Created", "Path"),
-                                      show='headings')
+        crud_frame = ttk.Frame(self.tab_crud)
+        crud_frame.pack(fill='x', padx=10)
+
+        self.crud_tree = ttk.Treeview(crud_frame, columns=("ID", "Type", "Data", "Date Created", "Path"),
+                                      show='headings', selectmode='extended')
         self.crud_tree.heading("ID", text="ID")
         self.crud_tree.heading("Type", text="Type")
         self.crud_tree.heading("Data", text="Data")
@@ -567,7 +1267,11 @@ class CodeManagerApp:
         self.crud_tree.column("Date Created", width=150)
         self.crud_tree.column("Path", width=0, stretch=tk.NO)
 
-        self.crud_tree.pack(fill='x', padx=10)
+        crud_scroll = ttk.Scrollbar(crud_frame, orient='vertical')
+        crud_scroll.pack(side='right', fill='y')
+        self.crud_tree.pack(side='left', fill='x', expand=True)
+        self.crud_pager = PagedTreeview(self.crud_tree, crud_scroll, self.tasks, 'id',
+                                        "Failed to load records for CRUD")
         self.crud_tree.bind('<<TreeviewSelect>>', self.load_selected_record)
 
         ttk.Button(self.tab_crud, text="Refresh Records", command=self.update_crud_list).pack(pady=5)
@@ -594,34 +1298,17 @@ class CodeManagerApp:
 
         ttk.Button(action_frame, text="Update Record Data", command=self.handle_update_record).pack(side='left',
                                                                                                     padx=10, ipadx=10)
-        ttk.Button(action_frame, text="Delete Record", command=self.handle_delete_record).pack(side='left', padx=10,
-                                                                                               ipadx=10)
+        self.delete_button = ttk.Button(action_frame, text="Delete Selected", command=self.handle_delete_record)
+        self.delete_button.pack(side='left', padx=10, ipadx=10)
+        self.regenerate_button = ttk.Button(action_frame, text="Regenerate Selected",
+                                            command=self.handle_regenerate_selected)
+        self.regenerate_button.pack(side='left', padx=10, ipadx=10)
 
         self.update_crud_list()
 
     def update_crud_list(self):
-        for item in self.crud_tree.get_children():
-            self.crud_tree.delete(item)
-
-        conn = db_utils.get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            sql = "SELECT id, type, data, date_created, image_path FROM created_codes ORDER BY id DESC"
-            try:
-                cursor.execute(sql)
-                records = cursor.fetchall()
-
-                for rec in records:
-                    date_str = rec[3].strftime("%Y-%m-%d %H:%M:%S")
-                    self.crud_tree.insert('', 'end', values=(rec[0], rec[1], rec[2], date_str, rec[4]))
-
-            except mysql.connector.Error as err:
-                messagebox.showerror("DB Error", f"Failed to load records for CRUD: {err}")
-            finally:
-                cursor.close()
-                conn.close()
-
-        self.update_code_list()
+        if self.crud_pager is not None:
+            self.crud_pager.reload()
 
     def load_selected_record(self, event):
         selected_item = self.crud_tree.focus()
@@ -667,48 +1354,81 @@ class CodeManagerApp:
 
         if success:
             messagebox.showinfo("Success", f"Record ID {record_id} updated and image regenerated successfully!")
-            self.update_crud_list()
+            self.refresh_code_lists()
         else:
             messagebox.showerror("Update Failed", f"Update failed. Error: {result_msg}")
 
-    def handle_delete_record(self):
-        record_id = self.crud_id.cget("text")
+    def handle_regenerate_selected(self):
+        """Re-renders the images of all selected records with the current render settings."""
+        selected_items = self.crud_tree.selection()
+        if not selected_items:
+            messagebox.showwarning("Selection Error", "Please select one or more records to regenerate.")
+            return
 
-        if not record_id:
-            messagebox.showwarning("Input Error", "Please select a record to delete.")
+        ids = [int(self.crud_tree.item(item, 'values')[0]) for item in selected_items]
+        if not messagebox.askyesno("Confirm Regenerate",
+                                   f"Re-render the images of {len(ids)} selected records with the current settings?"):
             return
 
-        if not messagebox.askyesno("Confirm Delete",
-                                   f"Are you sure you want to permanently delete Record ID {record_id}?"):
+        self.regenerate_button.config(state='disabled')
+        self.tasks.submit(db_utils.regenerate_codes, ids=ids,
+                          on_done=lambda result: self.finish_regenerate(len(ids), result),
+                          on_error=lambda err: self.finish_regenerate(len(ids), (0, [f"Regenerate failed: {err}"])))
+
+    def finish_regenerate(self, total_count, result):
+        regenerated_count, errors = result
+        self.regenerate_button.config(state='normal')
+
+        if errors:
+            error_msg = "\n".join(errors[:5])
+            messagebox.showwarning("Regenerate Finished with Errors",
+                                   f"{regenerated_count} of {total_count} records regenerated.\n"
+                                   f"First few errors:\n{error_msg}")
+        else:
+            messagebox.showinfo("Success", f"{regenerated_count} records regenerated.")
+        self.refresh_code_lists()
+
+    def handle_delete_record(self):
+        """Deletes all selected records and their image files (Shift/Ctrl-click to select several)."""
+        selected_items = self.crud_tree.selection()
+        if not selected_items:
+            messagebox.showwarning("Input Error", "Please select one or more records to delete.")
             return
 
-        selected_item = self.crud_tree.focus()
-        image_path = self.crud_tree.item(selected_item, 'values')[4] if selected_item else None
+        ids = [int(self.crud_tree.item(item, 'values')[0]) for item in selected_items]
+        if len(ids) == 1:
+            prompt = f"Are you sure you want to permanently delete Record ID {ids[0]}?"
+        else:
+            prompt = f"Are you sure you want to permanently delete {len(ids)} records and their image files?"
+        if not messagebox.askyesno("Confirm Delete", prompt):
+            return
 
-        conn = db_utils.get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            sql = "DELETE FROM created_codes WHERE id = %s"
-            try:
-                cursor.execute(sql, (record_id,))
-                conn.commit()
-
-                file_msg = ""
-                if image_path and os.path.exists(image_path):
-                    os.remove(image_path)
-                    file_msg = "\n(Associated file deleted.)"
-
-                messagebox.showinfo("Success", f"Record ID {record_id} deleted successfully!" + file_msg)
-                self.update_crud_list()
-                self.crud_id.config(text="")
-                self.crud_type.config(text="")
-                self.crud_data_entry.delete(0, tk.END)
-
-            except mysql.connector.Error as err:
-                messagebox.showerror("DB Error", f"Failed to delete record: {err}")
-            finally:
-                cursor.close()
-                conn.close()
+        self.delete_button.config(state='disabled')
+        self.tasks.submit(db_utils.delete_code_records, ids=ids,
+                          on_done=self.finish_delete_records,
+                          on_error=lambda err: self.finish_delete_records(([], [f"Failed to delete records: {err}"])))
+
+    def finish_delete_records(self, result):
+        deleted_ids, errors = result
+        self.delete_button.config(state='normal')
+
+        # Take the deleted rows out of both lists instead of reloading them
+        self.crud_pager.remove_records(deleted_ids)
+        if self.code_pager is not None:
+            self.code_pager.remove_records(deleted_ids)
+        if self.crud_id.cget("text") in {str(record_id) for record_id in deleted_ids}:
+            self.crud_id.config(text="")
+            self.crud_type.config(text="")
+            self.crud_data_entry.delete(0, tk.END)
+
+        if errors:
+            error_msg = "\n".join(errors[:5])
+            messagebox.showwarning("Delete Finished with Errors",
+                                   f"{len(deleted_ids)} records deleted.\nFirst few errors:\n{error_msg}")
+        elif len(deleted_ids) == 1:
+            messagebox.showinfo("Success", f"Record ID {deleted_ids[0]} deleted successfully!")
+        else:
+            messagebox.showinfo("Success", f"{len(deleted_ids)} records and their image files deleted.")
 
 
 if __name__ == '__main__':
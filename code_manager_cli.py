@@ -0,0 +1,422 @@
+"""
+Headless command line interface for generating, exporting, backing up and
+printing codes without the Tk GUI. Uses the same config.ini, storage backend
+and codes_generated folder as the app (relative to the working directory).
+
+    python -m code_manager_cli qr "https://example.com" --name example
+    python -m code_manager_cli wifi MyNetwork secret --name guest_wifi
+    python -m code_manager_cli barcode INV-0042 --name inv42
+    python -m code_manager_cli batch qr --prefix ITEM- --start 1 --end 5000 --pad 5
+    python -m code_manager_cli batch barcode --prefix INV- --start 1 --end 500 --format svg
+    python -m code_manager_cli jobs
+    python -m code_manager_cli resume 12 --progress
+    python -m code_manager_cli export codes.zip --type QR --contains ITEM- --manifest json
+    python -m code_manager_cli export batch12.zip --job 12
+    python -m code_manager_cli labels sheets.pdf --from 2024-01-01 --to 2024-02-01
+    python -m code_manager_cli labels --print --job 12 --printer Office
+    python -m code_manager_cli regenerate --starts-with SKU- --replace SKU- ITEM-
+    python -m code_manager_cli delete --job 12
+    python -m code_manager_cli backup
+    python -m code_manager_cli print codes_generated/inv42_BAR.png --printer Office
+
+Libraries are imported per command (db_utils itself defers qrcode,
+python-barcode and PIL), so commands that do not render start quickly.
+Exit status is 0 on success, 1 on failure and 2 on invalid arguments.
+"""
+import argparse
+import datetime
+import sys
+import time
+
+
+def load_db_utils():
+    import db_utils
+    return db_utils
+
+
+def fail(message):
+    print(message, file=sys.stderr)
+    return 1
+
+
+class SelectionError(Exception):
+    """Raised when the records a command should work on cannot be determined."""
+
+
+def confirm(question):
+    """Asks a yes/no question on the terminal; without one (e.g. in cron jobs) the answer is no."""
+    if not sys.stdin.isatty():
+        print(f"{question} Pass --yes to confirm.", file=sys.stderr)
+        return False
+    return input(f"{question} [y/N] ").strip().lower() in ('y', 'yes')
+
+
+def report_errors(errors, limit=20):
+    for error in errors[:limit]:
+        print(f"  {error}", file=sys.stderr)
+    if len(errors) > limit:
+        print(f"  ... and {len(errors) - limit} more.", file=sys.stderr)
+
+
+def parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}; expected YYYY-MM-DD")
+
+
+def selection(args):
+    """
+    Returns (ids, filters) from the --ids, --job and search options. Raises
+    SelectionError if the batch job cannot be loaded.
+    """
+    if args.ids:
+        return args.ids, None
+    if args.job is not None:
+        utils = load_db_utils()
+        try:
+            return utils.batch_job_code_ids(args.job), None
+        except ValueError as e:
+            raise SelectionError(str(e))
+        except utils.StorageError as e:
+            raise SelectionError(f"Could not load batch job {args.job}: {e}")
+    filters = {}
+    if args.type:
+        filters['type'] = args.type
+    if args.contains:
+        filters['data_contains'] = args.contains
+    if args.starts_with:
+        filters['data_prefix'] = args.starts_with
+    if args.date_from:
+        filters['date_from'] = args.date_from
+    if args.date_to:
+        filters['date_to'] = args.date_to + datetime.timedelta(days=1)  # --to is inclusive
+    return None, filters
+
+
+def batch_progress(args, total, started):
+    """Returns a progress callback that reports on stderr about once a second with --progress."""
+    last_report = [started]
+
+    def progress(done):
+        now = time.monotonic()
+        if args.progress and (now - last_report[0] >= 1.0 or done == total):
+            last_report[0] = now
+            print(f"{done}/{total} codes ({done / max(now - started, 1e-9):.1f} codes/s)", file=sys.stderr)
+
+    return progress
+
+
+# --- COMMANDS ---
+
+def cmd_setup(args):
+    utils = load_db_utils()
+    if args.remove_duplicates:
+        success, message = utils.remove_duplicate_codes()
+    else:
+        success, message = utils.setup_database_tables()
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_single(args):
+    utils = load_db_utils()
+    if args.command == 'wifi':
+        data = utils.format_wifi_payload(args.ssid, args.password, args.auth)
+    else:
+        data = args.data
+
+    generate = utils.generate_barcode if args.command == 'barcode' else utils.generate_qr
+    path = generate(data, args.name)
+    if not path:
+        return fail(f"Failed to generate the code for: {data}")
+    print(path)
+    return 0
+
+
+def cmd_batch(args):
+    if args.start <= 0 or args.end < args.start or args.pad <= 0:
+        return fail("--start and --pad must be positive and --end must not be below --start.")
+
+    code_type = 'QR' if args.code_type == 'qr' else 'BAR'
+    total = args.end - args.start + 1
+    started = time.monotonic()
+
+    try:
+        generated, errors = load_db_utils().generate_batch_codes(
+            code_type, args.prefix, args.start, args.end, args.pad, args.suffix, workers=args.workers,
+            progress=batch_progress(args, total, started), lazy=True if args.lazy else None,
+            output_format=args.format)
+    except KeyboardInterrupt:
+        return fail("Interrupted; see 'jobs' and 'resume'.")
+
+    print(f"Generated {generated} of {total} codes in {time.monotonic() - started:.1f}s.")
+    if errors:
+        report_errors(errors)
+        return 1
+    return 0
+
+
+def cmd_jobs(args):
+    utils = load_db_utils()
+    try:
+        jobs = utils.list_batch_jobs(None if args.all else utils.UNFINISHED_JOB_STATES, limit=args.limit)
+    except utils.StorageError as e:
+        return fail(f"Could not list batch jobs: {e}")
+    for job in jobs:
+        print(job.describe())
+        if job.last_error:
+            print(f"  last error: {job.last_error}")
+    if not jobs:
+        print("No batch jobs." if args.all else "No unfinished batch jobs.")
+    return 0
+
+
+def cmd_resume(args):
+    started = time.monotonic()
+    utils = load_db_utils()
+    try:
+        job = utils.load_batch_job(args.job_id)
+    except utils.StorageError as e:
+        return fail(f"Could not load batch job {args.job_id}: {e}")
+    if job is None:
+        return fail(f"Batch job {args.job_id} not found.")
+    pending = job.end_num - job.resume_from + 1
+
+    try:
+        generated, errors = utils.resume_batch_job(args.job_id, workers=args.workers,
+                                                   progress=batch_progress(args, pending, started))
+    except KeyboardInterrupt:
+        return fail("Interrupted; run resume again to continue.")
+
+    print(f"Generated {generated} codes in {time.monotonic() - started:.1f}s.")
+    if errors:
+        report_errors(errors)
+        return 1
+    return 0
+
+
+def cmd_export(args):
+    ids, filters = selection(args)
+    exported, errors = load_db_utils().export_code_archive(args.archive, args.manifest, ids=ids, filters=filters)
+    if not exported:
+        report_errors(errors or ["No codes matched."])
+        return 1
+    print(f"Exported {exported} codes to {args.archive}.")
+    report_errors(errors)
+    return 0
+
+
+def cmd_labels(args):
+    ids, filters = selection(args)
+    utils = load_db_utils()
+    if args.print:
+        placed, errors = utils.print_label_sheets(args.printer, ids=ids, filters=filters)
+        target = "the printer"
+    else:
+        placed, errors = utils.compose_label_sheets(args.pdf, ids=ids, filters=filters)
+        target = args.pdf
+    if not placed:
+        report_errors(errors or ["No codes matched."])
+        return 1
+    print(f"Placed {placed} labels on sheets sent to {target}.")
+    report_errors(errors)
+    return 0
+
+
+def cmd_regenerate(args):
+    ids, filters = selection(args)
+    utils = load_db_utils()
+    if ids is None:
+        if not filters and not args.all:
+            return fail("Select the records to regenerate (--ids, --job or search options), or pass --all.")
+        if not args.yes and not confirm(f"Regenerate {utils.count_code_records(filters)} codes?"):
+            return fail("Nothing was regenerated.")
+
+    def rewrite(data):
+        return data.replace(*args.replace)
+
+    started = time.monotonic()
+    total = len(ids) if ids is not None else utils.count_code_records(filters)
+    try:
+        regenerated, errors = utils.regenerate_codes(ids=ids, filters=filters,
+                                                     rewrite=rewrite if args.replace else None, workers=args.workers,
+                                                     progress=batch_progress(args, total, started))
+    except KeyboardInterrupt:
+        return fail("Interrupted.")
+
+    print(f"Regenerated {regenerated} of {total} codes in {time.monotonic() - started:.1f}s.")
+    if errors:
+        report_errors(errors)
+        return 1
+    return 0
+
+
+def cmd_delete(args):
+    ids, filters = selection(args)
+    utils = load_db_utils()
+    if ids is None:
+        if not filters and not args.all:
+            return fail("Select the records to delete (--ids, --job or search options), or pass --all.")
+        # Search options match loosely, so show how much they select before anything is deleted
+        if not args.yes and not confirm(f"Delete {utils.count_code_records(filters)} codes and their image files?"):
+            return fail("Nothing was deleted.")
+
+    deleted, errors = utils.delete_code_records(ids=ids, filters=filters)
+    print(f"Deleted {len(deleted)} codes and their image files.")
+    if args.job is not None and not args.ids and not errors:
+        try:
+            utils.drop_batch_job(args.job)
+        except utils.StorageError as e:
+            errors.append(f"Could not remove batch job {args.job}: {e}")
+    if errors:
+        report_errors(errors)
+        return 1
+    return 0
+
+
+def cmd_backup(args):
+    success, message = load_db_utils().backup_database()
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_print(args):
+    utils = load_db_utils()
+    if args.list_printers:
+        for printer in utils.get_installed_printers():
+            print(printer)
+        return 0
+    if not args.files:
+        return fail("Nothing to print; pass one or more image files.")
+
+    status = 0
+    for file_path in args.files:
+        success, message = utils.print_file_os(file_path, args.printer)
+        print(f"{file_path}: {message}", file=sys.stdout if success else sys.stderr)
+        if not success:
+            status = 1
+    return status
+
+
+# --- ARGUMENT PARSING ---
+
+def add_selection_arguments(parser):
+    group = parser.add_argument_group("selection (default: all codes)")
+    group.add_argument('--ids', type=int, nargs='+', help="record ids to include (ignores the search options)")
+    group.add_argument('--job', type=int, help="exactly the codes of this batch job, see jobs --all (ignores the "
+                                               "search options)")
+    group.add_argument('--type', choices=['QR', 'BAR'])
+    group.add_argument('--contains', help="data contains this text")
+    group.add_argument('--starts-with', help="data starts with this text")
+    group.add_argument('--from', dest='date_from', type=parse_date, help="created on or after YYYY-MM-DD")
+    group.add_argument('--to', dest='date_to', type=parse_date, help="created on or before YYYY-MM-DD")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m code_manager_cli',
+                                     description="Generate, export, back up and print codes without the GUI.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('setup', help="create the database and tables / apply migrations")
+    command.add_argument('--remove-duplicates', action='store_true',
+                         help="back up the database, then delete older records that share an image file with a "
+                              "newer one (needed before the image_path index can be created)")
+    command.set_defaults(func=cmd_setup)
+
+    command = commands.add_parser('qr', help="generate a single QR code")
+    command.add_argument('data')
+    command.add_argument('--name', required=True, help="file name (without the _QR.png suffix)")
+    command.set_defaults(func=cmd_single)
+
+    command = commands.add_parser('wifi', help="generate a Wi-Fi configuration QR code")
+    command.add_argument('ssid')
+    command.add_argument('password', nargs='?', default="")
+    command.add_argument('--auth', choices=['WPA/WPA2', 'WEP', 'None'], default='WPA/WPA2')
+    command.add_argument('--name', required=True, help="file name (without the _QR.png suffix)")
+    command.set_defaults(func=cmd_single)
+
+    command = commands.add_parser('barcode', help="generate a single Code 128 barcode")
+    command.add_argument('data')
+    command.add_argument('--name', required=True, help="file name (without the _BAR.png suffix)")
+    command.set_defaults(func=cmd_single)
+
+    command = commands.add_parser('batch', help="generate a numbered batch of codes")
+    command.add_argument('code_type', choices=['qr', 'barcode'])
+    command.add_argument('--prefix', default="")
+    command.add_argument('--suffix', default="", help="appended to the data (not the file name)")
+    command.add_argument('--start', type=int, required=True)
+    command.add_argument('--end', type=int, required=True)
+    command.add_argument('--pad', type=int, default=4, help="zero-pad numbers to this many digits")
+    command.add_argument('--workers', type=int, help="render processes (default: [batch] workers)")
+    command.add_argument('--lazy', action='store_true', help="record metadata only; render images on first use")
+    command.add_argument('--format', choices=['png', 'png1', 'svg'],
+                         help="image format: as-rendered PNG, 1-bit PNG or SVG (default: [rendering] output_format)")
+    command.add_argument('--progress', action='store_true', help="report progress on stderr")
+    command.set_defaults(func=cmd_batch)
+
+    command = commands.add_parser('jobs', help="list unfinished batch jobs")
+    command.add_argument('--all', action='store_true', help="include finished jobs")
+    command.add_argument('--limit', type=int, default=50)
+    command.set_defaults(func=cmd_jobs)
+
+    command = commands.add_parser('resume', help="continue an unfinished batch job from its last checkpoint")
+    command.add_argument('job_id', type=int)
+    command.add_argument('--workers', type=int, help="render processes (default: [batch] workers)")
+    command.add_argument('--progress', action='store_true', help="report progress on stderr")
+    command.set_defaults(func=cmd_resume)
+
+    command = commands.add_parser('export', help="export code images and a manifest to a ZIP/TAR archive")
+    command.add_argument('archive', help="output .zip, .tar or .tar.gz file")
+    command.add_argument('--manifest', choices=['csv', 'json'], default='csv')
+    add_selection_arguments(command)
+    command.set_defaults(func=cmd_export)
+
+    command = commands.add_parser('labels', help="lay codes out on label sheets (see [labels] in config.ini)")
+    command.add_argument('pdf', nargs='?', help="output PDF file")
+    command.add_argument('--print', action='store_true', help="send the sheets to the printer instead")
+    command.add_argument('--printer', help="printer name (default printer if omitted)")
+    add_selection_arguments(command)
+    command.set_defaults(func=cmd_labels)
+
+    command = commands.add_parser('regenerate', help="re-render codes with the current settings, optionally "
+                                                     "rewriting their data")
+    command.add_argument('--replace', nargs=2, metavar=('OLD', 'NEW'), help="replace OLD with NEW in the data")
+    command.add_argument('--workers', type=int, help="render processes (default: [batch] workers)")
+    command.add_argument('--progress', action='store_true', help="report progress on stderr")
+    command.add_argument('--all', action='store_true', help="regenerate every code when no selection is given")
+    command.add_argument('--yes', action='store_true', help="do not ask before regenerating search matches or all codes")
+    add_selection_arguments(command)
+    command.set_defaults(func=cmd_regenerate)
+
+    command = commands.add_parser('delete', help="delete codes and their image files")
+    command.add_argument('--all', action='store_true', help="delete every code when no selection is given")
+    command.add_argument('--yes', action='store_true', help="do not ask before deleting search matches or all codes")
+    add_selection_arguments(command)
+    command.set_defaults(func=cmd_delete)
+
+    command = commands.add_parser('backup', help="back up the database")
+    command.set_defaults(func=cmd_backup)
+
+    command = commands.add_parser('print', help="send image files to a printer")
+    command.add_argument('files', nargs='*')
+    command.add_argument('--printer', help="printer name (default printer if omitted)")
+    command.add_argument('--list-printers', action='store_true', help="list the installed printers and exit")
+    command.set_defaults(func=cmd_print)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'labels' and not args.pdf and not args.print:
+        parser.error("labels needs an output PDF file or --print")
+    try:
+        return args.func(args)
+    except SelectionError as e:
+        return fail(str(e))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,24 @@
-import mysql.connector
 import datetime
+import functools
+import importlib.util
 import os
 import sys
-import qrcode
-from barcode import Code128
-from barcode.writer import ImageWriter
 import configparser
+import hashlib
+import io
+import shlex
 import subprocess
 import shutil
+import threading
+import time
+from collections import deque
+
+# qrcode, python-barcode, PIL (through labels) and the process pool are imported where
+# they are first needed, so headless commands only load what they use
+import metrics
+from exporter import write_code_archive
+from print_queue import PrintJob, PrintQueue, FAILED, FINISHED_STATES, PRINTING, QUEUED
+from storage import MySQLStorage, SQLiteStorage, StorageError, StorageConnectionError, chunked
 
 # Conditional import for Windows printing support
 if sys.platform.startswith('win'):
@@ -19,9 +30,96 @@ if sys.platform.startswith('win'):
 # --- GLOBAL CONSTANTS ---
 CONFIG_FILE = 'config.ini'
 CODES_DIR = 'codes_generated'
-
-# Ensure the storage directory exists
-os.makedirs(CODES_DIR, exist_ok=True)
+DELETE_THREADS = 8  # threads removing image files during a bulk delete
+
+# Defaults for the [batch] section of the config file
+DEFAULT_BATCH_CONFIG = {
+    'workers': '0',  # 0 = one worker process per CPU core
+    'chunk_size': '64',
+    'insert_chunk_size': '500',  # rows per multi-row INSERT / transaction
+    'lazy_render': 'no',  # yes = only record metadata; images are rendered on first use
+    'queue_size': '256'  # items buffered between batch pipeline stages
+}
+
+# Defaults for the [pool] section of the config file
+DEFAULT_POOL_CONFIG = {
+    'size': '5',  # maximum open connections
+    'timeout': '10'  # seconds to wait for a free connection
+}
+
+# Defaults for the [storage] section of the config file
+DEFAULT_STORAGE_CONFIG = {
+    'backend': 'mysql',  # mysql or sqlite
+    'sqlite_path': 'code_manager.db'
+}
+
+# Defaults for the [thumbnails] section of the config file
+DEFAULT_THUMBNAIL_CONFIG = {
+    'memory_mb': '32',  # in-memory budget for decoded preview thumbnails
+    'disk_mb': '64',  # budget for thumbnail files; least recently used ones are removed beyond it
+    'disk_dir': os.path.join(CODES_DIR, '.thumbnails')
+}
+
+# Defaults for the [labels] section of the config file
+DEFAULT_LABEL_CONFIG = {
+    'page_size': 'A4',  # A4, A5, Letter, Legal, or WIDTHxHEIGHT in mm
+    'dpi': '300',
+    'columns': '3',
+    'rows': '8',
+    'margin_mm': '10',
+    'spacing_mm': '2',  # gap between labels
+    'captions': 'yes'  # print the code data under each label
+}
+
+# Defaults for the [printing] section of the config file
+DEFAULT_PRINT_CONFIG = {
+    'workers': '2',  # print queue worker threads
+    'per_printer': '1',  # jobs spooled to one printer at the same time
+    'max_attempts': '3',
+    'retry_delay': '5',  # seconds before the first retry, doubled for each further one
+    'lpr_command': 'lpr',  # spooler commands (Linux/macOS); may point at stand-ins for testing
+    'lpstat_command': 'lpstat'
+}
+
+# Defaults for the [metrics] section of the config file
+DEFAULT_METRICS_CONFIG = {
+    'enabled': 'no',  # yes = time each generation, insert, regenerate, backup and print stage
+    'export_path': 'code_manager_metrics.prom',
+    'export_format': 'prometheus'  # prometheus (text exposition format) or json
+}
+
+# Defaults for the [rendering] section of the config file
+DEFAULT_RENDER_CONFIG = {
+    'barcode_renderer': 'fast',  # fast (NumPy, falls back to imagewriter without it) or imagewriter (python-barcode)
+    'barcode_glyph_cache': 'no',  # yes = compose fast barcode captions from cached glyphs; letters may shift a pixel
+    'output_format': 'png',  # png (as rendered), png1 (1-bit black and white PNG) or svg (vector)
+    'png_compress_level': '6'  # zlib level for PNG output, 0 (fastest) to 9 (smallest)
+}
+
+BARCODE_RENDERERS = ('fast', 'imagewriter')
+
+# File extension of each output format
+OUTPUT_FORMATS = {
+    'png': '.png',
+    'png1': '.png',
+    'svg': '.svg'
+}
+
+# Label sheet PDFs rendered for printing
+LABEL_SHEETS_DIR = os.path.join(CODES_DIR, '.label_sheets')
+
+# PNG copies of SVG codes for previews, label sheets and printing (relative to CODES_DIR)
+RASTER_SUBDIR = '.raster'
+
+# Everything besides the payload that affects a rendered image; part of the content hash
+RENDER_SETTINGS = {
+    'QR': 'qrcode version=1 box_size=10 border=4 fit png',
+    'BAR': 'code128 ImageWriter defaults png',
+    'BAR:fast': 'code128 ImageWriter layout grayscale png',
+    'BAR:fast:glyphs': 'code128 ImageWriter layout grayscale glyph-cache png',
+    'QR:svg': 'qrcode version=1 box_size=10 border=4 fit svg path',
+    'BAR:svg': 'code128 ImageWriter layout mm svg path'
+}
 
 
 # --- 1. CONFIGURATION AND DATABASE FUNCTIONS ---
@@ -35,17 +133,55 @@ def create_default_config():
         'password': '',
         'database': 'code_manager_db'
     }
+    config['batch'] = DEFAULT_BATCH_CONFIG
+    config['pool'] = DEFAULT_POOL_CONFIG
+    config['storage'] = DEFAULT_STORAGE_CONFIG
+    config['thumbnails'] = DEFAULT_THUMBNAIL_CONFIG
+    config['labels'] = DEFAULT_LABEL_CONFIG
+    config['printing'] = DEFAULT_PRINT_CONFIG
+    config['metrics'] = DEFAULT_METRICS_CONFIG
+    config['rendering'] = DEFAULT_RENDER_CONFIG
     with open(CONFIG_FILE, 'w') as configfile:
         config.write(configfile)
+    invalidate_config_cache()
 
 
-def load_config():
-    """Loads DB settings from the config file, creating a default if needed."""
+# Parsed config file, keyed by the file's (mtime, size) stamp
+_config_cache = {'stamp': None, 'config': None}
+
+
+def invalidate_config_cache():
+    """Forces the next config read to go back to disk."""
+    _config_cache['stamp'] = None
+
+
+def read_config():
+    """Returns the parsed config file, re-reading it only when the file changes."""
     if not os.path.exists(CONFIG_FILE):
         create_default_config()
 
-    config = configparser.ConfigParser()
-    config.read(CONFIG_FILE)
+    stat = os.stat(CONFIG_FILE)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if _config_cache['stamp'] != stamp:
+        config = configparser.ConfigParser()
+        config.read(CONFIG_FILE)
+        _config_cache['config'] = config
+        _config_cache['stamp'] = stamp
+    return _config_cache['config']
+
+
+def load_section(section, defaults):
+    """Returns a config section as a dict of strings, with defaults for missing keys."""
+    config = read_config()
+    settings = defaults.copy()
+    if config.has_section(section):
+        settings.update(config[section])
+    return settings
+
+
+def load_config():
+    """Loads DB settings from the config file, creating a default if needed."""
+    config = read_config()
 
     settings = {
         'host': config.get('mysql', 'host'),
@@ -56,135 +192,301 @@ def load_config():
     return settings
 
 
+def load_batch_config():
+    """Loads batch generation settings, falling back to defaults for missing keys."""
+    settings = load_section('batch', DEFAULT_BATCH_CONFIG)
+
+    workers = int(settings['workers'])
+    return {
+        'workers': workers if workers > 0 else (os.cpu_count() or 1),
+        'chunk_size': max(1, int(settings['chunk_size'])),
+        'insert_chunk_size': max(1, int(settings['insert_chunk_size'])),
+        'lazy_render': settings['lazy_render'].strip().lower() in ('1', 'yes', 'true', 'on'),
+        'queue_size': max(1, int(settings['queue_size']))
+    }
+
+
+def load_pool_config():
+    """Loads connection pool settings, falling back to defaults for missing keys."""
+    settings = load_section('pool', DEFAULT_POOL_CONFIG)
+    return {
+        'size': max(1, int(settings['size'])),
+        'timeout': float(settings['timeout'])
+    }
+
+
+def load_storage_config():
+    """Loads the storage backend selection, falling back to defaults for missing keys."""
+    settings = load_section('storage', DEFAULT_STORAGE_CONFIG)
+    backend = settings['backend'].strip().lower()
+    if backend not in ('mysql', 'sqlite'):
+        backend = 'mysql'
+    return {
+        'backend': backend,
+        'sqlite_path': settings['sqlite_path']
+    }
+
+
+def load_thumbnail_config():
+    """Loads preview thumbnail cache settings, falling back to defaults for missing keys."""
+    settings = load_section('thumbnails', DEFAULT_THUMBNAIL_CONFIG)
+    return {
+        'max_bytes': max(0, int(float(settings['memory_mb']) * 1024 * 1024)),
+        'disk_max_bytes': max(0, int(float(settings['disk_mb']) * 1024 * 1024)),
+        'disk_dir': settings['disk_dir']
+    }
+
+
+def load_label_config():
+    """Loads the label sheet layout, falling back to defaults for missing keys."""
+    from labels import parse_page_size
+
+    settings = load_section('labels', DEFAULT_LABEL_CONFIG)
+    return {
+        'page_size': parse_page_size(settings['page_size']),
+        'dpi': max(72, int(settings['dpi'])),
+        'columns': max(1, int(settings['columns'])),
+        'rows': max(1, int(settings['rows'])),
+        'margin_mm': max(0.0, float(settings['margin_mm'])),
+        'spacing_mm': max(0.0, float(settings['spacing_mm'])),
+        'captions': settings['captions'].strip().lower() in ('1', 'yes', 'true', 'on')
+    }
+
+
+def load_print_config():
+    """Loads print queue and spooler settings, falling back to defaults for missing keys."""
+    settings = load_section('printing', DEFAULT_PRINT_CONFIG)
+    return {
+        'workers': max(1, int(settings['workers'])),
+        'per_printer': max(1, int(settings['per_printer'])),
+        'max_attempts': max(1, int(settings['max_attempts'])),
+        'retry_delay': max(0.0, float(settings['retry_delay'])),
+        'lpr_command': shlex.split(settings['lpr_command']),
+        'lpstat_command': shlex.split(settings['lpstat_command'])
+    }
+
+
+def load_metrics_config():
+    """Loads instrumentation settings, falling back to defaults for missing keys."""
+    settings = load_section('metrics', DEFAULT_METRICS_CONFIG)
+    export_format = settings['export_format'].strip().lower()
+    return {
+        'enabled': settings['enabled'].strip().lower() in ('1', 'yes', 'true', 'on'),
+        'export_path': settings['export_path'],
+        'export_format': export_format if export_format in ('prometheus', 'json') else 'prometheus'
+    }
+
+
+def load_render_config():
+    """Loads image rendering settings, falling back to defaults for missing keys."""
+    settings = load_section('rendering', DEFAULT_RENDER_CONFIG)
+    renderer = settings['barcode_renderer'].strip().lower()
+    output_format = settings['output_format'].strip().lower()
+    return {
+        'barcode_renderer': renderer if renderer in BARCODE_RENDERERS else 'fast',
+        'barcode_glyph_cache': settings['barcode_glyph_cache'].strip().lower() in ('1', 'yes', 'true', 'on'),
+        'output_format': output_format if output_format in OUTPUT_FORMATS else 'png',
+        'png_compress_level': min(9, max(0, int(settings['png_compress_level'])))
+    }
+
+
 def save_config(settings):
-    """Saves updated DB settings to the config file."""
+    """Saves updated DB settings to the config file, keeping any other sections."""
     config = configparser.ConfigParser()
+    config.read(CONFIG_FILE)
     config['mysql'] = settings
     with open(CONFIG_FILE, 'w') as configfile:
         config.write(configfile)
+    invalidate_config_cache()
 
 
 # Load the initial configuration, accessible globally within this module
 DB_CONFIG = load_config()
+metrics.enable(load_metrics_config()['enabled'])
 
 
-def get_db_connection(use_db_name=True):
-    """Establishes and returns a database connection using current config."""
+# --- STORAGE BACKEND ---
+
+_storage_lock = threading.Lock()
+_storage = {'key': None, 'backend': None}
+
+
+def get_storage():
+    """
+    Returns the storage backend selected in the config, rebuilding it (and its
+    connection pool) when the relevant settings change. Pending schema
+    migrations are applied the first time a backend is used.
+    """
     global DB_CONFIG
 
-    # Reload config in case it was updated by the GUI
+    # Cheap when unchanged: the config is only re-parsed if the file changed
     DB_CONFIG = load_config()
-    connect_params = DB_CONFIG.copy()
+    storage_config = load_storage_config()
+    pool_config = load_pool_config()
 
-    if not use_db_name:
-        connect_params.pop('database', None)
+    if storage_config['backend'] == 'sqlite':
+        key = ('sqlite', storage_config['sqlite_path'])
+    else:
+        key = ('mysql', tuple(sorted(DB_CONFIG.items())), pool_config['size'], pool_config['timeout'])
+
+    with _storage_lock:
+        if _storage['key'] != key:
+            if _storage['backend'] is not None:
+                _storage['backend'].close()
+            if key[0] == 'sqlite':
+                _storage['backend'] = SQLiteStorage(storage_config['sqlite_path'])
+            else:
+                _storage['backend'] = MySQLStorage(DB_CONFIG, pool_config['size'], pool_config['timeout'])
+            _storage['key'] = key
+        backend = _storage['backend']
+
+        # Under the lock, so threads starting together never apply the same migration twice
+        if not backend.schema_checked:
+            try:
+                backend.migrate()
+                backend.schema_checked = True
+            except StorageConnectionError:
+                pass  # Retried on the next call; setup_database_tables() migrates as well
+            except StorageError as err:
+                # Needs the user to act (see setup_database_tables), so it is not retried on every call
+                backend.schema_checked = True
+                backend.schema_error = str(err)
+    return backend
 
-    if not connect_params.get('password'):
-        connect_params.pop('password', None)
 
+def get_db_connection(use_db_name=True):
+    """
+    Returns a DB-API connection for the configured backend, or None if it
+    cannot connect. Calling close() on a pooled connection returns it to the pool.
+    """
     try:
-        conn = mysql.connector.connect(**connect_params)
-
-        if use_db_name and conn.database is None:
-            conn.database = DB_CONFIG['database']
+        return get_storage().connect(use_db_name)
+    except Exception:
+        return None
 
-        return conn
 
-    except mysql.connector.Error:
-        return None
+def test_db_connection():
+    """Checks that the configured database can be reached. Returns (True/False, message)."""
+    return get_storage().test_connection()
 
 
-def setup_database_tables(db_config):
+def setup_database_tables():
     """Creates the database and necessary tables if they don't exist."""
-    conn = get_db_connection(use_db_name=False)
-    if not conn:
-        return False, "Cannot connect to MySQL server. Check configuration."
+    backend = get_storage()
+    with _storage_lock:
+        success, message = backend.setup()
+        if success:
+            backend.schema_checked, backend.schema_error = True, None
+    return success, message
 
-    try:
-        cursor = conn.cursor()
-
-        db_name = db_config['database']
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
-
-        conn.database = db_name
-
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS created_codes
-                       (
-                           id
-                           INT
-                           AUTO_INCREMENT
-                           PRIMARY
-                           KEY,
-                           type
-                           VARCHAR
-                       (
-                           10
-                       ) NOT NULL,
-                           data TEXT NOT NULL,
-                           image_path VARCHAR
-                       (
-                           255
-                       ) NOT NULL,
-                           date_created DATETIME NOT NULL
-                           )
-                       """)
-
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS scanned_codes
-                       (
-                           id
-                           INT
-                           AUTO_INCREMENT
-                           PRIMARY
-                           KEY,
-                           data
-                           TEXT
-                           NOT
-                           NULL,
-                           date_scanned
-                           DATETIME
-                           NOT
-                           NULL
-                       )
-                       """)
-
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return True, f"Database '{db_name}' and tables are ready!"
-
-    except mysql.connector.Error as err:
-        return False, f"Error setting up database: {err}"
-
-
-def backup_database(db_config):
-    """Performs a database backup using mysqldump."""
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = f"code_manager_backup_{timestamp}.sql"
 
+def schema_error():
+    """Returns why the automatic schema migration stopped (e.g. duplicate image paths), or None."""
+    return get_storage().schema_error
+
+
+def count_duplicate_codes():
+    """Returns the number of older records sharing an image_path with a newer one. Raises StorageError."""
+    return get_storage().count_duplicate_image_paths()
+
+
+def remove_duplicate_codes():
+    """
+    Backs up the database, then deletes every record but the newest per
+    image_path (the older ones point at a file that was overwritten) and
+    finishes the schema migrations. Nothing is deleted if the backup fails.
+    Returns (True/False, message).
+    """
+    success, backup_message = backup_database()
+    if not success:
+        return False, f"Duplicates were not removed because the backup failed: {backup_message}"
     try:
-        command = [
-            "mysqldump",
-            "-u", db_config['user'],
-        ]
-        if db_config['password']:
-            command.append(f"--password={db_config['password']}")
-
-        command.extend([
-            db_config['database'],
-            "-r", backup_file
-        ])
-
-        subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return True, f"Database backed up successfully to: {backup_file}"
-
-    except FileNotFoundError:
-        return False, "mysqldump command not found. Ensure XAMPP's MySQL bin folder is in your system PATH."
-    except subprocess.CalledProcessError as e:
-        return False, f"Error during backup: {e.stderr.decode()}"
-    except Exception as e:
-        return False, f"An unexpected error occurred: {e}"
+        removed = get_storage().remove_duplicate_image_paths()
+    except StorageError as err:
+        return False, f"{backup_message}\nRemoving duplicate records failed: {err}"
+    success, setup_message = setup_database_tables()
+    return success, f"{backup_message}\nRemoved {removed} older duplicate records.\n{setup_message}"
+
+
+def backup_database():
+    """Backs up the configured database (mysqldump for MySQL, a file copy for SQLite)."""
+    with metrics.span('backup') as span:
+        success, message = get_storage().backup()
+        if not success:
+            span.fail()
+    return success, message
+
+
+def drop_database():
+    """Permanently deletes the configured database. Raises StorageError on failure."""
+    backend = get_storage()
+    backend.drop()
+    # The dropped backend's pool is closed and its schema is gone; the next call builds and migrates a new one
+    with _storage_lock:
+        if _storage['backend'] is backend:
+            _storage['key'] = _storage['backend'] = None
+
+
+def fetch_code_page(order_by='date_created', after=None, before=None, limit=200, filters=None):
+    """
+    Returns one keyset-paginated page of code rows, newest first, plus the page
+    keys of its first and last rows: (rows, first_key, last_key). `filters` is
+    an optional search dict (type, date range, data prefix or substring).
+    """
+    storage = get_storage()
+    rows = storage.list_codes_page(order_by, after=after, before=before, limit=limit, filters=filters)
+    if not rows:
+        return rows, None, None
+    return rows, storage.page_key(order_by, rows[0]), storage.page_key(order_by, rows[-1])
+
+
+def delete_code_records(ids=None, filters=None, chunk_size=None, progress=None):
+    """
+    Deletes the selected records (`ids`), or all records matching the search
+    `filters`, with one DELETE ... IN transaction per `chunk_size` ids
+    (default: [batch] insert_chunk_size), and removes their image files from
+    a pool of DELETE_THREADS threads while the next chunk is deleted. Files
+    are only removed once their rows are gone. `progress(deleted_count)` is
+    called after each chunk. Returns (list_of_deleted_ids, list_of_errors).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    chunk_size = chunk_size or load_batch_config()['insert_chunk_size']
+    storage = get_storage()
+    deleted_ids = []
+    errors = []
+
+    def remove_file(image_path):
+        try:
+            os.remove(image_path)
+        except FileNotFoundError:
+            pass  # Never rendered (lazy batch) or already removed
+        except OSError as e:
+            return f"Could not delete {image_path}: {e}"
+        return None
+
+    with metrics.span('delete.bulk') as span:
+        try:
+            if ids is None:
+                ids = [row[0] for row in storage.iter_codes(filters=filters)]
+            with ThreadPoolExecutor(max_workers=DELETE_THREADS) as executor:
+                removals = []
+                for id_chunk in chunked(ids, chunk_size):
+                    try:
+                        rows = storage.delete_codes(id_chunk)
+                    except StorageError as e:
+                        errors.append(f"Failed to delete {len(id_chunk)} records: {e}")
+                        continue
+                    deleted_ids.extend(record_id for record_id, _ in rows)
+                    removals.extend(executor.submit(remove_file, image_path) for _, image_path in rows if image_path)
+                    if progress:
+                        progress(len(deleted_ids))
+                errors.extend(error for error in (future.result() for future in removals) if error)
+        except StorageError as e:
+            errors.append(f"Bulk delete failed: {e}")
+        if errors:
+            span.fail()
+    return deleted_ids, errors
 
 
 # --- 2. CODE GENERATION AND DATABASE STORAGE ---
@@ -198,57 +500,327 @@ def format_wifi_payload(ssid, password, auth_type):
     return payload
 
 
-def insert_code_metadata(type, data, image_path):
+def insert_code_metadata(type, data, image_path, content_hash=None):
     """Inserts metadata about the created code into the database."""
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        sql = """
-              INSERT INTO created_codes (type, data, image_path, date_created)
-              VALUES (%s, %s, %s, %s) \
-              """
-        now = datetime.datetime.now()
-        metadata_data = data[:250]
-        values = (type, metadata_data, image_path, now)
-        try:
-            cursor.execute(sql, values)
-            conn.commit()
-            return True
-        except mysql.connector.Error:
-            return False
-        finally:
-            cursor.close()
-            conn.close()
-    return False
+    content_hash = content_hash or compute_content_hash(type, data, output_format_for_path(image_path))
+    try:
+        with metrics.span('db.insert_code'):
+            get_storage().insert_code(type, data[:250], image_path, datetime.datetime.now(), content_hash)
+        return True
+    except StorageError:
+        return False
 
 
-def generate_qr(data, filename):
-    """Generates a single QR code image, saves it, and records metadata."""
+def code_image_path(code_type, filename, output_format=None):
+    """Returns the image path used for a code of the given type, file name and output format."""
+    output_format = output_format or load_render_config()['output_format']
+    return os.path.join(CODES_DIR, f"{filename}_{code_type}{OUTPUT_FORMATS[output_format]}")
+
+
+def output_format_for_path(image_path):
+    """
+    Returns the output format of an image path: 'svg' for .svg files, else
+    the configured PNG flavour ('png' or 'png1').
+    """
+    if image_path.lower().endswith(OUTPUT_FORMATS['svg']):
+        return 'svg'
+    output_format = load_render_config()['output_format']
+    return output_format if output_format != 'svg' else 'png'
+
+
+def write_image_file(full_path, image_bytes):
+    """Writes encoded image bytes to full_path."""
+    # Write beside the target and swap it in, so hard links to cached renders are never overwritten
+    with metrics.span('file.write'):
+        os.makedirs(os.path.dirname(full_path) or '.', exist_ok=True)
+        temp_path = f"{full_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(image_bytes)
+        os.replace(temp_path, full_path)
+
+
+def encode_png(img, bilevel=False, compress_level=None):
+    """
+    Encodes a PIL image as PNG bytes, thresholded to 1-bit black and white
+    if `bilevel`. `compress_level` (zlib, 0-9) defaults to the [rendering] setting.
+    """
+    if compress_level is None:
+        compress_level = load_render_config()['png_compress_level']
+    with metrics.span('png.encode'):
+        if bilevel and img.mode != '1':
+            img = img.convert('L').point(lambda value: 255 if value >= 128 else 0, '1')
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG', compress_level=compress_level)
+        return buffer.getvalue()
+
+
+def encode_qr(data, output_format=None):
+    """
+    Returns the encoded image of a QR code (PNG or SVG bytes).
+    Uses the NumPy rasterizer when NumPy is installed; both paths produce
+    identical images. `output_format` overrides the [rendering] setting.
+    """
+    output_format = output_format or load_render_config()['output_format']
     try:
-        qr = qrcode.QRCode(version=1, box_size=10, border=4)
-        qr.add_data(data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
+        import qr_raster
+    except ImportError:
+        qr_raster = None
+
+    if qr_raster is not None:
+        with metrics.span('qr.matrix'):
+            matrix = qr_raster.qr_matrix(data)
+        if output_format != 'svg':
+            with metrics.span('qr.image'):
+                img = qr_raster.rasterize(matrix, box_size=10, border=4)
+    else:
+        import qrcode
+
+        with metrics.span('qr.matrix'):
+            qr = qrcode.QRCode(version=1, box_size=10, border=4)
+            qr.add_data(data)
+            qr.make(fit=True)
+            matrix = qr.modules
+        if output_format != 'svg':
+            with metrics.span('qr.image'):
+                img = qr.make_image(fill_color="black", back_color="white").get_image()
+
+    if output_format == 'svg':
+        import svg_codes
+
+        with metrics.span('svg.encode'):
+            return svg_codes.qr_svg(matrix, box_size=10, border=4)
+    return encode_png(img, bilevel=output_format == 'png1')
+
+
+def render_qr(data, filename, output_format=None):
+    """Renders a QR code image to CODES_DIR without touching the database."""
+    output_format = output_format or load_render_config()['output_format']
+    full_path = code_image_path('QR', filename, output_format)
+    write_image_file(full_path, encode_qr(data, output_format))
+    return full_path
+
+
+@functools.lru_cache(maxsize=None)
+def numpy_available():
+    return importlib.util.find_spec('numpy') is not None
+
+
+def barcode_renderer(renderer=None):
+    """
+    Returns the barcode renderer to use: `renderer` if given, else the one
+    set in the [rendering] section. 'fast' falls back to 'imagewriter'
+    when NumPy is not installed.
+    """
+    renderer = renderer or load_render_config()['barcode_renderer']
+    if renderer not in BARCODE_RENDERERS:
+        raise ValueError(f"Unknown barcode renderer: {renderer}")
+    if renderer == 'fast' and not numpy_available():
+        return 'imagewriter'
+    return renderer
+
+
+def encode_barcode(data, output_format=None, renderer=None, glyph_cache=None):
+    """
+    Returns the encoded image of a Code128 barcode (PNG or SVG bytes).
+    `output_format`, `renderer` ('fast' or 'imagewriter') and `glyph_cache`
+    override the [rendering] settings for this call. Both renderers draw the
+    same bars and caption; the fast one produces a grayscale instead of an
+    RGB image. SVG output does not use either renderer.
+    """
+    output_format = output_format or load_render_config()['output_format']
+    if output_format == 'svg':
+        import svg_codes
+
+        with metrics.span('svg.encode'):
+            return svg_codes.code128_svg(data)
+
+    if barcode_renderer(renderer) == 'fast':
+        import code128_raster
+
+        if glyph_cache is None:
+            glyph_cache = load_render_config()['barcode_glyph_cache']
+        with metrics.span('barcode.image'):
+            img = code128_raster.default_renderer(glyph_cache).render(data)
+    else:
+        from barcode import Code128
+        from barcode.writer import ImageWriter
+
+        with metrics.span('barcode.image'):
+            img = Code128(data, writer=ImageWriter()).render()
+
+    return encode_png(img, bilevel=output_format == 'png1')
+
+
+def render_barcode(data, filename, renderer=None, glyph_cache=None, output_format=None):
+    """
+    Renders a Code128 barcode image to CODES_DIR without touching the database.
+    See encode_barcode for the options.
+    """
+    output_format = output_format or load_render_config()['output_format']
+    full_path = code_image_path('BAR', filename, output_format)
+    write_image_file(full_path, encode_barcode(data, output_format, renderer, glyph_cache))
+    return full_path
+
+
+def code_filename_from_path(image_path):
+    """Recovers the file name passed to the renderers from an image path."""
+    filename_base = os.path.splitext(os.path.basename(image_path))[0]
+    # Remove the code type suffix (_QR or _BAR)
+    if filename_base.endswith('_QR'):
+        return filename_base[:-3]
+    elif filename_base.endswith('_BAR'):
+        return filename_base[:-4]
+    return filename_base  # Fallback
+
+
+def render_settings(code_type, output_format='png'):
+    """Describes the renderer currently configured for code_type and output_format."""
+    if output_format == 'svg':
+        return RENDER_SETTINGS[f"{code_type}:svg"]
+    if code_type == 'BAR' and barcode_renderer() == 'fast':
+        settings = RENDER_SETTINGS['BAR:fast:glyphs' if load_render_config()['barcode_glyph_cache'] else 'BAR:fast']
+    else:
+        settings = RENDER_SETTINGS[code_type]
+    return f"{settings} 1-bit" if output_format == 'png1' else settings
+
 
-        full_path = os.path.join(CODES_DIR, f"{filename}_QR.png")
-        img.save(full_path)
+def compute_content_hash(code_type, data, output_format=None):
+    """Identifies a rendered image by code type, payload, render settings and output format."""
+    output_format = output_format or load_render_config()['output_format']
+    key = f"{code_type}\n{render_settings(code_type, output_format)}\n{data}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
 
-        insert_code_metadata('QR', data, full_path)
+
+def _link_or_copy(source, target):
+    """Points target at the same bytes as source, preferring a hard link."""
+    if os.path.exists(target) and os.path.samefile(source, target):
+        return  # Already linked; renaming a link onto itself would be a no-op
+
+    temp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    os.replace(temp_path, target)
+
+
+def find_rendered_image(content_hash):
+    """
+    Returns the image file of an existing record with the given content hash
+    (looked up through idx_created_codes_content_hash), or None. Records
+    whose file is gone (lazy or deleted) are skipped.
+    """
+    try:
+        with metrics.span('render_cache.lookup'):
+            image_paths = get_storage().image_paths_for_hash(content_hash)
+    except StorageError:
+        return None  # The cache is an optimisation; render instead
+    return next((path for path in image_paths if os.path.exists(path)), None)
+
+
+def prepare_code_image(code_type, data, filename, output_format=None, reuse=True):
+    """
+    Render half of render_cached: returns (full_path, image_bytes, source_path)
+    for a code. With `reuse`, a record already holding an identical render is
+    looked up first; image_bytes is then None and source_path is its file.
+    Nothing is written; see store_code_image.
+    """
+    output_format = output_format or load_render_config()['output_format']
+    full_path = code_image_path(code_type, filename, output_format)
+
+    if reuse:
+        source_path = find_rendered_image(compute_content_hash(code_type, data, output_format))
+        if source_path is not None:
+            return full_path, None, source_path
+    return full_path, ENCODERS[code_type](data, output_format), None
+
+
+def store_code_image(full_path, image_bytes, source_path):
+    """
+    Write half of render_cached: hard-links (or copies) the identical image
+    of another record into place when image_bytes is None, otherwise writes
+    the bytes.
+    """
+    if image_bytes is None:
+        os.makedirs(os.path.dirname(full_path) or '.', exist_ok=True)
+        with metrics.span('render_cache.link'):
+            _link_or_copy(source_path, full_path)
+        return
+    write_image_file(full_path, image_bytes)
+
+
+def render_cached(code_type, data, filename, output_format=None):
+    """
+    Produces the image for a code, reusing identical renders. Every record
+    stores the content hash of its image, so if another record already has
+    the same payload rendered with the same settings, its file is hard-linked
+    (or copied) into place instead of being rendered again. There is no
+    separate cache to prune: the shared bytes are freed with the last record
+    using them. `output_format` defaults to the [rendering] setting. Returns
+    the image path.
+    """
+    full_path, image_bytes, source_path = prepare_code_image(code_type, data, filename, output_format)
+    store_code_image(full_path, image_bytes, source_path)
+    return full_path
+
+
+def ensure_code_image(code_type, data, image_path, raster=False):
+    """
+    Returns the image path of a code, rendering it first if it was created
+    in lazy (metadata-only) mode. With `raster`, SVG codes are resolved to a
+    PNG copy (see raster_code_image) for consumers that need pixels.
+    Returns None if it cannot be rendered.
+    """
+    if raster and output_format_for_path(image_path) == 'svg':
+        return raster_code_image(code_type, data)
+    if os.path.exists(image_path):
+        return image_path
+    if code_type not in RENDERERS:
+        return None
+    try:
+        full_path = render_cached(code_type, data, code_filename_from_path(image_path),
+                                  output_format_for_path(image_path))
+    except Exception:
+        return None
+    return full_path if os.path.exists(full_path) else None
+
+
+def raster_code_image(code_type, data):
+    """
+    Returns a PNG of a code for previews, label sheets and printing, rendered
+    once into the RASTER_SUBDIR of CODES_DIR. Returns None if it cannot be rendered.
+    """
+    if code_type not in RENDERERS:
+        return None
+    filename = os.path.join(RASTER_SUBDIR, compute_content_hash(code_type, data, 'png'))
+    full_path = code_image_path(code_type, filename, 'png')
+    if os.path.exists(full_path):
+        return full_path
+    try:
+        full_path, image_bytes, _ = prepare_code_image(code_type, data, filename, 'png', reuse=False)
+        write_image_file(full_path, image_bytes)
         return full_path
     except Exception:
         return None
 
 
-def generate_barcode(data, filename):
-    """Generates a single Code128 barcode image, saves it, and records metadata."""
+def generate_qr(data, filename):
+    """Generates a single QR code image, saves it, and records metadata."""
     try:
-        code128 = Code128(data, writer=ImageWriter())
-        full_path_base = os.path.join(CODES_DIR, f"{filename}_BAR")
+        with metrics.span('generate.qr'):
+            full_path = render_cached('QR', data, filename)
+            insert_code_metadata('QR', data, full_path)
+        return full_path
+    except Exception:
+        return None
 
-        code128.save(full_path_base)
-        full_path = full_path_base + '.png'
 
-        insert_code_metadata('BAR', data, full_path)
+def generate_barcode(data, filename):
+    """Generates a single Code128 barcode image, saves it, and records metadata."""
+    try:
+        with metrics.span('generate.barcode'):
+            full_path = render_cached('BAR', data, filename)
+            insert_code_metadata('BAR', data, full_path)
         return full_path
     except Exception:
         return None
@@ -256,44 +828,492 @@ def generate_barcode(data, filename):
 
 # --- NEW FEATURE: BATCH GENERATION ---
 
-def generate_batch_codes(code_type, prefix, start_num, end_num, pad_length, data_suffix=""):
+RENDERERS = {
+    'QR': render_qr,
+    'BAR': render_barcode
+}
+
+ENCODERS = {
+    'QR': encode_qr,
+    'BAR': encode_barcode
+}
+
+
+# Batch job states; every state but JOB_FINISHED can be resumed
+JOB_RUNNING = 'running'
+JOB_FINISHED = 'finished'
+JOB_INCOMPLETE = 'incomplete'
+JOB_CANCELLED = 'cancelled'
+UNFINISHED_JOB_STATES = (JOB_RUNNING, JOB_INCOMPLETE, JOB_CANCELLED)
+
+# Sequence numbers looked up in created_codes per query when resuming a job
+RESUME_WINDOW = 500
+
+
+def batch_item(prefix, number, pad_length, data_suffix=""):
+    """Returns the (data, filename) pair of one number in a batch sequence."""
+    num_str = str(number).zfill(pad_length)
+    # The render functions append the final _QR or _BAR suffix and extension
+    return f"{prefix}{num_str}{data_suffix}", f"{prefix}{num_str}"
+
+
+class BatchJob:
     """
-    Generates a batch of QR or Barcodes based on a numerical sequence.
-    Returns (generated_count, list_of_errors).
+    A batch_jobs record: the parameters of a batch and its high-water mark
+    (`committed_through`), the number up to which every code of the
+    sequence is recorded in created_codes. While the job runs, the mark is
+    moved forward in the same transaction as each chunk of codes.
     """
-    generated_count = 0
-    errors = []
 
-    if code_type == 'QR':
-        generator = generate_qr
-        code_suffix = "QR"
-    elif code_type == 'BAR':
-        generator = generate_barcode
-        code_suffix = "BAR"
-    else:
-        return 0, ["Invalid code type specified."]
+    def __init__(self, job_id, code_type, prefix, suffix, start_num, end_num, pad_length, output_format,
+                 lazy=False, status=JOB_RUNNING, committed_through=None, committed_count=0, last_error=None,
+                 created_at=None, updated_at=None):
+        self.id = job_id
+        self.code_type = code_type
+        self.prefix = prefix
+        self.suffix = suffix
+        self.start_num = start_num
+        self.end_num = end_num
+        self.pad_length = pad_length
+        self.output_format = output_format
+        self.lazy = bool(lazy)
+        self.status = status
+        self.committed_through = committed_through
+        self.committed_count = committed_count
+        self.last_error = last_error
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self._numbers = deque()  # sequence numbers of the items in the pipeline, in order
+        self._contiguous = True  # False once an item of this run was not recorded
+        self._exhausted = False  # True once the source of this run has produced every pending item
+
+    @property
+    def total_count(self):
+        return self.end_num - self.start_num + 1
+
+    @property
+    def resume_from(self):
+        """First sequence number above the high-water mark."""
+        return self.start_num if self.committed_through is None else self.committed_through + 1
+
+    def describe(self):
+        first = batch_item(self.prefix, self.start_num, self.pad_length, self.suffix)[0]
+        last = batch_item(self.prefix, self.end_num, self.pad_length, self.suffix)[0]
+        return (f"Job {self.id}: {self.code_type} {first} to {last} ({self.output_format}), "
+                f"{self.committed_count} of {self.total_count} recorded, {self.status}")
+
+    def code_ids(self):
+        """
+        Returns the ids of the created_codes rows of this job's sequence,
+        matched by their exact image paths with one IN query per
+        RESUME_WINDOW numbers. Raises StorageError on failure.
+        """
+        numbers = range(self.start_num, self.end_num + 1)
+        ids = []
+        for offset in range(0, len(numbers), RESUME_WINDOW):
+            paths = [code_image_path(self.code_type, batch_item(self.prefix, number, self.pad_length, self.suffix)[1],
+                                     self.output_format) for number in numbers[offset:offset + RESUME_WINDOW]]
+            ids.extend(get_storage().code_ids_for_image_paths(paths))
+        return ids
+
+    def pending_items(self, skip_recorded=False):
+        """
+        Source of a run: yields (data, filename) for the numbers above the
+        high-water mark. With `skip_recorded`, codes that already have a
+        created_codes row are left out, found with one indexed IN query per
+        RESUME_WINDOW numbers.
+        """
+        self._numbers.clear()
+        self._contiguous, self._exhausted = True, False
+        numbers = range(self.resume_from, self.end_num + 1)
+        for offset in range(0, len(numbers), RESUME_WINDOW):
+            window = [(number,) + batch_item(self.prefix, number, self.pad_length, self.suffix)
+                      for number in numbers[offset:offset + RESUME_WINDOW]]
+            paths = [code_image_path(self.code_type, filename, self.output_format) for _, _, filename in window]
+            recorded = get_storage().existing_image_paths(paths) if skip_recorded else ()
+            for (number, data, filename), path in zip(window, paths):
+                if path not in recorded:
+                    self._numbers.append(number)
+                    yield data, filename
+        self._exhausted = True
+
+    def commit_chunk(self, chunk):
+        """
+        Records one chunk of (data, path, error) results and moves the
+        high-water mark past them in one transaction. The mark stops at the
+        first code of the run that is not recorded, so a resume starts there.
+        Returns the database error message, or None.
+        """
+        numbers = [self._numbers.popleft() for _ in chunk]
+        committed_through = self.committed_through
+        for number, (data, path, error) in zip(numbers, chunk):
+            self._contiguous = self._contiguous and bool(path)
+            if self._contiguous:
+                committed_through = number
 
-    for i in range(start_num, end_num + 1):
+        now = datetime.datetime.now()
+        rows = [(self.code_type, data[:250], path, now, compute_content_hash(self.code_type, data, self.output_format))
+                for data, path, error in chunk if path]
         try:
-            # 1. Format the data string and filename number
-            num_str = str(i).zfill(pad_length)
-            data = f"{prefix}{num_str}{data_suffix}"
+            get_storage().insert_batch_job_chunk(self.id, rows, committed_through, now)
+        except StorageError as e:
+            self._contiguous = False
+            return f"Failed to insert {len(rows)} codes: {e}"
+        self.committed_through = committed_through
+        self.committed_count += len(rows)
+        return None
+
+    def complete(self):
+        """
+        Called when the pipeline has ended. If every pending item was produced
+        and recorded without gaps, the whole sequence is recorded (skipped
+        codes were already) and the mark moves to the end. Returns True if so.
+        """
+        if not (self._contiguous and self._exhausted and not self._numbers):
+            return False
+        self.committed_through = self.end_num
+        return True
+
+
+def iter_render_batch(code_type, items, output_format=None):
+    """
+    Render stage: renders (data, filename) items one by one in memory,
+    yielding (data, full_path, image_bytes, source_path, error) for the
+    file-writer stage (see prepare_code_image). Batch payloads are unique
+    sequence numbers, so no identical render is looked up.
+    """
+    for data, filename in items:
+        try:
+            with metrics.span('batch.render'):
+                full_path, image_bytes, source_path = prepare_code_image(code_type, data, filename, output_format,
+                                                                         reuse=False)
+            yield data, full_path, image_bytes, source_path, None
+        except Exception as e:
+            yield data, None, None, None, str(e)
 
-            # 2. Format the unique filename
-            # The generator functions append the final _QR.png or _BAR.png
-            filename = f"{prefix}{num_str}"
 
-            # 3. Generate and save
-            path = generator(data, filename)
+def iter_lazy_batch(code_type, items, output_format=None):
+    """
+    Metadata-first counterpart of iter_render_batch: yields the future image
+    path of each item with nothing to write. Payloads longer than the stored
+    metadata are rendered right away, since they could not be rebuilt later.
+    """
+    for data, filename in items:
+        if len(data) > 250:
+            yield from iter_render_batch(code_type, [(data, filename)], output_format)
+        else:
+            yield data, code_image_path(code_type, filename, output_format), None, None, None
+
+
+def render_batch_chunk(code_type, items, output_format=None):
+    """
+    Process-pool worker: renders one chunk of (data, filename) items.
+    Returns a list of iter_render_batch tuples in input order, and the
+    metrics recorded for the chunk (None when instrumentation is disabled).
+    """
+    if not metrics.enabled:
+        return list(iter_render_batch(code_type, items, output_format)), None
+
+    # Worker processes are reused across chunks, so only send this chunk's spans
+    metrics.REGISTRY.reset()
+    results = list(iter_render_batch(code_type, items, output_format))
+    return results, metrics.REGISTRY.snapshot()
+
+
+def _render_batch_parallel(code_type, items, workers, chunk_size, output_format=None, cancel_event=None):
+    """
+    Render stage spread over a process pool, yielding iter_render_batch
+    tuples in sequence order. Only a bounded window of chunks is in flight.
+    """
+    worker = functools.partial(render_batch_chunk, code_type, output_format=output_format)
+    return _map_chunks_parallel(worker, chunked(items, chunk_size), workers, cancel_event)
 
-            if path:
-                generated_count += 1
+
+def _map_chunks_parallel(worker, chunks, workers, cancel_event=None):
+    """
+    Runs `worker(chunk)` for each chunk in a process pool and yields the
+    items of the results in chunk order. The worker returns (results,
+    metrics snapshot or None), like render_batch_chunk. Only a bounded
+    window of chunks is in flight. Once `cancel_event` is set, no chunk is
+    submitted or yielded any more and chunks not yet started are cancelled.
+
+    Workers are spawned rather than forked, so they never inherit a copy of
+    the caller's threads, locks or database connections.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def chunk_results(future):
+        results, chunk_metrics = future.result()
+        if chunk_metrics:
+            metrics.REGISTRY.merge(chunk_metrics)
+        return results
+
+    max_in_flight = workers * 2
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=metrics.enable, initargs=(metrics.enabled,))
+    pending = deque()
+    try:
+        for chunk in chunks:
+            if cancelled():
+                break
+            pending.append(executor.submit(worker, chunk))
+            if len(pending) >= max_in_flight:
+                yield from chunk_results(pending.popleft())
+        while pending and not cancelled():
+            yield from chunk_results(pending.popleft())
+    finally:
+        # Reached early when the pipeline is stopped or cancelled; the results of running chunks are dropped
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_write_batch(rendered):
+    """File-writer stage: stores rendered images, yielding (data, path, error)."""
+    for data, full_path, image_bytes, source_path, error in rendered:
+        # Lazy items have nothing to store yet
+        if error is None and (image_bytes is not None or source_path is not None):
+            try:
+                store_code_image(full_path, image_bytes, source_path)
+            except OSError as e:
+                full_path, error = None, str(e)
+        yield data, full_path, error
+
+
+def iter_commit_batch(job, written, chunk_size):
+    """
+    Database stage: records written codes of `job` with one multi-row INSERT
+    per `chunk_size` items, checkpointing the job's high-water mark with each
+    chunk, and yields their (data, path, error) once committed. Codes whose
+    chunk could not be recorded get the database error.
+    """
+    for chunk in chunked(written, chunk_size):
+        db_error = job.commit_chunk(chunk)
+        for data, path, error in chunk:
+            if path and db_error:
+                yield data, None, db_error
             else:
-                errors.append(f"Failed to generate code for data: {data}")
+                yield data, path, error
 
-        except Exception as e:
-            errors.append(f"Exception for data {data}: {e}")
 
+def start_batch_job(code_type, prefix, start_num, end_num, pad_length, data_suffix="", lazy=None,
+                    output_format=None):
+    """
+    Records a new batch job in batch_jobs and returns its BatchJob.
+    `lazy` defaults to the [batch] section and `output_format` to [rendering].
+    Raises ValueError for an unknown code type or output format, and
+    StorageError if the job cannot be recorded.
+    """
+    if code_type not in RENDERERS:
+        raise ValueError("Invalid code type specified.")
+    output_format = output_format or load_render_config()['output_format']
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Invalid output format: {output_format}.")
+    lazy = load_batch_config()['lazy_render'] if lazy is None else lazy
+
+    job_id = get_storage().insert_batch_job(code_type, prefix, data_suffix, start_num, end_num, pad_length,
+                                            output_format, lazy, JOB_RUNNING, datetime.datetime.now())
+    return BatchJob(job_id, code_type, prefix, data_suffix, start_num, end_num, pad_length, output_format, lazy)
+
+
+def load_batch_job(job_id):
+    """Returns the BatchJob with the given id, or None. Raises StorageError on failure."""
+    row = get_storage().get_batch_job(job_id)
+    return BatchJob(*row) if row else None
+
+
+def batch_job_code_ids(job_id):
+    """
+    Returns the created_codes ids of a batch job's sequence (see
+    BatchJob.code_ids), the exact selection for exporting, printing or
+    deleting a batch. Raises ValueError if there is no such job and
+    StorageError on failure.
+    """
+    job = load_batch_job(job_id)
+    if job is None:
+        raise ValueError(f"Batch job {job_id} not found.")
+    return job.code_ids()
+
+
+def drop_batch_job(job_id):
+    """
+    Removes a batch job from batch_jobs once its codes were deleted, so it
+    is neither listed nor resumed any more. Raises StorageError on failure.
+    """
+    get_storage().delete_batch_job(job_id)
+
+
+def list_batch_jobs(statuses=UNFINISHED_JOB_STATES, limit=100):
+    """Returns BatchJobs, newest first (all states when `statuses` is None). Raises StorageError on failure."""
+    return [BatchJob(*row) for row in get_storage().list_batch_jobs(statuses, limit)]
+
+
+def save_batch_job(job):
+    """Persists the state and high-water mark of a batch job. Raises StorageError on failure."""
+    get_storage().update_batch_job(job.id, job.status, job.committed_through, job.last_error,
+                                   datetime.datetime.now())
+
+
+def run_batch_job(job, workers=None, chunk_size=None, insert_chunk_size=None, cancel_event=None, queue_size=None,
+                  resume=False):
+    """
+    Runs a batch job as a stream. Returns a generator of (data, image_path,
+    error) per item in sequence order, yielded once the item is rendered,
+    written and recorded (image_path is None on error).
+
+    The work runs as a pipeline (see pipeline.py): a producer of sequence
+    items, the render stage (a process pool when more than one worker is
+    configured, metadata only for lazy jobs), a file-writer thread and a
+    database committer using multi-row INSERTs of `insert_chunk_size` rows,
+    connected by queues of at most `queue_size` items. Stages overlap and
+    memory use does not grow with the batch size.
+
+    Only numbers above the job's high-water mark are produced; with `resume`,
+    codes already in created_codes are skipped as well. When the stream ends
+    the job is saved as finished, cancelled or incomplete.
+
+    Setting `cancel_event` stops rendering: items not rendered yet are
+    dropped, while those already rendered are still written and recorded.
+    Tuning arguments default to the [batch] section of the config.
+    """
+    from pipeline import run_pipeline
+
+    batch_config = load_batch_config()
+    workers = workers or batch_config['workers']
+    chunk_size = chunk_size or batch_config['chunk_size']
+    insert_chunk_size = insert_chunk_size or batch_config['insert_chunk_size']
+    queue_size = queue_size or batch_config['queue_size']
+    pending_count = job.end_num - job.resume_from + 1
+
+    if job.lazy:
+        render_stage = functools.partial(iter_lazy_batch, job.code_type, output_format=job.output_format)
+    elif workers > 1 and pending_count > chunk_size:
+        render_stage = functools.partial(_render_batch_parallel, job.code_type, workers=workers, chunk_size=chunk_size,
+                                         output_format=job.output_format, cancel_event=cancel_event)
+    else:
+        render_stage = functools.partial(iter_render_batch, job.code_type, output_format=job.output_format)
+
+    commit_stage = functools.partial(iter_commit_batch, job, chunk_size=insert_chunk_size)
+    stages = [render_stage, iter_write_batch, commit_stage]
+    results = run_pipeline(job.pending_items(skip_recorded=resume), stages, queue_size, cancel_event)
+    return _track_batch_job(job, results, cancel_event)
+
+
+def _track_batch_job(job, results, cancel_event):
+    """Passes a job's results through and saves its final state when the stream ends."""
+    job.status, job.last_error = JOB_RUNNING, None
+    try:
+        for data, path, error in results:
+            if error:
+                job.last_error = error
+            yield data, path, error
+    except Exception as e:
+        job.status, job.last_error = JOB_INCOMPLETE, str(e)
+        raise
+    else:
+        # A cancel that arrives after the last code was recorded leaves nothing to resume
+        if job.complete():
+            job.status = JOB_FINISHED
+        elif cancel_event is not None and cancel_event.is_set():
+            job.status = JOB_CANCELLED
+        else:
+            job.status = JOB_INCOMPLETE
+    finally:
+        results.close()
+        if job.status == JOB_RUNNING:
+            job.status = JOB_INCOMPLETE  # The consumer stopped reading
+        try:
+            save_batch_job(job)
+        except StorageError:
+            pass  # The job stays 'running' and can still be resumed from its last checkpoint
+
+
+def stream_batch_codes(code_type, prefix, start_num, end_num, pad_length, data_suffix="",
+                       workers=None, chunk_size=None, insert_chunk_size=None, cancel_event=None, lazy=None,
+                       output_format=None, queue_size=None):
+    """
+    Generates a batch of QR or Barcodes based on a numerical sequence as a
+    stream: records a new batch job (see start_batch_job) and runs it (see
+    run_batch_job). Raises ValueError for an unknown code type or output
+    format, and StorageError if the job cannot be recorded.
+    """
+    job = start_batch_job(code_type, prefix, start_num, end_num, pad_length, data_suffix, lazy, output_format)
+    return run_batch_job(job, workers, chunk_size, insert_chunk_size, cancel_event, queue_size)
+
+
+def generate_batch_codes(code_type, prefix, start_num, end_num, pad_length, data_suffix="",
+                         workers=None, chunk_size=None, insert_chunk_size=None,
+                         progress=None, cancel_event=None, lazy=None, output_format=None):
+    """
+    Generates a batch of QR or Barcodes based on a numerical sequence as a
+    batch job (see run_batch_job for the arguments).
+    `progress(processed_count)` is called after each item is recorded, and
+    setting `cancel_event` (a threading.Event) stops the batch once the codes
+    already rendered are recorded; the job can then be resumed.
+    Returns (generated_count, list_of_errors).
+    """
+    try:
+        job = start_batch_job(code_type, prefix, start_num, end_num, pad_length, data_suffix, lazy, output_format)
+    except ValueError as e:
+        return 0, [str(e)]
+    except StorageError as e:
+        return 0, [f"Could not record the batch job: {e}"]
+    results = run_batch_job(job, workers, chunk_size, insert_chunk_size, cancel_event)
+    return _consume_batch_job(job, results, job.total_count, progress, cancel_event)
+
+
+def resume_batch_job(job_id, workers=None, chunk_size=None, insert_chunk_size=None, progress=None,
+                     cancel_event=None):
+    """
+    Continues an unfinished batch job from its high-water mark, skipping
+    codes that were recorded past it (see run_batch_job). `progress` and
+    `cancel_event` work as for generate_batch_codes, counting only the
+    numbers above the mark. Returns (generated_count, list_of_errors).
+    """
+    try:
+        job = load_batch_job(job_id)
+    except StorageError as e:
+        return 0, [f"Could not load batch job {job_id}: {e}"]
+    if job is None:
+        return 0, [f"Batch job {job_id} not found."]
+    if job.status == JOB_FINISHED:
+        return 0, [f"Batch job {job_id} is already finished."]
+    pending_count = job.end_num - job.resume_from + 1
+    results = run_batch_job(job, workers, chunk_size, insert_chunk_size, cancel_event, resume=True)
+    return _consume_batch_job(job, results, pending_count, progress, cancel_event)
+
+
+def _consume_batch_job(job, results, total_count, progress, cancel_event):
+    generated_count = 0
+    processed_count = 0
+    errors = []
+
+    with metrics.span('batch.generate') as span:
+        try:
+            for data, path, error in results:
+                if path:
+                    generated_count += 1
+                elif error:
+                    errors.append(f"Exception for data {data}: {error}")
+                else:
+                    errors.append(f"Failed to generate code for data: {data}")
+
+                processed_count += 1
+                if progress:
+                    progress(processed_count)
+        except Exception as e:
+            errors.append(f"Batch pipeline failed: {e}")
+        if cancel_event is not None and cancel_event.is_set() and processed_count < total_count:
+            errors.append(f"Batch cancelled after {processed_count} of {total_count} codes.")
+        if job.status != JOB_FINISHED:
+            errors.append(f"Batch job {job.id} can be resumed.")
+        if errors:
+            span.fail()
+
+    if metrics.enabled:
+        export_metrics()  # Best effort; the file is refreshed after every batch
     return generated_count, errors
 
 
@@ -304,66 +1324,338 @@ def update_code_and_regenerate(record_id, code_type, new_data, old_path):
     Updates the database record with new data and regenerates the code image,
     replacing the old file.
     """
-    conn = get_db_connection()
-    if not conn:
+    temp_path = None
+    try:
+        with metrics.span('regenerate'):
+            # Determine unique filename base from old_path
+            filename = code_filename_from_path(old_path)
+
+            # 1. Render the new image beside the old one (reusing an identical render); keeps the record's format
+            output_format = output_format_for_path(old_path)
+            full_path, image_bytes, source_path = prepare_code_image(code_type, new_data, filename, output_format)
+            temp_path = stage_code_image(full_path, image_bytes, source_path)
+
+            # 2. Update the DB record
+            metadata_data = new_data[:250]
+            with metrics.span('db.update_code'):
+                get_storage().update_code(record_id, metadata_data, full_path,
+                                          compute_content_hash(code_type, new_data, output_format))
+
+            # 3. Swap the new image in; the old one stays until the record points at the new data
+            os.replace(temp_path, full_path)
+            if os.path.exists(temp_path):
+                _discard_file(temp_path)  # Renaming a hard link onto the same file leaves both names
+            temp_path = None
+            if os.path.normpath(old_path) != os.path.normpath(full_path):
+                _discard_file(old_path)
+
+        return True, "Code regenerated and database updated."
+
+    except StorageConnectionError:
         return False, "Cannot connect to database."
+    except StorageError as e:
+        return False, f"Database update failed; the old image was kept: {e}"
+    except Exception as e:
+        return False, f"Regeneration failed: {e}"
+    finally:
+        if temp_path is not None:
+            _discard_file(temp_path)
 
-    cursor = conn.cursor()
 
-    try:
-        conn.start_transaction()
-        full_path = old_path
-
-        # 1. Regenerate image
-        if os.path.exists(old_path):
-            os.remove(old_path)
-
-        # Determine unique filename base from old_path
-        filename_base = os.path.splitext(os.path.basename(full_path))[0]
-        # Remove the code type suffix (_QR or _BAR) for re-generation
-        if filename_base.endswith('_QR'):
-            filename = filename_base[:-3]
-        elif filename_base.endswith('_BAR'):
-            filename = filename_base[:-4]
+def iter_regenerate_records(records, rewrite=None):
+    """
+    Source of a bulk regenerate: yields (record_id, code_type, data,
+    image_path, error) per created_codes row, with the data passed through
+    `rewrite` when given. Payloads that fill the stored metadata may have
+    been cut off, so they are not regenerated from it.
+    """
+    for record_id, code_type, data, _, image_path in records:
+        error = None
+        if code_type not in RENDERERS:
+            error = f"Unknown code type: {code_type}"
+        elif len(data) >= 250:
+            error = "Stored data may be truncated; update this record on its own."
         else:
-            filename = filename_base  # Fallback
+            try:
+                data = rewrite(data) if rewrite else data
+            except Exception as e:
+                error = f"Rewrite failed: {e}"
+        yield record_id, code_type, data, image_path, error
 
-        # Ensure we use the correct generation function without DB insertion
-        if code_type == 'QR':
-            qr = qrcode.QRCode(version=1, box_size=10, border=4)
-            qr.add_data(new_data)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color="black", back_color="white")
-            full_path = os.path.join(CODES_DIR, f"{filename}_QR.png")
-            img.save(full_path)
 
-        elif code_type == 'BAR':
-            code128 = Code128(new_data, writer=ImageWriter())
-            full_path_base = os.path.join(CODES_DIR, filename)
-            code128.save(full_path_base)
-            full_path = full_path_base + '.png'
+def iter_render_records(records):
+    """
+    Render stage of a bulk regenerate: renders each record in memory into
+    the format of its current image, yielding (record_id, code_type, data,
+    old_path, full_path, image_bytes, error).
+    """
+    for record_id, code_type, data, old_path, error in records:
+        full_path = image_bytes = None
+        if error is None:
+            try:
+                with metrics.span('regenerate.render'):
+                    full_path, image_bytes, _ = prepare_code_image(
+                        code_type, data, code_filename_from_path(old_path), output_format_for_path(old_path),
+                        reuse=False)
+            except Exception as e:
+                error = str(e)
+        yield record_id, code_type, data, old_path, full_path, image_bytes, error
+
+
+def render_records_chunk(records):
+    """Process-pool worker: renders one chunk of records (see render_batch_chunk)."""
+    if not metrics.enabled:
+        return list(iter_render_records(records)), None
+
+    metrics.REGISTRY.reset()
+    results = list(iter_render_records(records))
+    return results, metrics.REGISTRY.snapshot()
+
+
+def stage_code_image(full_path, image_bytes, source_path=None):
+    """
+    Like store_code_image, but leaves the image in a temporary file beside
+    full_path and returns that file's path. Renaming it onto full_path
+    (os.replace) puts it in place atomically; removing it keeps the old image.
+    """
+    os.makedirs(os.path.dirname(full_path) or '.', exist_ok=True)
+    temp_path = f"{full_path}.{os.getpid()}.regen.tmp"
+    if image_bytes is None:
+        with metrics.span('render_cache.link'):
+            try:
+                os.link(source_path, temp_path)
+            except OSError:
+                shutil.copyfile(source_path, temp_path)
+        return temp_path
+
+    with metrics.span('file.write'):
+        with open(temp_path, 'wb') as f:
+            f.write(image_bytes)
+    return temp_path
+
+
+def iter_stage_records(rendered):
+    """
+    File-writer stage of a bulk regenerate: writes each image to a temporary
+    file, yielding (record_id, code_type, data, old_path, full_path,
+    temp_path, error).
+    """
+    for record_id, code_type, data, old_path, full_path, image_bytes, error in rendered:
+        temp_path = None
+        if error is None:
+            try:
+                temp_path = stage_code_image(full_path, image_bytes)
+            except OSError as e:
+                error = str(e)
+        yield record_id, code_type, data, old_path, full_path, temp_path, error
+
 
-            # 2. Update the DB record
-        metadata_data = new_data[:250]
-        sql = "UPDATE created_codes SET data = %s, image_path = %s WHERE id = %s"
-        cursor.execute(sql, (metadata_data, full_path, record_id))
+def _discard_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
-        conn.commit()
 
-        return True, "Code regenerated and database updated."
+def iter_commit_records(staged, chunk_size):
+    """
+    Database stage of a bulk regenerate: updates the records of each chunk
+    in one transaction, then renames their new images into place (removing
+    the old file if the path changed). If the update fails, the temporary
+    files are removed and the old images and data stay as they were.
+    Yields (record_id, data, image_path, error).
+    """
+    for chunk in chunked(staged, chunk_size):
+        rows = [(data[:250], full_path, compute_content_hash(code_type, data, output_format_for_path(full_path)),
+                 record_id)
+                for record_id, code_type, data, old_path, full_path, temp_path, error in chunk if temp_path]
+        db_error = None
+        if rows:
+            try:
+                get_storage().update_codes(rows)
+            except StorageError as e:
+                db_error = f"Failed to update {len(rows)} records: {e}"
+
+        for record_id, code_type, data, old_path, full_path, temp_path, error in chunk:
+            if temp_path is None:
+                yield record_id, data, None, error
+                continue
+            if db_error:
+                _discard_file(temp_path)
+                yield record_id, data, None, db_error
+                continue
+            try:
+                os.replace(temp_path, full_path)
+            except OSError as e:
+                _discard_file(temp_path)
+                yield record_id, data, None, f"Record updated, but the image could not be replaced: {e}"
+                continue
+            if os.path.normpath(old_path) != os.path.normpath(full_path):
+                _discard_file(old_path)
+            yield record_id, data, full_path, None
+
+
+def stream_regenerate_codes(ids=None, filters=None, rewrite=None, workers=None, chunk_size=None,
+                            update_chunk_size=None, cancel_event=None, queue_size=None):
+    """
+    Re-renders the selected records (`ids`), or all records matching the
+    search `filters`, with the current render settings, optionally changing
+    their data with `rewrite(data) -> new_data`. Each record keeps its file
+    name and output format. Returns a generator of (record_id, data,
+    image_path, error) per record in id order (image_path is None on error).
+
+    Runs as a pipeline like a batch (see run_batch_job): records are rendered
+    in a process pool when more than one worker is configured, written to
+    temporary files, updated with one batched UPDATE per `update_chunk_size`
+    records and only then renamed into place. A failure never leaves a
+    record without its image. Tuning arguments default to the [batch]
+    section (`update_chunk_size` to insert_chunk_size).
+    """
+    from pipeline import run_pipeline
+
+    batch_config = load_batch_config()
+    workers = workers or batch_config['workers']
+    chunk_size = chunk_size or batch_config['chunk_size']
+    update_chunk_size = update_chunk_size or batch_config['insert_chunk_size']
+    queue_size = queue_size or batch_config['queue_size']
+
+    # Only ids are held, so no read cursor stays open while the records are updated
+    storage = get_storage()
+    if ids is None:
+        ids = [row[0] for row in storage.iter_codes(filters=filters)]
+    records = iter_regenerate_records(storage.iter_codes(ids=ids), rewrite)
+
+    if workers > 1 and len(ids) > chunk_size:
+        render_stage = functools.partial(_map_chunks_parallel, render_records_chunk, workers=workers,
+                                         cancel_event=cancel_event)
+        source = chunked(records, chunk_size)
+    else:
+        render_stage, source = iter_render_records, records
 
-    except Exception as e:
-        conn.rollback()
-        return False, f"Regeneration failed: {e}"
+    commit_stage = functools.partial(iter_commit_records, chunk_size=update_chunk_size)
+    return run_pipeline(source, [render_stage, iter_stage_records, commit_stage], queue_size, cancel_event)
+
+
+def regenerate_codes(ids=None, filters=None, rewrite=None, workers=None, progress=None, cancel_event=None):
+    """
+    Regenerates many records in one pass (see stream_regenerate_codes).
+    `progress(processed_count)` is called after each record, and setting
+    `cancel_event` stops once the records already in progress are done.
+    Returns (regenerated_count, list_of_errors).
+    """
+    regenerated_count = 0
+    processed_count = 0
+    errors = []
+
+    with metrics.span('regenerate.bulk') as span:
+        try:
+            for record_id, data, path, error in stream_regenerate_codes(ids, filters, rewrite, workers,
+                                                                         cancel_event=cancel_event):
+                if path:
+                    regenerated_count += 1
+                else:
+                    errors.append(f"Record {record_id} ({data}): {error}")
+                processed_count += 1
+                if progress:
+                    progress(processed_count)
+        except Exception as e:
+            errors.append(f"Regenerate failed: {e}")
+        if cancel_event is not None and cancel_event.is_set():
+            errors.append(f"Regenerate cancelled after {processed_count} records.")
+        if errors:
+            span.fail()
+
+    if metrics.enabled:
+        export_metrics()
+    return regenerated_count, errors
+
+
+# --- NEW FEATURE: BULK EXPORT ---
+
+def count_code_records(filters=None):
+    """Returns the number of created_codes rows matching the search `filters`."""
+    return get_storage().count_codes(filters)
+
+
+def export_code_archive(archive_path, manifest_format='csv', ids=None, filters=None, progress=None,
+                        cancel_event=None):
+    """
+    Exports the images of the selected records (`ids`), or of all records
+    matching `filters`, into a ZIP/TAR archive with a CSV or JSON manifest.
+    Records are streamed from the database and images are rendered on demand
+    for metadata-only rows. Returns (exported_count, errors).
+    """
+    records = get_storage().iter_codes(filters=filters, ids=ids)
+    try:
+        return write_code_archive(records, archive_path, manifest_format,
+                                  resolve_image=lambda rec: ensure_code_image(rec[1], rec[2], rec[4]),
+                                  progress=progress, cancel_event=cancel_event)
     finally:
-        cursor.close()
-        conn.close()
+        records.close()
+
+
+# --- NEW FEATURE: LABEL SHEETS ---
+
+def compose_label_sheets(pdf_path, ids=None, filters=None, progress=None, cancel_event=None):
+    """
+    Tiles the selected records (`ids`), or all records matching `filters`,
+    onto label sheets laid out by the [labels] config section and writes one
+    multi-page PDF. Returns (placed_count, errors).
+    """
+    from labels import LabelLayout, write_label_pdf
+
+    layout = LabelLayout(**load_label_config())
+    records = get_storage().iter_codes(filters=filters, ids=ids)
+    try:
+        return write_label_pdf(records, pdf_path, layout,
+                               resolve_image=lambda rec: ensure_code_image(rec[1], rec[2], rec[4], raster=True),
+                               progress=progress, cancel_event=cancel_event)
+    finally:
+        records.close()
+
+
+def print_label_sheets(printer_name, ids=None, filters=None, progress=None, cancel_event=None):
+    """
+    Composes label sheets for the given records and sends the PDF to the
+    printer as a single job. Returns (placed_count, errors).
+    """
+    os.makedirs(LABEL_SHEETS_DIR, exist_ok=True)
+    pdf_path = os.path.join(LABEL_SHEETS_DIR, f"labels_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.pdf")
+    placed_count, errors = compose_label_sheets(pdf_path, ids, filters, progress, cancel_event)
+    if not placed_count:
+        return placed_count, errors
+
+    success, message = print_file_os(pdf_path, printer_name)
+    if not success:
+        errors.insert(0, message)
+        return 0, errors
+    if not sys.platform.startswith('win'):
+        os.remove(pdf_path)  # lpr has copied it to the spooler; Windows prints asynchronously from the file
+    return placed_count, errors
 
 
 # --- 4. PRINTER DETECTION AND PRINTING FUNCTIONS ---
 
-def get_installed_printers():
-    """Returns a list of installed printer names based on OS."""
+# Printer discovery shells out to lpstat (or the print spooler), which can be slow, so results are reused
+PRINTER_CACHE_SECONDS = 300
+LPSTAT_TIMEOUT = 10
+_printer_lock = threading.Lock()
+_printer_cache = {'printers': None, 'expires': 0.0}
+
+
+def get_installed_printers(refresh=False):
+    """
+    Returns a list of installed printer names based on OS. The list is cached
+    for PRINTER_CACHE_SECONDS; pass `refresh` to detect the printers again.
+    """
+    with _printer_lock:
+        if refresh or _printer_cache['printers'] is None or time.monotonic() >= _printer_cache['expires']:
+            _printer_cache['printers'] = _detect_printers()
+            _printer_cache['expires'] = time.monotonic() + PRINTER_CACHE_SECONDS
+        return list(_printer_cache['printers'])
+
+
+def _detect_printers():
     if sys.platform.startswith('win'):
         try:
             if 'win32print' in sys.modules or os.name == 'nt':
@@ -376,10 +1668,11 @@ def get_installed_printers():
             return ["Windows Default Print Dialog"]
     elif sys.platform == 'darwin' or sys.platform.startswith('linux'):
         try:
-            result = subprocess.run(['lpstat', '-p', '-d'], capture_output=True, text=True, check=False)
+            result = subprocess.run(load_print_config()['lpstat_command'] + ['-p', '-d'], capture_output=True,
+                                    text=True, check=False, timeout=LPSTAT_TIMEOUT)
             printers = [line.split()[1] for line in result.stdout.splitlines() if line.startswith('printer')]
             return printers if printers else ["Default CUPS Printer (lpr)"]
-        except FileNotFoundError:
+        except (FileNotFoundError, subprocess.TimeoutExpired):
             return ["Default CUPS Printer (lpr)"]
     else:
         return ["Printing Not Fully Supported"]
@@ -390,6 +1683,14 @@ def print_file_os(file_path, printer_name=None):
     Attempts to send a file to the printer using OS-specific commands.
     Returns (True/False, message).
     """
+    with metrics.span('print.spool') as span:
+        success, message = _print_file_os(file_path, printer_name)
+        if not success:
+            span.fail()
+    return success, message
+
+
+def _print_file_os(file_path, printer_name):
     if not os.path.exists(file_path):
         return False, "File not found."
 
@@ -400,7 +1701,7 @@ def print_file_os(file_path, printer_name=None):
         except Exception as e:
             return False, f"Windows printing failed. Error: {e}"
     elif sys.platform == 'darwin' or sys.platform.startswith('linux'):
-        command = ['lpr']
+        command = load_print_config()['lpr_command']
         if printer_name and "Default CUPS Printer" not in printer_name:
             command.extend(['-P', printer_name])
 
@@ -414,4 +1715,76 @@ def print_file_os(file_path, printer_name=None):
         except FileNotFoundError:
             return False, "The 'lpr' command was not found. Is CUPS installed?"
     else:
-        return False, "Printing not supported on this operating system."
\ No newline at end of file
+        return False, "Printing not supported on this operating system."
+
+# --- 5. PRINT QUEUE ---
+
+def create_print_job(file_path, printer_name):
+    """Records a queued print job and returns its id. Raises StorageError on failure."""
+    return get_storage().insert_print_job(file_path, printer_name, QUEUED, datetime.datetime.now())
+
+
+def save_print_job(job_id, status, attempts, last_error):
+    """Persists the state of a print job. Raises StorageError on failure."""
+    get_storage().update_print_job(job_id, status, attempts, last_error, datetime.datetime.now())
+
+
+def start_print_queue():
+    """Starts a print queue configured by the [printing] section that persists its jobs in print_jobs."""
+    settings = load_print_config()
+    return PrintQueue(print_file_os, create_print_job, save_print_job, workers=settings['workers'],
+                      per_printer=settings['per_printer'], max_attempts=settings['max_attempts'],
+                      retry_delay=settings['retry_delay'])
+
+
+def restore_print_jobs(print_queue, history=200, page_size=500):
+    """
+    Loads unfinished jobs from print_jobs into `print_queue`, along with the
+    `history` most recent finished ones. Unfinished jobs are read `page_size`
+    rows at a time. Jobs that were being spooled when the app stopped are
+    marked failed instead of being sent again, since they may already have
+    printed. Returns the number of jobs queued again.
+    """
+    storage = get_storage()
+    unfinished, before_id = [], None
+    while True:
+        page = storage.list_print_jobs(statuses=(QUEUED, PRINTING), limit=page_size, before_id=before_id)
+        unfinished.extend(page)
+        if len(page) < page_size:
+            break
+        before_id = page[-1][0]
+    finished = storage.list_print_jobs(statuses=FINISHED_STATES, limit=history)
+
+    resumed = 0
+    for job_id, file_path, printer, status, attempts, last_error, _, _ in sorted(finished + unfinished):
+        if status == PRINTING:
+            status, last_error = FAILED, "Interrupted while printing; use Retry if it did not print."
+            save_print_job(job_id, status, attempts, last_error)
+        elif status == QUEUED:
+            resumed += 1
+        print_queue.restore(PrintJob(job_id, file_path, printer, status, attempts, last_error))
+    return resumed
+
+
+def clear_finished_print_jobs(print_queue):
+    """Deletes finished jobs from print_jobs and the queue view. Raises StorageError on failure."""
+    get_storage().delete_print_jobs(FINISHED_STATES)
+    print_queue.forget_finished()
+
+
+# --- 6. METRICS ---
+
+def export_metrics(path=None, export_format=None):
+    """
+    Writes the timing histograms collected so far to `path` (default: the
+    [metrics] export_path) as Prometheus text or JSON. Returns (True/False, message).
+    """
+    if not metrics.enabled:
+        return False, "Metrics are disabled; set enabled = yes in the [metrics] section of config.ini."
+    settings = load_metrics_config()
+    path = path or settings['export_path']
+    try:
+        metrics.export(path, export_format or settings['export_format'])
+        return True, f"Metrics written to: {path}"
+    except OSError as e:
+        return False, f"Cannot write metrics: {e}"
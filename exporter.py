@@ -0,0 +1,152 @@
+import csv
+import json
+import os
+import tarfile
+import tempfile
+import time
+import zipfile
+
+# Archive suffixes accepted by write_code_archive(), longest first
+ARCHIVE_FORMATS = [('.tar.gz', 'w:gz'), ('.tgz', 'w:gz'), ('.tar', 'w'), ('.zip', 'zip')]
+MANIFEST_FORMATS = ('csv', 'json')
+MANIFEST_FIELDS = ('id', 'type', 'data', 'date_created', 'file')
+
+
+def archive_mode(archive_path):
+    """Returns the archive mode for a file name, or None if its suffix is not supported."""
+    lower_path = archive_path.lower()
+    for suffix, mode in ARCHIVE_FORMATS:
+        if lower_path.endswith(suffix):
+            return mode
+    return None
+
+
+class ManifestWriter:
+    """
+    Writes the manifest rows to a temporary file as they are produced, so it
+    can be added to the archive at the end without keeping it in memory.
+    """
+
+    def __init__(self, manifest_format):
+        self.format = manifest_format
+        self.file = tempfile.TemporaryFile(mode='w+', encoding='utf-8', newline='')
+        self.count = 0
+        if manifest_format == 'csv':
+            self.csv_writer = csv.writer(self.file)
+            self.csv_writer.writerow(MANIFEST_FIELDS)
+        else:
+            self.file.write("[")
+
+    def add(self, record, arcname):
+        values = (record[0], record[1], record[2], record[3].strftime("%Y-%m-%d %H:%M:%S"), arcname)
+        if self.format == 'csv':
+            self.csv_writer.writerow(values)
+        else:
+            self.file.write(("," if self.count else "") + "\n  " + json.dumps(dict(zip(MANIFEST_FIELDS, values))))
+        self.count += 1
+
+    def finish(self):
+        """Returns the manifest as a binary file object positioned at its start, and its size."""
+        if self.format == 'json':
+            self.file.write("\n]\n")
+        self.file.flush()
+        binary = self.file.buffer
+        size = binary.seek(0, os.SEEK_END)
+        binary.seek(0)
+        return binary, size
+
+    def close(self):
+        self.file.close()
+
+
+class ZipArchive:
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, 'w', allowZip64=True)
+
+    def add_file(self, path, arcname):
+        # PNGs are already compressed; storing them keeps the export I/O-bound
+        self.zip.write(path, arcname, compress_type=zipfile.ZIP_STORED)
+
+    def add_stream(self, fileobj, size, arcname):
+        info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with self.zip.open(info, 'w', force_zip64=size > zipfile.ZIP64_LIMIT) as dest:
+            while chunk := fileobj.read(1024 * 1024):
+                dest.write(chunk)
+
+    def close(self):
+        self.zip.close()
+
+
+class TarArchive:
+    def __init__(self, path, mode):
+        self.tar = tarfile.open(path, mode)
+
+    def add_file(self, path, arcname):
+        self.tar.add(path, arcname, recursive=False)
+
+    def add_stream(self, fileobj, size, arcname):
+        info = tarfile.TarInfo(arcname)
+        info.size = size
+        info.mtime = time.time()
+        self.tar.addfile(info, fileobj)
+
+    def close(self):
+        self.tar.close()
+
+
+def write_code_archive(records, archive_path, manifest_format='csv', resolve_image=None, progress=None,
+                       cancel_event=None):
+    """
+    Streams the image of each created_codes record into a ZIP or TAR archive
+    (chosen by the suffix of `archive_path`) under images/, followed by a
+    manifest.csv or manifest.json describing the exported records. Records
+    are consumed one at a time, so memory use is constant.
+
+    `resolve_image(record)` returns the image path to export, or None if the
+    image is unavailable. Returns (exported_count, errors); the archive is
+    only written to `archive_path` once complete.
+    """
+    mode = archive_mode(archive_path)
+    if mode is None:
+        raise ValueError(f"Unsupported archive type: {os.path.basename(archive_path)}")
+    if manifest_format not in MANIFEST_FORMATS:
+        raise ValueError(f"Unsupported manifest format: {manifest_format}")
+
+    partial_path = archive_path + ".part"
+    archive = ZipArchive(partial_path) if mode == 'zip' else TarArchive(partial_path, mode)
+    manifest = ManifestWriter(manifest_format)
+    errors = []
+    processed = 0
+    completed = False
+
+    try:
+        for record in records:
+            if cancel_event is not None and cancel_event.is_set():
+                errors.append(f"Export cancelled after {processed} codes.")
+                return 0, errors
+
+            image_path = resolve_image(record) if resolve_image else record[4]
+            if image_path and os.path.exists(image_path):
+                arcname = f"images/{os.path.basename(image_path)}"
+                archive.add_file(image_path, arcname)
+                manifest.add(record, arcname)
+            else:
+                errors.append(f"Image missing for record {record[0]} ({record[2]}).")
+
+            processed += 1
+            if progress is not None:
+                progress(processed)
+
+        fileobj, size = manifest.finish()
+        archive.add_stream(fileobj, size, f"manifest.{manifest_format}")
+        completed = True
+    finally:
+        archive.close()
+        manifest.close()
+        if completed:
+            os.replace(partial_path, archive_path)
+        elif os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    return manifest.count, errors
@@ -0,0 +1,229 @@
+import os
+import zlib
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Named page sizes in millimetres (width, height)
+PAGE_SIZES = {
+    'A4': (210.0, 297.0),
+    'A5': (148.0, 210.0),
+    'LETTER': (215.9, 279.4),
+    'LEGAL': (215.9, 355.6)
+}
+MM_PER_INCH = 25.4
+POINTS_PER_INCH = 72
+
+
+def parse_page_size(value):
+    """Returns (width, height) in mm for a page size name or a 'WIDTHxHEIGHT' string in mm."""
+    name = value.strip().upper()
+    if name in PAGE_SIZES:
+        return PAGE_SIZES[name]
+    width, height = name.split('X')
+    return float(width), float(height)
+
+
+class LabelLayout:
+    """
+    Grid of equally sized labels on a page. Sizes are given in millimetres
+    and converted to pixels at `dpi`, the resolution pages are rendered at.
+    """
+
+    def __init__(self, page_size=PAGE_SIZES['A4'], dpi=300, columns=3, rows=8, margin_mm=10.0, spacing_mm=2.0,
+                 captions=True):
+        self.page_mm = page_size
+        self.dpi = dpi
+        self.columns = columns
+        self.rows = rows
+        self.captions = captions
+
+        page_width, page_height = (self.px(size) for size in page_size)
+        margin, spacing = self.px(margin_mm), self.px(spacing_mm)
+        self.page_px = (page_width, page_height)
+        self.margin_px = margin
+        self.spacing_px = spacing
+        self.cell_px = ((page_width - 2 * margin - (columns - 1) * spacing) // columns,
+                        (page_height - 2 * margin - (rows - 1) * spacing) // rows)
+        if min(self.cell_px) <= 0:
+            raise ValueError("Labels do not fit on the page; reduce the grid, margins or spacing.")
+
+        # Captions take the bottom of each label, sized to the label height
+        self.caption_px = max(8, self.cell_px[1] // 8) if captions else 0
+
+    @property
+    def labels_per_page(self):
+        return self.columns * self.rows
+
+    @property
+    def page_points(self):
+        return tuple(size / MM_PER_INCH * POINTS_PER_INCH for size in self.page_mm)
+
+    def px(self, mm):
+        return int(round(mm / MM_PER_INCH * self.dpi))
+
+    def cell_origin(self, index):
+        """Top-left pixel of the label at `index` on its page, filled row by row."""
+        row, column = divmod(index % self.labels_per_page, self.columns)
+        return (self.margin_px + column * (self.cell_px[0] + self.spacing_px),
+                self.margin_px + row * (self.cell_px[1] + self.spacing_px))
+
+
+class PdfPageWriter:
+    """
+    Minimal PDF writer with one full-page grayscale image per page. Each page
+    is written to the file as soon as it is added, and the page tree and
+    cross-reference table at the end only need object offsets, so memory
+    use does not grow with the number of pages.
+    """
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    def __init__(self, path, page_points):
+        self.file = open(path, 'wb')
+        self.page_points = page_points
+        self.offsets = {}  # object number -> byte offset
+        self.page_ids = []
+        self.next_id = self.PAGES_ID + 1
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write_object(self, body, obj_id=None):
+        if obj_id is None:
+            obj_id = self.next_id
+            self.next_id += 1
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode('ascii') + body + b"\nendobj\n")
+        return obj_id
+
+    def _write_stream(self, dictionary, data):
+        return self._write_object(f"<< {dictionary} /Length {len(data)} >>\nstream\n".encode('ascii')
+                                  + data + b"\nendstream")
+
+    def add_page(self, image):
+        """Adds a page showing a grayscale ('L') PIL image scaled to the full page."""
+        width, height = self.page_points
+        image_id = self._write_stream(
+            f"/Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode",
+            zlib.compress(image.tobytes(), 6))
+        content_id = self._write_stream("", f"q {width:.2f} 0 0 {height:.2f} 0 0 cm /Im0 Do Q".encode('ascii'))
+        page_id = self._write_object(
+            f"<< /Type /Page /Parent {self.PAGES_ID} 0 R /MediaBox [0 0 {width:.2f} {height:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>".encode('ascii'))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode('ascii'),
+                           self.PAGES_ID)
+        self._write_object(f"<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>".encode('ascii'), self.CATALOG_ID)
+
+        xref_offset = self.file.tell()
+        lines = [f"xref\n0 {self.next_id}\n", "0000000000 65535 f \n"]
+        lines.extend(f"{self.offsets[obj_id]:010d} 00000 n \n" for obj_id in range(1, self.next_id))
+        lines.append(f"trailer\n<< /Size {self.next_id} /Root {self.CATALOG_ID} 0 R >>\n"
+                     f"startxref\n{xref_offset}\n%%EOF\n")
+        self.file.write("".join(lines).encode('ascii'))
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+def load_caption_font(size):
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        return ImageFont.load_default()  # Pillow < 10.1 only has the fixed-size bitmap font
+
+
+def fit_caption(draw, text, font, width):
+    """Shortens `text` with an ellipsis until it fits in `width` pixels."""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "...", font=font) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def draw_label(page, draw, layout, index, image_path, caption, font):
+    left, top = layout.cell_origin(index)
+    cell_width, cell_height = layout.cell_px
+    image_height = cell_height - layout.caption_px
+
+    with Image.open(image_path) as source:
+        code = source.convert('L')
+    scale = min(cell_width / code.width, image_height / code.height)
+    size = (max(1, int(code.width * scale)), max(1, int(code.height * scale)))
+    code = code.resize(size, Image.NEAREST if scale >= 1 else Image.LANCZOS)
+    page.paste(code, (left + (cell_width - size[0]) // 2, top + (image_height - size[1]) // 2))
+
+    if layout.captions and caption:
+        text = fit_caption(draw, caption, font, cell_width)
+        x0, y0, x1, y1 = draw.textbbox((0, 0), text, font=font)
+        text_left = left + (cell_width - (x1 - x0)) // 2 - x0
+        text_top = top + image_height + (layout.caption_px - (y1 - y0)) // 2 - y0
+        draw.text((text_left, text_top), text, fill=0, font=font)
+
+
+def write_label_pdf(records, pdf_path, layout, resolve_image=None, progress=None, cancel_event=None):
+    """
+    Tiles the images of created_codes records onto label sheets and writes
+    them as one multi-page PDF. Pages are rendered and written one at a time,
+    so memory use is constant regardless of the number of labels.
+
+    `resolve_image(record)` returns the image path to place, or None if the
+    image is unavailable. Returns (placed_count, errors); the PDF is only
+    written to `pdf_path` once complete.
+    """
+    partial_path = pdf_path + ".part"
+    writer = PdfPageWriter(partial_path, layout.page_points)
+    font = load_caption_font(max(8, int(layout.caption_px * 0.7)))
+    errors = []
+    processed = placed = 0
+    page = draw = None
+    completed = False
+
+    try:
+        for record in records:
+            if cancel_event is not None and cancel_event.is_set():
+                errors.append(f"Label sheets cancelled after {processed} codes.")
+                return 0, errors
+
+            image_path = resolve_image(record) if resolve_image else record[4]
+            processed += 1
+            if progress is not None:
+                progress(processed)
+            if not image_path or not os.path.exists(image_path):
+                errors.append(f"Image missing for record {record[0]} ({record[2]}).")
+                continue
+
+            if page is None:
+                page = Image.new('L', layout.page_px, 255)
+                draw = ImageDraw.Draw(page)
+            try:
+                draw_label(page, draw, layout, placed, image_path, record[2], font)
+            except OSError as e:
+                errors.append(f"Cannot read image for record {record[0]}: {e}")
+                continue
+            placed += 1
+            if placed % layout.labels_per_page == 0:
+                writer.add_page(page)
+                page = draw = None
+
+        if page is not None:
+            writer.add_page(page)
+        if not placed:
+            errors.append("No labels to place.")
+            return 0, errors
+        writer.close()
+        completed = True
+    finally:
+        if completed:
+            os.replace(partial_path, pdf_path)
+        else:
+            writer.abort()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    return placed, errors
@@ -0,0 +1,161 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+           10.0, 30.0)
+
+# Spans are only timed while enabled; see enable()
+enabled = False
+
+
+class Histogram:
+    """Count, sum and bucketed distribution of the durations of one stage."""
+
+    __slots__ = ('buckets', 'count', 'sum', 'errors')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, seconds, failed):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if failed:
+            self.errors += 1
+
+
+class Registry:
+    """Thread-safe collection of per-stage histograms."""
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, failed=False):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds, failed)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def snapshot(self):
+        """Returns {stage: {'count', 'sum', 'errors', 'buckets'}} with per-bucket (not cumulative) counts."""
+        with self._lock:
+            return {name: {'count': h.count, 'sum': h.sum, 'errors': h.errors, 'buckets': list(h.buckets)}
+                    for name, h in self.histograms.items()}
+
+    def merge(self, snapshot):
+        """Adds a snapshot taken in another process (e.g. a batch render worker)."""
+        with self._lock:
+            for name, data in snapshot.items():
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = Histogram()
+                histogram.count += data['count']
+                histogram.sum += data['sum']
+                histogram.errors += data['errors']
+                histogram.buckets = [a + b for a, b in zip(histogram.buckets, data['buckets'])]
+
+
+REGISTRY = Registry()
+
+
+class _Span:
+    __slots__ = ('name', 'started', 'failed')
+
+    def __init__(self, name):
+        self.name = name
+        self.failed = False
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        REGISTRY.observe(self.name, time.perf_counter() - self.started, self.failed or exc_type is not None)
+        return False
+
+    def fail(self):
+        """Counts the span as an error without raising (for failures reported as return values)."""
+        self.failed = True
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def fail(self):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """
+    Times a `with` block as one observation of stage `name`; exceptions that
+    leave the block are counted as errors. While instrumentation is disabled
+    this returns a shared no-op context manager, so spans cost almost nothing.
+    """
+    return _Span(name) if enabled else _NULL_SPAN
+
+
+def enable(flag=True):
+    global enabled
+    enabled = flag
+
+
+def to_json():
+    """Returns the current metrics as a JSON document."""
+    return json.dumps({
+        'generated_at': time.time(),
+        'bucket_bounds': list(BUCKETS),
+        'stages': REGISTRY.snapshot()
+    }, indent=2)
+
+
+def to_prometheus():
+    """Returns the current metrics in the Prometheus text exposition format."""
+    snapshot = REGISTRY.snapshot()
+    lines = ["# HELP code_manager_stage_duration_seconds Duration of instrumented code manager stages.",
+             "# TYPE code_manager_stage_duration_seconds histogram"]
+    for name in sorted(snapshot):
+        data = snapshot[name]
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), data['buckets']):
+            cumulative += count
+            le = "+Inf" if bound == float('inf') else repr(bound)
+            lines.append(f'code_manager_stage_duration_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'code_manager_stage_duration_seconds_sum{{stage="{name}"}} {data["sum"]!r}')
+        lines.append(f'code_manager_stage_duration_seconds_count{{stage="{name}"}} {data["count"]}')
+
+    lines.append("# HELP code_manager_stage_errors_total Instrumented stages that failed.")
+    lines.append("# TYPE code_manager_stage_errors_total counter")
+    for name in sorted(snapshot):
+        lines.append(f'code_manager_stage_errors_total{{stage="{name}"}} {snapshot[name]["errors"]}')
+    return "\n".join(lines) + "\n"
+
+
+def export(path, fmt='prometheus'):
+    """Writes the metrics to `path` ('prometheus' or 'json'), replacing the file atomically."""
+    text = to_json() if fmt == 'json' else to_prometheus()
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(text)
+    os.replace(temp_path, path)
@@ -0,0 +1,108 @@
+"""
+Threaded streaming pipeline. A producer thread feeds the items of a source
+iterable through a chain of stages, each running in its own thread and
+connected to the next by a bounded queue. A stage that falls behind blocks
+the ones before it (backpressure), so CPU, disk and database work overlap
+while only a bounded number of items is in memory at any time.
+"""
+import queue
+import threading
+
+# How often blocked threads check whether the pipeline was stopped, in seconds
+POLL_SECONDS = 0.1
+
+_END = object()
+
+
+class _Failure:
+    """Carries an exception raised in a stage down to the consumer."""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def run_pipeline(source, stages, queue_size=256, cancel_event=None):
+    """
+    Streams `source` through `stages` and yields the outputs of the last one.
+    Each stage is a function taking an iterator of inputs and returning an
+    iterable of outputs (usually a generator); each queue between stages
+    holds at most `queue_size` items.
+
+    Setting `cancel_event` (a threading.Event) stops taking new items from
+    `source` and drops the items the first stage has not taken yet; items it
+    has already produced still run through the remaining stages.
+    An exception in any stage is re-raised in the consumer. Closing the
+    generator early stops all stages and waits for their threads to exit.
+    """
+    stopped = threading.Event()
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+
+    def put(outbox, item):
+        # Waits while the next stage is behind, but gives up once the pipeline is stopped
+        while not stopped.is_set():
+            try:
+                outbox.put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def drain(inbox, cancel_event=None):
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return  # Whatever is left in the inbox is discarded
+            try:
+                item = inbox.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if stopped.is_set():
+                    return
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def produce():
+        try:
+            for item in source:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                if not put(queues[0], item):
+                    return
+        except BaseException as e:
+            put(queues[0], _Failure(e))
+            return
+        put(queues[0], _END)
+
+    def run_stage(stage, inbox, outbox, cancel_event=None):
+        outputs = None
+        try:
+            outputs = stage(drain(inbox, cancel_event))
+            for item in outputs:
+                if not put(outbox, item):
+                    return
+        except BaseException as e:
+            put(outbox, _Failure(e))
+            return
+        finally:
+            close = getattr(outputs, 'close', None)
+            if close is not None:
+                close()  # Lets generator stages release resources (e.g. a process pool) right away
+        put(outbox, _END)
+
+    threads = [threading.Thread(target=produce, name='pipeline-source', daemon=True)]
+    threads += [threading.Thread(target=run_stage, name=f"pipeline-stage-{index + 1}", daemon=True,
+                                 args=(stage, queues[index], queues[index + 1], cancel_event if index == 0 else None))
+                for index, stage in enumerate(stages)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        yield from drain(queues[-1])
+    finally:
+        stopped.set()
+        for thread in threads:
+            thread.join()
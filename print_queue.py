@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from collections import deque
+
+QUEUED = 'queued'
+PRINTING = 'printing'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class PrintJob:
+    """One file to be sent to one printer, and where it is in the queue."""
+
+    def __init__(self, job_id, file_path, printer, status=QUEUED, attempts=0, last_error=None):
+        self.id = job_id
+        self.file_path = file_path
+        self.printer = printer
+        self.status = status
+        self.attempts = attempts
+        self.last_error = last_error
+        self.not_before = 0.0  # monotonic time before which a retry is not started
+
+
+class PrintQueue:
+    """
+    Sends files to the print spooler from a pool of worker threads, so the
+    caller never waits on the spooler. At most `per_printer` jobs run against
+    one printer at a time; a job that fails is retried with exponential
+    backoff until it has been attempted `max_attempts` times.
+
+    `print_func(file_path, printer)` returns (True/False, message). Jobs are
+    persisted through `create_job(file_path, printer)`, which returns the new
+    job id, and `save_job(job_id, status, attempts, last_error)`, which is
+    called after every state change.
+    """
+
+    def __init__(self, print_func, create_job, save_job, workers=2, per_printer=1, max_attempts=3,
+                 retry_delay=5.0):
+        self.print_func = print_func
+        self.create_job = create_job
+        self.save_job = save_job
+        self.per_printer = per_printer
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self.jobs = {}  # job id -> PrintJob, everything shown in the queue view
+        self.version = 0  # bumped on every change so views know when to redraw
+        self._pending = deque()
+        self._active = {}  # printer -> jobs currently being spooled
+        self._cond = threading.Condition()
+        self._save_lock = threading.Lock()
+        self._closed = False
+
+        self._threads = [threading.Thread(target=self._worker, name=f'print-queue-{index}', daemon=True)
+                         for index in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, file_path, printer):
+        """Queues a file for printing and returns the job id. Raises if the job cannot be recorded."""
+        job = PrintJob(self.create_job(file_path, printer), file_path, printer)
+        self.restore(job)
+        return job.id
+
+    def restore(self, job):
+        """Adds a job loaded from storage; queued jobs are scheduled, others are only shown."""
+        with self._cond:
+            self.jobs[job.id] = job
+            if job.status == QUEUED:
+                self._pending.append(job)
+            self._changed()
+
+    def cancel(self, job_id):
+        """Cancels a job that has not been sent to the spooler yet. Returns True if it was cancelled."""
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            self._pending.remove(job)
+            job.status = CANCELLED
+            self._changed()
+        self._save(job)
+        return True
+
+    def retry(self, job_id):
+        """Queues a failed or cancelled job again with a fresh attempt count. Returns True on success."""
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if job is None or job.status not in (FAILED, CANCELLED):
+                return False
+            job.status, job.attempts, job.last_error, job.not_before = QUEUED, 0, None, 0.0
+            self._pending.append(job)
+            self._changed()
+        self._save(job)
+        return True
+
+    def forget_finished(self):
+        """Drops finished jobs from the queue view."""
+        with self._cond:
+            for job_id in [job.id for job in self.jobs.values() if job.status in FINISHED_STATES]:
+                del self.jobs[job_id]
+            self._changed()
+
+    def snapshot(self):
+        """Returns (id, printer, file_path, status, attempts, last_error) tuples, newest first."""
+        with self._cond:
+            return [(job.id, job.printer, job.file_path, job.status, job.attempts, job.last_error)
+                    for job in sorted(self.jobs.values(), key=lambda job: job.id, reverse=True)]
+
+    def shutdown(self):
+        """Stops the workers after their current job; queued jobs stay queued in storage."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _changed(self):
+        # Called with the condition held
+        self.version += 1
+        self._cond.notify_all()
+
+    def _save(self, job):
+        # Always writes the job's latest state, so concurrent saves cannot leave a stale one behind
+        with self._save_lock:
+            with self._cond:
+                state = (job.status, job.attempts, job.last_error)
+            try:
+                self.save_job(job.id, *state)
+            except Exception:
+                pass  # The queue keeps working without persistence; the state is saved again on the next change
+
+    def _next_job(self):
+        # Called with the condition held; waits for a job whose printer has a free slot
+        while not self._closed:
+            now = time.monotonic()
+            wait = None
+            for job in self._pending:
+                if self._active.get(job.printer, 0) >= self.per_printer:
+                    continue
+                if job.not_before > now:
+                    wait = min(wait, job.not_before - now) if wait is not None else job.not_before - now
+                    continue
+                self._pending.remove(job)
+                return job
+            self._cond.wait(wait)
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                if job is None:
+                    return
+                self._active[job.printer] = self._active.get(job.printer, 0) + 1
+                job.status = PRINTING
+                job.attempts += 1
+                self._changed()
+            self._save(job)
+
+            if os.path.exists(job.file_path):
+                try:
+                    success, message = self.print_func(job.file_path, job.printer)
+                except Exception as e:
+                    success, message = False, str(e)
+                retryable = True
+            else:
+                success, message, retryable = False, f"File not found: {job.file_path}", False
+
+            with self._cond:
+                self._active[job.printer] -= 1
+                if success:
+                    job.status, job.last_error = DONE, None
+                elif retryable and job.attempts < self.max_attempts:
+                    job.status, job.last_error = QUEUED, message
+                    job.not_before = time.monotonic() + self.retry_delay * 2 ** (job.attempts - 1)
+                    self._pending.append(job)
+                else:
+                    job.status, job.last_error = FAILED, message
+                self._changed()
+            self._save(job)
@@ -0,0 +1,139 @@
+"""
+QR code rendering with NumPy. qrcode encodes the payload into codewords and
+lays out the function patterns; placing the data, choosing the mask and
+drawing the image are done on whole arrays instead of module by module.
+The result matches qrcode's own make(fit=True) / make_image() output
+pixel for pixel.
+"""
+import functools
+
+import numpy as np
+import qrcode
+from qrcode import util
+from PIL import Image
+
+# 11-module finder-like runs penalised by the mask evaluation (dark = 1)
+FINDER_RUNS = (0b10111010000, 0b00001011101)
+
+
+@functools.lru_cache(maxsize=None)
+def _layout(version, error_correction):
+    """
+    Function patterns of a symbol version, computed once per process.
+    Returns (scoring_grid, final_grids, data_rows, data_cols, masks):
+    grids of the function modules (data cells are False) as qrcode lays them
+    out while evaluating masks and for the final symbol of each mask pattern,
+    the data cells in placement order, and the eight data masks.
+    """
+    qr = qrcode.QRCode(version=version, error_correction=error_correction)
+    size = qr.modules_count = version * 4 + 17
+
+    def function_modules(test, mask_pattern):
+        qr.modules = [[None] * size for _ in range(size)]
+        qr.setup_position_probe_pattern(0, 0)
+        qr.setup_position_probe_pattern(size - 7, 0)
+        qr.setup_position_probe_pattern(0, size - 7)
+        qr.setup_position_adjust_pattern()
+        qr.setup_timing_pattern()
+        qr.setup_type_info(test, mask_pattern)
+        if version >= 7:
+            qr.setup_type_number(test)
+        return qr.modules
+
+    modules = function_modules(True, 0)
+    scoring_grid = np.array([[bool(cell) for cell in row] for row in modules])
+    final_grids = tuple(np.array([[bool(cell) for cell in row] for row in function_modules(False, mask_pattern)])
+                        for mask_pattern in range(8))
+
+    # Same zigzag walk as QRCode.map_data: two-column strips from the right, alternating up and down
+    data_cells = []
+    row, step = size - 1, -1
+    for col in range(size - 1, 0, -2):
+        if col <= 6:
+            col -= 1
+        while 0 <= row < size:
+            data_cells.extend((row, c) for c in (col, col - 1) if modules[row][c] is None)
+            row += step
+        row -= step
+        step = -step
+    data_rows, data_cols = (np.array(axis) for axis in zip(*data_cells))
+
+    i, j = np.indices((size, size))
+    masks = np.stack([
+        (i + j) % 2 == 0,
+        i % 2 == 0,
+        j % 3 == 0,
+        (i + j) % 3 == 0,
+        (i // 2 + j // 3) % 2 == 0,
+        (i * j) % 2 + (i * j) % 3 == 0,
+        ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+        ((i * j) % 3 + (i + j) % 2) % 2 == 0
+    ])
+    return scoring_grid, final_grids, data_rows, data_cols, masks
+
+
+def _penalties(symbols):
+    """
+    Mask penalty scores of a stack of (count, size, size) boolean symbols,
+    computed as qrcode.util.lost_point does for one symbol at a time.
+    """
+    count, size, _ = symbols.shape
+    # Rows and columns of every symbol as one stack of lines
+    lines = np.concatenate([symbols, symbols.transpose(0, 2, 1)], axis=1)
+
+    # 1. Runs of 5 or more same-colour modules: 3 points plus 1 per module beyond 5
+    starts = np.ones(lines.shape, dtype=bool)
+    starts[:, :, 1:] = lines[:, :, 1:] != lines[:, :, :-1]
+    run_starts = np.flatnonzero(starts)
+    run_lengths = np.diff(np.append(run_starts, starts.size))
+    run_points = np.where(run_lengths >= 5, run_lengths - 2, 0)
+    points = np.bincount(run_starts // (2 * size * size), weights=run_points, minlength=count).astype(np.int64)
+
+    # 2. 2x2 blocks of one colour: 3 points each
+    block = symbols[:, :-1, :-1]
+    uniform = (block == symbols[:, 1:, :-1]) & (block == symbols[:, :-1, 1:]) & (block == symbols[:, 1:, 1:])
+    points += 3 * uniform.sum(axis=(1, 2))
+
+    # 3. Finder-like 1:1:3:1:1 runs next to 4 light modules: 40 points each
+    windows = np.zeros((count, 2 * size, size - 10), dtype=np.int16)
+    for offset in range(11):
+        windows = (windows << 1) | lines[:, :, offset:offset + size - 10]
+    points += 40 * ((windows == FINDER_RUNS[0]) | (windows == FINDER_RUNS[1])).sum(axis=(1, 2))
+
+    # 4. Proportion of dark modules: 10 points per 5% away from 50%
+    for index, dark_count in enumerate(symbols.sum(axis=(1, 2)).tolist()):
+        points[index] += int(abs(float(dark_count) / (size ** 2) * 100 - 50) / 5) * 10
+    return points
+
+
+def qr_matrix(data, error_correction=qrcode.constants.ERROR_CORRECT_M):
+    """
+    Encodes `data` into the module matrix (True = dark, no quiet zone) of the
+    smallest QR version that fits, with the lowest-penalty mask.
+    """
+    qr = qrcode.QRCode(error_correction=error_correction)
+    qr.add_data(data)
+    version = qr.best_fit(start=1)
+    scoring_grid, final_grids, data_rows, data_cols, masks = _layout(version, error_correction)
+
+    # Data bits in placement order; remainder cells past the last codeword stay light before masking
+    codewords = np.frombuffer(bytes(util.create_data(version, error_correction, qr.data_list)), dtype=np.uint8)
+    bits = np.zeros(len(data_rows), dtype=bool)
+    bits[:codewords.size * 8] = np.unpackbits(codewords)[:len(data_rows)]
+    masked_bits = bits ^ masks[:, data_rows, data_cols]
+
+    candidates = np.repeat(scoring_grid[np.newaxis], 8, axis=0)
+    candidates[:, data_rows, data_cols] = masked_bits
+    mask_pattern = int(np.argmin(_penalties(candidates)))
+
+    matrix = final_grids[mask_pattern].copy()
+    matrix[data_rows, data_cols] = masked_bits[mask_pattern]
+    return matrix
+
+
+def rasterize(matrix, box_size=10, border=4):
+    """Draws a module matrix as a 1-bit PIL image, black on white, with a `border`-module quiet zone."""
+    light = ~np.pad(matrix, border)
+    pixels = light.repeat(box_size, axis=0).repeat(box_size, axis=1)
+    height, width = pixels.shape
+    return Image.frombytes('1', (width, height), np.packbits(pixels, axis=1).tobytes())
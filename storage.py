@@ -0,0 +1,1058 @@
+import datetime
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import metrics
+
+# Idle pooled connections older than this are pinged before reuse
+POOL_PING_INTERVAL = 30
+
+# Store DATETIME columns in SQLite as ISO strings and read them back as datetimes
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATETIME", lambda value: datetime.datetime.fromisoformat(value.decode()))
+
+
+def mysql_connector():
+    """Imports the MySQL driver on first use, so SQLite-only runs never load it."""
+    import mysql.connector
+    return mysql.connector
+
+
+class StorageError(Exception):
+    """Raised by the storage backends for any database failure."""
+
+
+class StorageConnectionError(StorageError):
+    """Raised when the storage backend cannot be reached at all."""
+
+
+class DuplicateImagePathsError(StorageError):
+    """Raised by migration 3 while created_codes rows share an image_path."""
+
+    def __init__(self, duplicates):
+        self.duplicates = duplicates  # (image_path, row_count) pairs
+        examples = ", ".join(path for path, _ in duplicates[:3])
+        super().__init__(f"{len(duplicates)} image paths are used by more than one code record (e.g. {examples}). "
+                         "Back up the database and remove the older records, then run setup again.")
+
+
+def describe_migrations(applied):
+    """Summarises a list of applied migration versions for setup messages."""
+    if not applied:
+        return "(Schema already up to date.)"
+    return f"(Applied schema migrations: {', '.join(str(version) for version in applied)}.)"
+
+
+def like_escape(text):
+    """Escapes LIKE wildcards in user input for use with ESCAPE '!'."""
+    return text.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+
+def chunked(iterable, size):
+    """Yields lists of up to `size` items from an iterable."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- 1. CONNECTION HANDLING ---
+
+class PooledConnection:
+    """Wraps a pooled connection; close() hands it back to its owner."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections. Connections are opened lazily, reused
+    across callers and pinged before reuse when they have been idle a while.
+    """
+
+    def __init__(self, connect_params, size, timeout):
+        self.connect_params = connect_params
+        self.timeout = timeout
+        self.closed = False
+        self._idle = deque()  # (connection, time it was returned)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Returns a PooledConnection, or None if the pool stays exhausted past the timeout."""
+        if not self._slots.acquire(timeout=self.timeout):
+            return None
+        try:
+            while True:
+                with self._lock:
+                    conn, released_at = self._idle.pop() if self._idle else (None, None)
+                if conn is None:
+                    break
+                if time.monotonic() - released_at < POOL_PING_INTERVAL or conn.is_connected():
+                    return PooledConnection(self, conn)
+                self._discard(conn)
+
+            conn = mysql_connector().connect(**self.connect_params)
+            if conn.database is None and self.connect_params.get('database'):
+                conn.database = self.connect_params['database']
+            return PooledConnection(self, conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """Returns a connection to the idle list, rolling back any open transaction."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if self.closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        except mysql_connector().Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes all idle connections; connections still in use are closed on release."""
+        self.closed = True
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# --- 2. STORAGE INTERFACE ---
+
+class Storage:
+    """
+    Query layer shared by the storage backends. All SQL used by the app lives
+    here and is written with %s placeholders; backends using another
+    paramstyle translate them in `sql()`.
+    """
+
+    name = None
+    driver_error = Exception
+    schema_checked = False  # set once migrate() has run against this database
+    schema_error = None  # why the last automatic migrate() stopped, if it needs the user to act
+
+    def sql(self, statement):
+        return statement
+
+    @property
+    def display_name(self):
+        """Human-readable name of the database, used in GUI messages."""
+        raise NotImplementedError
+
+    def connect(self, use_db_name=True):
+        """Returns a DB-API connection whose close() must always be called."""
+        raise NotImplementedError
+
+    def close(self):
+        """Releases any cached connections."""
+
+    def test_connection(self):
+        """Returns (True/False, message)."""
+        raise NotImplementedError
+
+    def setup(self):
+        """Creates the database and tables. Returns (True/False, message)."""
+        raise NotImplementedError
+
+    def backup(self):
+        """Backs up the database. Returns (True/False, message)."""
+        raise NotImplementedError
+
+    def drop(self):
+        """Permanently deletes the database. Raises StorageError on failure."""
+        raise NotImplementedError
+
+    @contextmanager
+    def cursor(self, use_db_name=True):
+        """Yields a cursor inside a transaction that is committed on success."""
+        try:
+            conn = self.connect(use_db_name)
+        except self.driver_error as err:
+            raise StorageConnectionError(f"Cannot connect to database: {err}") from err
+        if conn is None:
+            raise StorageConnectionError("Cannot connect to database.")
+
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except self.driver_error as err:
+            conn.rollback()
+            raise StorageError(str(err)) from err
+        finally:
+            cursor.close()
+            conn.close()
+
+    # --- Schema migrations ---
+
+    # Column list used when indexing created_codes.data (MySQL needs a prefix length)
+    data_index_columns = "data"
+    # Column definition of auto-numbered primary keys in tables added by migrations
+    serial_primary_key = "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    def table_columns(self, cursor, table):
+        """Returns the column names of a table, or an empty set if it does not exist."""
+        raise NotImplementedError
+
+    def index_exists(self, cursor, table, index):
+        raise NotImplementedError
+
+    def create_index(self, cursor, table, index, columns, unique=False):
+        """Creates an index unless one with the same name already exists."""
+        if not self.index_exists(cursor, table, index):
+            kind = "UNIQUE INDEX" if unique else "INDEX"
+            cursor.execute(f"CREATE {kind} {index} ON {table} ({columns})")
+
+    def create_tables(self, cursor):
+        """Migration 1: the original created_codes and scanned_codes tables."""
+        raise NotImplementedError
+
+    def add_content_hash(self, cursor):
+        """Migration 2: content hash of each rendered image, for the render cache."""
+        if 'content_hash' not in self.table_columns(cursor, 'created_codes'):
+            cursor.execute("ALTER TABLE created_codes ADD COLUMN content_hash CHAR(40) NULL")
+        self.create_index(cursor, 'created_codes', 'idx_created_codes_content_hash', "content_hash")
+
+    def dedupe_image_paths(self, cursor):
+        """Keeps only the newest row per image_path (older rows point at an overwritten file)."""
+        raise NotImplementedError
+
+    def duplicate_image_paths(self, cursor):
+        """Returns (image_path, row_count) for every image_path shared by more than one row."""
+        cursor.execute("SELECT image_path, COUNT(*) FROM created_codes GROUP BY image_path HAVING COUNT(*) > 1")
+        return cursor.fetchall()
+
+    def count_duplicate_image_paths(self):
+        """Returns the number of older created_codes rows that share their image_path with a newer one."""
+        with self.cursor() as cursor:
+            if not self.table_columns(cursor, 'created_codes'):
+                return 0
+            return sum(count - 1 for _, count in self.duplicate_image_paths(cursor))
+
+    def remove_duplicate_image_paths(self):
+        """
+        Deletes every created_codes row but the newest per image_path. Only
+        run on the user's request, after a backup. Returns the rows removed.
+        """
+        with self.cursor() as cursor:
+            self.dedupe_image_paths(cursor)
+            return cursor.rowcount
+
+    def add_access_indexes(self, cursor):
+        """
+        Migration 3: indexes behind list ordering, type filters and data/path
+        lookups. Stops with DuplicateImagePathsError while several rows share
+        an image_path; they are never removed without the user's consent.
+        """
+        if not self.index_exists(cursor, 'created_codes', 'uq_created_codes_image_path'):
+            duplicates = self.duplicate_image_paths(cursor)
+            if duplicates:
+                raise DuplicateImagePathsError(duplicates)
+        self.create_index(cursor, 'created_codes', 'idx_created_codes_date_created', "date_created, id")
+        self.create_index(cursor, 'created_codes', 'idx_created_codes_type', "type, id")
+        self.create_index(cursor, 'created_codes', 'idx_created_codes_data', self.data_index_columns)
+        self.create_index(cursor, 'created_codes', 'uq_created_codes_image_path', "image_path", unique=True)
+
+    def create_substring_index(self, cursor):
+        """Builds the index behind data substring searches, if the backend has one."""
+
+    def has_substring_index(self, cursor):
+        return False
+
+    def sync_substring_index(self, cursor):
+        """Brings a lazily maintained substring index up to date before a search."""
+
+    # Case-insensitive index for data prefix searches, if idx_created_codes_data is not one
+    prefix_index_columns = None
+
+    def add_search_indexes(self, cursor):
+        """Migration 4: indexes behind the Manage tab search (type + date, data prefixes and substrings)."""
+        self.create_index(cursor, 'created_codes', 'idx_created_codes_type_date', "type, date_created, id")
+        if self.prefix_index_columns:
+            self.create_index(cursor, 'created_codes', 'idx_created_codes_data_prefix', self.prefix_index_columns)
+        self.create_substring_index(cursor)
+
+    def create_print_jobs_table(self, cursor):
+        """Migration 5: persisted state of the print queue."""
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS print_jobs
+            (
+                id {self.serial_primary_key},
+                file_path VARCHAR(255) NOT NULL,
+                printer VARCHAR(255) NOT NULL,
+                status VARCHAR(16) NOT NULL,
+                attempts INT NOT NULL DEFAULT 0,
+                last_error TEXT NULL,
+                created_at DATETIME NOT NULL,
+                updated_at DATETIME NOT NULL
+            )
+        """)
+        self.create_index(cursor, 'print_jobs', 'idx_print_jobs_status', "status, id")
+
+    def create_batch_jobs_table(self, cursor):
+        """Migration 6: parameters and committed high-water mark of batch generation jobs."""
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS batch_jobs
+            (
+                id {self.serial_primary_key},
+                code_type VARCHAR(10) NOT NULL,
+                prefix VARCHAR(255) NOT NULL,
+                suffix VARCHAR(255) NOT NULL,
+                start_num INT NOT NULL,
+                end_num INT NOT NULL,
+                pad_length INT NOT NULL,
+                output_format VARCHAR(10) NOT NULL,
+                lazy_render INT NOT NULL DEFAULT 0,
+                status VARCHAR(16) NOT NULL,
+                committed_through INT NULL,
+                committed_count INT NOT NULL DEFAULT 0,
+                last_error TEXT NULL,
+                created_at DATETIME NOT NULL,
+                updated_at DATETIME NOT NULL
+            )
+        """)
+        self.create_index(cursor, 'batch_jobs', 'idx_batch_jobs_status', "status, id")
+
+    def migrations(self):
+        """Ordered (version, description, step) list; every step must be idempotent."""
+        return [
+            (1, "create created_codes and scanned_codes", self.create_tables),
+            (2, "add created_codes.content_hash", self.add_content_hash),
+            (3, "index created_codes access paths", self.add_access_indexes),
+            (4, "index created_codes for search", self.add_search_indexes),
+            (5, "create print_jobs", self.create_print_jobs_table),
+            (6, "create batch_jobs", self.create_batch_jobs_table),
+        ]
+
+    def migrate(self):
+        """
+        Applies pending migrations in order and records each one in
+        schema_version. Returns the list of versions applied.
+        """
+        self._substring_index = None
+        with self.cursor() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS schema_version "
+                           "(version INT NOT NULL PRIMARY KEY, description VARCHAR(255) NOT NULL, "
+                           "applied_at DATETIME NOT NULL)")
+            cursor.execute("SELECT MAX(version) FROM schema_version")
+            current_version = cursor.fetchone()[0] or 0
+
+        applied = []
+        for version, description, step in self.migrations():
+            if version <= current_version:
+                continue
+            with self.cursor() as cursor:
+                step(cursor)
+                cursor.execute(self.sql("INSERT INTO schema_version (version, description, applied_at) "
+                                        "VALUES (%s, %s, %s)"),
+                               (version, description, datetime.datetime.now()))
+            applied.append(version)
+        return applied
+
+    # --- Code records ---
+
+    # Re-creating a code with an existing file name replaces its record, since the file was overwritten
+    upsert_clause = ""
+
+    def insert_code(self, type, data, image_path, date_created, content_hash):
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("""
+                INSERT INTO created_codes (type, data, image_path, date_created, content_hash)
+                VALUES (%s, %s, %s, %s, %s)
+            """) + self.upsert_clause, (type, data, image_path, date_created, content_hash))
+
+    def insert_code_chunk(self, cursor, rows):
+        """Writes one chunk of (type, data, image_path, date_created, content_hash) rows."""
+        cursor.executemany(self.sql("""
+            INSERT INTO created_codes (type, data, image_path, date_created, content_hash)
+            VALUES (%s, %s, %s, %s, %s)
+        """) + self.upsert_clause, rows)
+
+    # --- Search filters ---
+
+    # Set by the first filtered query after migrate(): whether the substring index exists
+    _substring_index = None
+
+    def substring_condition(self, term):
+        """Returns (sql, params) narrowing rows through the substring index, or None."""
+        return None
+
+    def filter_conditions(self, cursor, filters):
+        """
+        Translates a search filter dict into WHERE conditions and params. Keys
+        (all optional): 'type', 'date_from' (inclusive), 'date_to' (exclusive),
+        'data_prefix' and 'data_contains'.
+        """
+        conditions, params = [], []
+        if filters.get('type'):
+            conditions.append("type = %s")
+            params.append(filters['type'])
+        if filters.get('date_from') is not None:
+            conditions.append("date_created >= %s")
+            params.append(filters['date_from'])
+        if filters.get('date_to') is not None:
+            conditions.append("date_created < %s")
+            params.append(filters['date_to'])
+        if filters.get('data_prefix'):
+            conditions.append("data LIKE %s ESCAPE '!'")
+            params.append(like_escape(filters['data_prefix']) + '%')
+
+        term = filters.get('data_contains')
+        if term:
+            if self._substring_index is None:
+                self._substring_index = self.has_substring_index(cursor)
+            narrowed = self.substring_condition(term) if self._substring_index else None
+            if narrowed is not None:
+                self.sync_substring_index(cursor)
+                conditions.append(narrowed[0])
+                params.extend(narrowed[1])
+            # Always re-checked exactly: the index may only narrow the candidate rows
+            conditions.append("data LIKE %s ESCAPE '!'")
+            params.append('%' + like_escape(term) + '%')
+        return conditions, params
+
+    def list_codes_page(self, order_by='date_created', after=None, before=None, limit=200, filters=None):
+        """
+        Returns one keyset page of (id, type, data, date_created, image_path)
+        rows, newest first. `after` fetches the rows following a page key and
+        `before` the rows preceding it; keys come from `page_key()`. `filters`
+        restricts the rows, see `filter_conditions()`.
+        """
+        if order_by == 'id':
+            key_columns = "id"
+            older, newer = "id < %s", "id > %s"
+        else:
+            key_columns = "date_created, id"
+            # Equivalent to a (date_created, id) row comparison, written so both engines seek the index
+            older = "date_created <= %s AND (date_created < %s OR id < %s)"
+            newer = "date_created >= %s AND (date_created > %s OR id > %s)"
+
+        columns = "SELECT id, type, data, date_created, image_path FROM created_codes"
+        desc = ", ".join(f"{column} DESC" for column in key_columns.split(", "))
+        asc = ", ".join(f"{column} ASC" for column in key_columns.split(", "))
+
+        with self.cursor() as cursor:
+            conditions, params = self.filter_conditions(cursor, filters or {})
+            if before is not None:
+                # Walk towards newer rows, then flip back to newest-first order
+                conditions.append(newer)
+                params.extend(self._key_params(before))
+                order = asc
+            else:
+                if after is not None:
+                    conditions.append(older)
+                    params.extend(self._key_params(after))
+                order = desc
+
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            statement = f"{columns}{where} ORDER BY {order} LIMIT %s"
+            params.append(limit)
+            cursor.execute(self.sql(statement), params)
+            rows = cursor.fetchall()
+        return rows[::-1] if before is not None else rows
+
+    def count_codes(self, filters=None):
+        """Returns the number of rows matching `filters`."""
+        with self.cursor() as cursor:
+            conditions, params = self.filter_conditions(cursor, filters or {})
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            cursor.execute(self.sql(f"SELECT COUNT(*) FROM created_codes{where}"), params)
+            return cursor.fetchone()[0]
+
+    def discard_results(self, cursor):
+        """Drops unread rows of an abandoned streaming query so the connection can be reused."""
+
+    def iter_codes(self, filters=None, ids=None, fetch_size=500):
+        """
+        Yields (id, type, data, date_created, image_path) rows in id order,
+        either the rows listed in `ids` or those matching `filters`. Rows are
+        read from the cursor `fetch_size` at a time instead of being loaded
+        all at once, so memory use does not grow with the result.
+        """
+        columns = "SELECT id, type, data, date_created, image_path FROM created_codes"
+        with self.cursor() as cursor:
+            if ids is not None:
+                for id_chunk in chunked(sorted(ids), fetch_size):
+                    placeholders = ", ".join(["%s"] * len(id_chunk))
+                    cursor.execute(self.sql(f"{columns} WHERE id IN ({placeholders}) ORDER BY id"), id_chunk)
+                    yield from cursor.fetchall()
+                return
+
+            conditions, params = self.filter_conditions(cursor, filters or {})
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            cursor.execute(self.sql(f"{columns}{where} ORDER BY id"), params)
+            finished = False
+            try:
+                while True:
+                    rows = cursor.fetchmany(fetch_size)
+                    if not rows:
+                        finished = True
+                        return
+                    yield from rows
+            finally:
+                if not finished:
+                    self.discard_results(cursor)
+
+    @staticmethod
+    def page_key(order_by, row):
+        """Returns the keyset position of a row returned by list_codes_page()."""
+        return (row[0],) if order_by == 'id' else (row[3], row[0])
+
+    @staticmethod
+    def _key_params(key):
+        # (id,) or (date_created, id); the date is repeated for the range and tie-break clauses
+        return key if len(key) == 1 else (key[0], key[0], key[1])
+
+    def update_code(self, record_id, data, image_path, content_hash):
+        with self.cursor() as cursor:
+            cursor.execute(
+                self.sql("UPDATE created_codes SET data = %s, image_path = %s, content_hash = %s WHERE id = %s"),
+                (data, image_path, content_hash, record_id))
+
+    def update_codes(self, rows):
+        """Applies (data, image_path, content_hash, id) updates in one transaction."""
+        with metrics.span('db.update_chunk'):
+            with self.cursor() as cursor:
+                cursor.executemany(
+                    self.sql("UPDATE created_codes SET data = %s, image_path = %s, content_hash = %s WHERE id = %s"),
+                    rows)
+
+    def delete_codes(self, ids):
+        """
+        Deletes the rows listed in `ids` with one DELETE ... IN statement and
+        returns the (id, image_path) of the rows that were removed.
+        """
+        if not ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(ids))
+        with metrics.span('db.delete_chunk'):
+            with self.cursor() as cursor:
+                cursor.execute(self.sql(f"SELECT id, image_path FROM created_codes WHERE id IN ({placeholders})"),
+                               list(ids))
+                rows = cursor.fetchall()
+                cursor.execute(self.sql(f"DELETE FROM created_codes WHERE id IN ({placeholders})"), list(ids))
+                return rows
+
+    def image_paths_for_hash(self, content_hash, limit=5):
+        """Returns the image paths of the newest rows with the given content hash."""
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("SELECT image_path FROM created_codes WHERE content_hash = %s "
+                                    "ORDER BY id DESC LIMIT %s"), (content_hash, limit))
+            return [row[0] for row in cursor.fetchall()]
+
+    def existing_image_paths(self, image_paths):
+        """Returns the subset of `image_paths` that already have a created_codes row."""
+        if not image_paths:
+            return set()
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("SELECT image_path FROM created_codes "
+                                    f"WHERE image_path IN ({', '.join(['%s'] * len(image_paths))})"),
+                           list(image_paths))
+            return {row[0] for row in cursor.fetchall()}
+
+    def code_ids_for_image_paths(self, image_paths):
+        """Returns the ids of the created_codes rows whose image_path is in `image_paths`."""
+        if not image_paths:
+            return []
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("SELECT id FROM created_codes "
+                                    f"WHERE image_path IN ({', '.join(['%s'] * len(image_paths))}) ORDER BY id"),
+                           list(image_paths))
+            return [row[0] for row in cursor.fetchall()]
+
+    # --- Print jobs ---
+
+    def insert_print_job(self, file_path, printer, status, created_at):
+        """Records a new print job and returns its id."""
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("INSERT INTO print_jobs "
+                                    "(file_path, printer, status, attempts, created_at, updated_at) "
+                                    "VALUES (%s, %s, %s, 0, %s, %s)"),
+                           (file_path, printer, status, created_at, created_at))
+            return cursor.lastrowid
+
+    def update_print_job(self, job_id, status, attempts, last_error, updated_at):
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("UPDATE print_jobs SET status = %s, attempts = %s, last_error = %s, "
+                                    "updated_at = %s WHERE id = %s"),
+                           (status, attempts, last_error, updated_at, job_id))
+
+    def list_print_jobs(self, statuses=None, limit=500, before_id=None):
+        """
+        Returns (id, file_path, printer, status, attempts, last_error,
+        created_at, updated_at) rows, newest first, optionally only those in
+        `statuses`. Pass the last id of one page as `before_id` to get the next.
+        """
+        conditions, params = [], []
+        if statuses:
+            conditions.append(f"status IN ({', '.join(['%s'] * len(statuses))})")
+            params.extend(statuses)
+        if before_id is not None:
+            conditions.append("id < %s")
+            params.append(before_id)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("SELECT id, file_path, printer, status, attempts, last_error, created_at, "
+                                    f"updated_at FROM print_jobs{where} ORDER BY id DESC LIMIT %s"),
+                           params + [limit])
+            return cursor.fetchall()
+
+    def delete_print_jobs(self, statuses):
+        """Deletes the print jobs in the given states. Returns the number of rows removed."""
+        with self.cursor() as cursor:
+            cursor.execute(self.sql(f"DELETE FROM print_jobs WHERE status IN ({', '.join(['%s'] * len(statuses))})"),
+                           list(statuses))
+            return cursor.rowcount
+
+
+    # --- Batch jobs ---
+
+    batch_job_columns = ("id, code_type, prefix, suffix, start_num, end_num, pad_length, output_format, lazy_render, "
+                         "status, committed_through, committed_count, last_error, created_at, updated_at")
+
+    def insert_batch_job(self, code_type, prefix, suffix, start_num, end_num, pad_length, output_format,
+                         lazy_render, status, created_at):
+        """Records a new batch job and returns its id."""
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("INSERT INTO batch_jobs "
+                                    "(code_type, prefix, suffix, start_num, end_num, pad_length, output_format, "
+                                    "lazy_render, status, committed_count, created_at, updated_at) "
+                                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 0, %s, %s)"),
+                           (code_type, prefix, suffix, start_num, end_num, pad_length, output_format,
+                            int(lazy_render), status, created_at, created_at))
+            return cursor.lastrowid
+
+    def get_batch_job(self, job_id):
+        """Returns the batch_jobs row of a job (see batch_job_columns), or None."""
+        with self.cursor() as cursor:
+            cursor.execute(self.sql(f"SELECT {self.batch_job_columns} FROM batch_jobs WHERE id = %s"), (job_id,))
+            return cursor.fetchone()
+
+    def list_batch_jobs(self, statuses=None, limit=100):
+        """Returns batch_jobs rows, newest first, optionally only those in `statuses`."""
+        where, params = "", []
+        if statuses:
+            where = f" WHERE status IN ({', '.join(['%s'] * len(statuses))})"
+            params.extend(statuses)
+        with self.cursor() as cursor:
+            cursor.execute(self.sql(f"SELECT {self.batch_job_columns} FROM batch_jobs{where} "
+                                    "ORDER BY id DESC LIMIT %s"), params + [limit])
+            return cursor.fetchall()
+
+    def update_batch_job(self, job_id, status, committed_through, last_error, updated_at):
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("UPDATE batch_jobs SET status = %s, committed_through = %s, last_error = %s, "
+                                    "updated_at = %s WHERE id = %s"),
+                           (status, committed_through, last_error, updated_at, job_id))
+
+    def delete_batch_job(self, job_id):
+        with self.cursor() as cursor:
+            cursor.execute(self.sql("DELETE FROM batch_jobs WHERE id = %s"), (job_id,))
+
+    def insert_batch_job_chunk(self, job_id, rows, committed_through, updated_at):
+        """
+        Inserts one chunk of (type, data, image_path, date_created,
+        content_hash) rows and moves the job's high-water mark in the same
+        transaction, so the mark never gets ahead of the recorded codes.
+        """
+        with metrics.span('db.insert_chunk'):
+            with self.cursor() as cursor:
+                if rows:
+                    self.insert_code_chunk(cursor, rows)
+                cursor.execute(self.sql("UPDATE batch_jobs SET committed_through = %s, "
+                                        "committed_count = committed_count + %s, updated_at = %s WHERE id = %s"),
+                               (committed_through, len(rows), updated_at, job_id))
+
+
+# --- 3. MYSQL BACKEND ---
+
+class MySQLStorage(Storage):
+    """MySQL server backend using a shared, bounded connection pool."""
+
+    name = 'mysql'
+    data_index_columns = "data(64)"
+    serial_primary_key = "INT AUTO_INCREMENT PRIMARY KEY"
+    upsert_clause = (" ON DUPLICATE KEY UPDATE type = VALUES(type), data = VALUES(data),"
+                     " date_created = VALUES(date_created), content_hash = VALUES(content_hash)")
+
+    def __init__(self, db_config, pool_size, pool_timeout):
+        self.db_config = db_config
+        connect_params = db_config.copy()
+        if not connect_params.get('password'):
+            connect_params.pop('password', None)
+        self.pool = ConnectionPool(connect_params, pool_size, pool_timeout)
+
+    @property
+    def display_name(self):
+        return self.db_config['database']
+
+    @property
+    def driver_error(self):
+        return mysql_connector().Error
+
+    def connect(self, use_db_name=True):
+        if use_db_name:
+            return self.pool.acquire()
+
+        # Server-level connections (create/drop database) bypass the pool
+        connect_params = self.pool.connect_params.copy()
+        connect_params.pop('database', None)
+        return mysql_connector().connect(**connect_params)
+
+    def close(self):
+        self.pool.close()
+
+    def insert_code_chunk(self, cursor, rows):
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+        values = [value for row in rows for value in row]
+        cursor.execute(
+            f"INSERT INTO created_codes (type, data, image_path, date_created, content_hash) VALUES {placeholders}"
+            + self.upsert_clause, values)
+
+    def table_columns(self, cursor, table):
+        cursor.execute("SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,))
+        return {row[0] for row in cursor.fetchall()}
+
+    def index_exists(self, cursor, table, index):
+        cursor.execute("SELECT 1 FROM information_schema.STATISTICS "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1",
+                       (table, index))
+        return cursor.fetchone() is not None
+
+    def create_substring_index(self, cursor):
+        if self.index_exists(cursor, 'created_codes', 'ft_created_codes_data'):
+            return
+        try:
+            cursor.execute("ALTER TABLE created_codes "
+                           "ADD FULLTEXT INDEX ft_created_codes_data (data) WITH PARSER ngram")
+        except self.driver_error:
+            pass  # Servers without the ngram parser (e.g. MariaDB) fall back to LIKE scans
+
+    def has_substring_index(self, cursor):
+        return self.index_exists(cursor, 'created_codes', 'ft_created_codes_data')
+
+    def substring_condition(self, term):
+        # The ngram parser indexes 2-character tokens; a quoted phrase matches them in sequence
+        if len(term) < 2:
+            return None
+        return "MATCH(data) AGAINST (%s IN BOOLEAN MODE)", ['"' + term.replace('"', ' ') + '"']
+
+    def discard_results(self, cursor):
+        # Pool cursors are unbuffered (rows stream from the server), so unread rows must be drained
+        try:
+            while cursor.fetchmany(500):
+                pass
+        except self.driver_error:
+            pass  # The pool discards connections it cannot roll back
+
+    def dedupe_image_paths(self, cursor):
+        cursor.execute("DELETE older FROM created_codes older "
+                       "JOIN created_codes newer ON newer.image_path = older.image_path AND newer.id > older.id")
+
+    def create_tables(self, cursor):
+        cursor.execute("""
+                       CREATE TABLE IF NOT EXISTS created_codes
+                       (
+                           id
+                           INT
+                           AUTO_INCREMENT
+                           PRIMARY
+                           KEY,
+                           type
+                           VARCHAR
+                       (
+                           10
+                       ) NOT NULL,
+                           data TEXT NOT NULL,
+                           image_path VARCHAR
+                       (
+                           255
+                       ) NOT NULL,
+                           date_created DATETIME NOT NULL
+                           )
+                       """)
+
+        cursor.execute("""
+                       CREATE TABLE IF NOT EXISTS scanned_codes
+                       (
+                           id
+                           INT
+                           AUTO_INCREMENT
+                           PRIMARY
+                           KEY,
+                           data
+                           TEXT
+                           NOT
+                           NULL,
+                           date_scanned
+                           DATETIME
+                           NOT
+                           NULL
+                       )
+                       """)
+
+    def test_connection(self):
+        try:
+            conn = self.connect(use_db_name=False)
+            conn.close()
+            return True, "Connection test successful!"
+        except self.driver_error as err:
+            return False, f"Connection test failed:\n{err}\n\nCheck your MySQL settings."
+
+    def setup(self):
+        try:
+            conn = self.connect(use_db_name=False)
+        except self.driver_error:
+            return False, "Cannot connect to MySQL server. Check configuration."
+
+        try:
+            cursor = conn.cursor()
+
+            db_name = self.db_config['database']
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
+
+            conn.commit()
+            cursor.close()
+            conn.close()
+
+            applied = self.migrate()
+            return True, f"Database '{db_name}' and tables are ready! {describe_migrations(applied)}"
+
+        except StorageError as err:
+            return False, f"Error setting up database: {err}"
+
+        except self.driver_error as err:
+            return False, f"Error setting up database: {err}"
+
+    def backup(self):
+        """Performs a database backup using mysqldump."""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_file = f"code_manager_backup_{timestamp}.sql"
+
+        try:
+            command = [
+                "mysqldump",
+                "-u", self.db_config['user'],
+            ]
+            if self.db_config['password']:
+                command.append(f"--password={self.db_config['password']}")
+
+            command.extend([
+                self.db_config['database'],
+                "-r", backup_file
+            ])
+
+            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return True, f"Database backed up successfully to: {backup_file}"
+
+        except FileNotFoundError:
+            return False, "mysqldump command not found. Ensure XAMPP's MySQL bin folder is in your system PATH."
+        except subprocess.CalledProcessError as e:
+            return False, f"Error during backup: {e.stderr.decode()}"
+        except Exception as e:
+            return False, f"An unexpected error occurred: {e}"
+
+    def drop(self):
+        with self.cursor(use_db_name=False) as cursor:
+            cursor.execute(f"DROP DATABASE `{self.db_config['database']}`")
+        self.pool.close()
+
+
+# --- 4. SQLITE BACKEND ---
+
+class SQLiteStorage(Storage):
+    """
+    Embedded single-file backend. Each thread keeps one connection open in
+    WAL mode; sqlite3 caches the prepared statements per connection.
+    """
+
+    name = 'sqlite'
+    driver_error = sqlite3.Error
+    prefix_index_columns = "data COLLATE NOCASE"
+    upsert_clause = (" ON CONFLICT(image_path) DO UPDATE SET type = excluded.type, data = excluded.data,"
+                     " date_created = excluded.date_created, content_hash = excluded.content_hash")
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    @property
+    def display_name(self):
+        return self.path
+
+    def sql(self, statement):
+        return statement.replace('%s', '?')
+
+    def connect(self, use_db_name=True):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES,
+                                   cached_statements=256, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """Keeps the thread's connection open, discarding any unfinished transaction."""
+        if conn.in_transaction:
+            conn.rollback()
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def table_columns(self, cursor, table):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {row[1] for row in cursor.fetchall()}
+
+    def test_connection(self):
+        try:
+            self.connect().close()
+            return True, f"SQLite database '{self.path}' is accessible."
+        except sqlite3.Error as err:
+            return False, f"Cannot open SQLite database '{self.path}':\n{err}"
+
+    def index_exists(self, cursor, table, index):
+        cursor.execute(f"PRAGMA index_list({table})")
+        return any(row[1] == index for row in cursor.fetchall())
+
+    def dedupe_image_paths(self, cursor):
+        cursor.execute("DELETE FROM created_codes WHERE id NOT IN "
+                       "(SELECT MAX(id) FROM created_codes GROUP BY image_path)")
+
+    def create_substring_index(self, cursor):
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS created_codes_fts USING fts5(data, tokenize='trigram')")
+        except sqlite3.OperationalError:
+            return  # fts5 or its trigram tokenizer (SQLite 3.34+) is unavailable; fall back to LIKE scans
+
+        # New rows are indexed lazily by sync_substring_index(); only changes to indexed rows are mirrored here
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS created_codes_fts_delete AFTER DELETE ON created_codes BEGIN
+                DELETE FROM created_codes_fts WHERE rowid = old.id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS created_codes_fts_update AFTER UPDATE OF data ON created_codes BEGIN
+                UPDATE created_codes_fts SET data = new.data WHERE rowid = old.id;
+            END
+        """)
+
+    def has_substring_index(self, cursor):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'created_codes_fts'")
+        return cursor.fetchone() is not None
+
+    def sync_substring_index(self, cursor):
+        """
+        Indexes rows added since the last search. Trigram indexing costs several
+        times the insert itself, so batches skip it and pay it once, here.
+        AUTOINCREMENT ids are never reused, so everything above the highest
+        indexed id is new.
+        """
+        with self._sync_lock:
+            cursor.execute("INSERT INTO created_codes_fts (rowid, data) SELECT id, data FROM created_codes "
+                           "WHERE id > (SELECT IFNULL(MAX(rowid), 0) FROM created_codes_fts)")
+            cursor.connection.commit()
+
+    def substring_condition(self, term):
+        # Trigram phrase queries need at least one full trigram
+        if len(term) < 3:
+            return None
+        return ("id IN (SELECT rowid FROM created_codes_fts WHERE created_codes_fts MATCH %s)",
+                ['"' + term.replace('"', '""') + '"'])
+
+    def create_tables(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS created_codes
+            (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type VARCHAR(10) NOT NULL,
+                data TEXT NOT NULL,
+                image_path VARCHAR(255) NOT NULL,
+                date_created DATETIME NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scanned_codes
+            (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data TEXT NOT NULL,
+                date_scanned DATETIME NOT NULL
+            )
+        """)
+
+    def setup(self):
+        try:
+            applied = self.migrate()
+            return True, f"Database '{self.path}' and tables are ready! {describe_migrations(applied)}"
+        except StorageError as err:
+            return False, f"Error setting up database: {err}"
+
+    def backup(self):
+        """Copies the database with the SQLite online backup API."""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_file = f"code_manager_backup_{timestamp}.db"
+
+        conn = self.connect()
+        try:
+            target = sqlite3.connect(backup_file)
+            with target:
+                conn.backup(target)
+            target.close()
+            return True, f"Database backed up successfully to: {backup_file}"
+        except sqlite3.Error as err:
+            return False, f"Error during backup: {err}"
+        finally:
+            conn.close()
+
+    def drop(self):
+        self.close()
+        try:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+        except OSError as err:
+            raise StorageError(str(err)) from err
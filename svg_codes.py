@@ -0,0 +1,82 @@
+"""
+Vector (SVG) output for QR codes and Code 128 barcodes. Each code is one
+<path> of rectangles (runs of dark modules per QR row, one per bar), so the
+files stay small and print sharply at any size. Pure Python; no NumPy needed.
+"""
+from xml.sax.saxutils import escape
+
+POINTS_TO_MM = 0.352777778
+
+
+def _number(value):
+    return f"{value:.3f}".rstrip('0').rstrip('.')
+
+
+def printable(text):
+    # Code 128 can encode control characters, which XML does not allow
+    return "".join(char if char.isprintable() else " " for char in text)
+
+
+def qr_svg(matrix, box_size=10, border=4):
+    """
+    Returns a QR module matrix (rows of truthy dark modules, no quiet zone)
+    as SVG bytes, laid out in module units and sized like the PNG output
+    (`box_size` pixels per module, `border` modules of quiet zone).
+    """
+    size = len(matrix)
+    total = size + 2 * border
+    segments = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                run_start = x
+                while x < size and row[x]:
+                    x += 1
+                segments.append(f"M{run_start + border} {y + border}h{x - run_start}v1h{run_start - x}z")
+            else:
+                x += 1
+
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{total * box_size}" height="{total * box_size}" '
+            f'viewBox="0 0 {total} {total}" shape-rendering="crispEdges">'
+            f'<rect width="{total}" height="{total}" fill="#fff"/>'
+            f'<path fill="#000" d="{"".join(segments)}"/></svg>\n').encode('utf-8')
+
+
+def code128_svg(data, module_width=0.2, module_height=15.0, quiet_zone=2.54, font_size=10, text_distance=5.0,
+                margin=1.0, write_text=True):
+    """
+    Returns a Code 128 barcode as SVG bytes, in millimetres with the layout
+    of python-barcode's ImageWriter defaults and the data as a text caption.
+    """
+    from barcode import Code128
+
+    pattern = Code128(data).build()[0]
+    width = 2 * quiet_zone + len(pattern) * module_width
+    height = 2 * margin + module_height
+    write_text = write_text and font_size > 0
+    if write_text:
+        height += font_size * POINTS_TO_MM / 2 + text_distance
+
+    segments = []
+    index = 0
+    while index < len(pattern):
+        run_start = index
+        while index < len(pattern) and pattern[index] == pattern[run_start]:
+            index += 1
+        if pattern[run_start] == '1':
+            x = quiet_zone + run_start * module_width
+            bar_width = (index - run_start) * module_width
+            segments.append(f"M{_number(x)} {_number(margin)}h{_number(bar_width)}v{_number(module_height)}"
+                            f"h{_number(-bar_width)}z")
+
+    caption = ""
+    if write_text:
+        caption = (f'<text x="{_number(width / 2)}" y="{_number(margin + module_height + text_distance)}" '
+                   f'font-family="DejaVu Sans Mono, monospace" font-size="{_number(font_size * POINTS_TO_MM)}" '
+                   f'text-anchor="middle">{escape(printable(data))}</text>')
+
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{_number(width)}mm" height="{_number(height)}mm" '
+            f'viewBox="0 0 {_number(width)} {_number(height)}" shape-rendering="crispEdges">'
+            f'<rect width="{_number(width)}" height="{_number(height)}" fill="#fff"/>'
+            f'<path fill="#000" d="{"".join(segments)}"/>{caption}</svg>\n').encode('utf-8')
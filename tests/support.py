@@ -0,0 +1,77 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_utils  # noqa: E402
+
+CONFIG = """[mysql]
+host = localhost
+user = root
+password =
+database = code_manager_db
+
+[storage]
+backend = sqlite
+sqlite_path = codes.db
+
+[batch]
+workers = 1
+chunk_size = 16
+insert_chunk_size = 50
+queue_size = 32
+
+[metrics]
+enabled = no
+"""
+
+
+def reset_storage():
+    """Closes the cached backend, so the next get_storage() opens the database of the current directory."""
+    with db_utils._storage_lock:
+        if db_utils._storage['backend'] is not None:
+            db_utils._storage['backend'].close()
+        db_utils._storage['key'] = db_utils._storage['backend'] = None
+
+
+class WorkdirTestCase(unittest.TestCase):
+    """
+    Runs each test in an empty working directory holding a config.ini for a
+    SQLite database, the way the app and CLI run, with the schema set up
+    unless `setup_schema` is False.
+    """
+
+    config = CONFIG
+    setup_schema = True
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmp)
+        with open('config.ini', 'w') as f:
+            f.write(self.config)
+        db_utils.invalidate_config_cache()
+        reset_storage()
+        self.addCleanup(reset_storage)
+
+        if self.setup_schema:
+            success, message = db_utils.setup_database_tables()
+            self.assertTrue(success, message)
+            self.storage = db_utils.get_storage()
+
+    def codes(self, **filters):
+        """Returns (id, type, data, date_created, image_path) rows in id order."""
+        return sorted(db_utils.get_storage().iter_codes(filters=filters or None))
+
+    def generated_files(self):
+        if not os.path.isdir(db_utils.CODES_DIR):
+            return []
+        return sorted(name for name in os.listdir(db_utils.CODES_DIR) if not name.startswith('.'))
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
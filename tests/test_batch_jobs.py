@@ -0,0 +1,106 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+from support import WorkdirTestCase
+
+import db_utils
+
+
+def cancel_after(count, cancel_event):
+    """Returns a progress callback that sets `cancel_event` once `count` codes were processed."""
+    def progress(done):
+        if done >= count:
+            cancel_event.set()
+    return progress
+
+
+class BatchJobTest(WorkdirTestCase):
+
+    def generate(self, prefix, start, end, pad=4, **kwargs):
+        kwargs.setdefault('workers', 1)
+        return db_utils.generate_batch_codes('QR', prefix, start, end, pad, **kwargs)
+
+    def last_job(self):
+        return db_utils.list_batch_jobs(None, 1)[0]
+
+    def test_batch_records_every_code_and_finishes_the_job(self):
+        self.assertEqual(self.generate('ITEM-', 1, 120), (120, []))
+
+        job = self.last_job()
+        self.assertEqual((job.status, job.committed_through, job.committed_count), (db_utils.JOB_FINISHED, 120, 120))
+        self.assertEqual([row[2] for row in self.codes()], [f"ITEM-{number:04d}" for number in range(1, 121)])
+        self.assertEqual(len(self.generated_files()), 120)
+
+    def test_cancel_after_the_last_code_still_finishes_the_job(self):
+        cancel_event = threading.Event()
+        generated, errors = self.generate('ITEM-', 1, 120, progress=cancel_after(120, cancel_event),
+                                          cancel_event=cancel_event)
+        self.assertEqual((generated, errors), (120, []))
+        self.assertEqual(self.last_job().status, db_utils.JOB_FINISHED)
+
+    def test_cancel_keeps_the_mark_at_the_recorded_codes_and_resume_finishes(self):
+        cancel_event = threading.Event()
+        generated, errors = self.generate('ITEM-', 1, 2000, progress=cancel_after(1, cancel_event),
+                                          cancel_event=cancel_event)
+        self.assertLess(generated, 500)
+        self.assertIn(f"Batch job {self.last_job().id} can be resumed.", errors)
+
+        job = self.last_job()
+        self.assertEqual(job.status, db_utils.JOB_CANCELLED)
+        self.assertEqual(job.committed_through, generated)
+        self.assertEqual(len(self.codes()), generated)
+        self.assertEqual(len(self.generated_files()), generated)
+
+        self.assertEqual(db_utils.resume_batch_job(job.id, workers=1), (2000 - generated, []))
+        job = db_utils.load_batch_job(job.id)
+        self.assertEqual((job.status, job.committed_through), (db_utils.JOB_FINISHED, 2000))
+        self.assertEqual([row[2] for row in self.codes()], [f"ITEM-{number:04d}" for number in range(1, 2001)])
+
+    def test_cancel_stops_the_process_pool(self):
+        cancel_event = threading.Event()
+        generated, errors = self.generate('ITEM-', 1, 3000, workers=2, chunk_size=8,
+                                          progress=cancel_after(1, cancel_event), cancel_event=cancel_event)
+        self.assertLess(generated, 1000)
+        job = self.last_job()
+        self.assertEqual((job.status, job.committed_through), (db_utils.JOB_CANCELLED, generated))
+        self.assertEqual(len(self.codes()), generated)
+
+    def test_resume_skips_codes_recorded_past_the_mark(self):
+        self.generate('ITEM-', 1, 60)
+        job = self.last_job()
+        # As if the app died right after recording codes 11 to 60, with 31 to 35 lost again
+        self.storage.update_batch_job(job.id, db_utils.JOB_RUNNING, 10, None, job.updated_at)
+        lost = [row[0] for row in self.codes() if row[2] in {f"ITEM-{number:04d}" for number in range(31, 36)}]
+        self.assertEqual(len(db_utils.delete_code_records(ids=lost)[0]), 5)
+        kept = os.path.join(db_utils.CODES_DIR, 'ITEM-0050_QR.png')
+        os.utime(kept, (0, 0))
+
+        with mock.patch.object(db_utils, 'RESUME_WINDOW', 7):
+            self.assertEqual(db_utils.resume_batch_job(job.id, workers=1), (5, []))
+
+        self.assertEqual(os.stat(kept).st_mtime, 0)  # not rendered again
+        self.assertEqual(sorted(row[2] for row in self.codes()), [f"ITEM-{number:04d}" for number in range(1, 61)])
+        job = db_utils.load_batch_job(job.id)
+        self.assertEqual((job.status, job.committed_through), (db_utils.JOB_FINISHED, 60))
+
+    def test_resume_refuses_a_finished_job(self):
+        self.generate('ITEM-', 1, 5)
+        job_id = self.last_job().id
+        self.assertEqual(db_utils.resume_batch_job(job_id), (0, [f"Batch job {job_id} is already finished."]))
+
+    def test_job_code_ids_match_the_sequence_exactly(self):
+        self.generate('B', 1, 9, pad=1, lazy=True)
+        first = self.last_job()
+        self.generate('B', 10, 100, pad=1, lazy=True)
+
+        data = {row[0]: row[2] for row in self.codes()}
+        self.assertEqual(sorted(data[record_id] for record_id in db_utils.batch_job_code_ids(first.id)),
+                         sorted(f"B{number}" for number in range(1, 10)))
+        with self.assertRaisesRegex(ValueError, "Batch job 99 not found."):
+            db_utils.batch_job_code_ids(99)
+
+
+if __name__ == '__main__':
+    unittest.main()
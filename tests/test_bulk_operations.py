@@ -0,0 +1,156 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import re
+import tarfile
+import unittest
+import zipfile
+from unittest import mock
+
+from support import WorkdirTestCase
+
+import code_manager_cli
+import db_utils
+from storage import StorageError
+
+
+class BulkTestCase(WorkdirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.assertEqual(db_utils.generate_batch_codes('QR', 'B', 1, 12, 1, workers=1), (12, []))
+        self.job_id = db_utils.list_batch_jobs(None, 1)[0].id
+
+    def ids(self, *data):
+        by_data = {row[2]: row[0] for row in self.codes()}
+        return [by_data[value] for value in data]
+
+    def temp_files(self):
+        return [name for name in self.generated_files() if name.endswith('.tmp')]
+
+
+class RegenerateTest(BulkTestCase):
+
+    def test_rewrites_data_and_images_of_the_selection_only(self):
+        ids = self.ids('B1', 'B2')
+        old_image = self.read(self.codes()[0][4])
+
+        self.assertEqual(db_utils.regenerate_codes(ids=ids, rewrite=lambda data: data.replace('B', 'X'), workers=1),
+                         (2, []))
+        rows = self.codes()
+        self.assertEqual([row[2] for row in rows], ['X1', 'X2'] + [f"B{number}" for number in range(3, 13)])
+        self.assertEqual(rows[0][4], os.path.join(db_utils.CODES_DIR, 'B1_QR.png'))  # file names are kept
+        self.assertNotEqual(self.read(rows[0][4]), old_image)
+        self.assertEqual(self.temp_files(), [])
+
+    def test_failed_update_keeps_old_images_and_data(self):
+        before = self.codes()
+        images = {row[4]: self.read(row[4]) for row in before}
+
+        with mock.patch.object(self.storage, 'update_codes', side_effect=StorageError("database is locked")):
+            regenerated, errors = db_utils.regenerate_codes(ids=[row[0] for row in before],
+                                                            rewrite=lambda data: data + '-NEW', workers=1)
+
+        self.assertEqual(regenerated, 0)
+        self.assertEqual(len(errors), 12)
+        self.assertIn("database is locked", errors[0])
+        self.assertEqual(self.codes(), before)
+        self.assertEqual({path: self.read(path) for path in images}, images)
+        self.assertEqual(self.temp_files(), [])
+
+
+class DeleteTest(BulkTestCase):
+
+    def test_removes_rows_and_image_files(self):
+        ids = self.ids('B3', 'B4', 'B5')
+        deleted, errors = db_utils.delete_code_records(ids=ids, chunk_size=2)
+        self.assertEqual((sorted(deleted), errors), (sorted(ids), []))
+        self.assertEqual(len(self.codes()), 9)
+        self.assertNotIn('B4_QR.png', self.generated_files())
+        self.assertIn('B10_QR.png', self.generated_files())
+
+    def test_missing_files_are_not_errors(self):
+        self.assertEqual(db_utils.generate_batch_codes('QR', 'L', 1, 3, 1, workers=1, lazy=True), (3, []))
+        self.assertEqual(len(db_utils.delete_code_records(filters={'data_prefix': 'L'})[0]), 3)
+        self.assertEqual(len(self.codes()), 12)
+
+
+class ExportAndLabelsTest(BulkTestCase):
+
+    def test_zip_archive_with_csv_manifest(self):
+        ids = self.ids('B1', 'B10')
+        self.assertEqual(db_utils.export_code_archive('codes.zip', 'csv', ids=ids), (2, []))
+        with zipfile.ZipFile('codes.zip') as archive:
+            manifest = list(csv.DictReader(io.TextIOWrapper(archive.open('manifest.csv'), encoding='utf-8')))
+            self.assertEqual([(int(row['id']), row['data']) for row in manifest], list(zip(ids, ['B1', 'B10'])))
+            for row in manifest:
+                self.assertEqual(archive.read(row['file']), self.read(os.path.join(db_utils.CODES_DIR,
+                                                                                   f"{row['data']}_QR.png")))
+
+    def test_tar_archive_with_json_manifest(self):
+        self.assertEqual(db_utils.export_code_archive('codes.tar.gz', 'json', filters={'data_prefix': 'B1'}), (4, []))
+        with tarfile.open('codes.tar.gz') as archive:
+            manifest = json.load(archive.extractfile('manifest.json'))
+            self.assertEqual(sorted(entry['data'] for entry in manifest), ['B1', 'B10', 'B11', 'B12'])
+            self.assertEqual(len(archive.getnames()), 5)
+
+    def test_label_pdf_has_one_page_per_sheet(self):
+        self.assertEqual(db_utils.generate_batch_codes('QR', 'L', 1, 18, 2, workers=1, lazy=True), (18, []))
+        placed, errors = db_utils.compose_label_sheets('labels.pdf', filters={'data_prefix': 'L'})
+        self.assertEqual((placed, errors), (18, []))
+        with open('labels.pdf', 'rb') as f:
+            pdf = f.read()
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(re.search(rb'/Type /Pages /Kids \[[^]]*\] /Count (\d+)', pdf).group(1), b'1')  # 3 x 8 grid
+
+        self.assertEqual(db_utils.compose_label_sheets('more.pdf', ids=self.ids(*[f"B{n}" for n in range(1, 13)]) +
+                                                       [row[0] for row in self.codes(data_prefix='L')])[0], 30)
+        with open('more.pdf', 'rb') as f:
+            self.assertEqual(re.search(rb'/Count (\d+) >>', f.read()).group(1), b'2')
+
+
+class CommandLineSelectionTest(BulkTestCase):
+
+    def run_cli(self, *argv):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            status = code_manager_cli.main(list(argv))
+        return status, out.getvalue() + err.getvalue()
+
+    def test_job_selection_is_exact(self):
+        self.assertEqual(db_utils.generate_batch_codes('QR', 'B', 13, 100, 1, workers=1, lazy=True)[1], [])
+        small_batch = self.job_id
+
+        self.assertEqual(self.run_cli('export', 'b.zip', '--job', str(small_batch))[0], 0)
+        with zipfile.ZipFile('b.zip') as archive:
+            self.assertEqual(len(archive.namelist()), 12 + 1)
+        self.assertEqual(self.run_cli('export', 'x.zip', '--job', '99'), (1, "Batch job 99 not found.\n"))
+
+    def test_regenerate_and_delete_need_an_explicit_selection(self):
+        with mock.patch('sys.stdin', io.StringIO()):
+            status, output = self.run_cli('regenerate', '--replace', 'B', 'X')
+            self.assertEqual(status, 1)
+            self.assertIn("or pass --all", output)
+            status, output = self.run_cli('regenerate', '--starts-with', 'B1', '--replace', 'B', 'X')
+            self.assertEqual(status, 1)
+            self.assertIn("Regenerate 4 codes? Pass --yes to confirm.", output)
+            status, output = self.run_cli('delete', '--all')
+            self.assertEqual(status, 1)
+            self.assertIn("Delete 12 codes and their image files? Pass --yes to confirm.", output)
+        self.assertEqual([row[2] for row in self.codes()], [f"B{number}" for number in range(1, 13)])
+
+        self.assertEqual(self.run_cli('regenerate', '--starts-with', 'B1', '--replace', 'B', 'X', '--yes')[0], 0)
+        self.assertEqual(sorted(row[2] for row in self.codes(data_prefix='X')), ['X1', 'X10', 'X11', 'X12'])
+
+    def test_delete_job_removes_its_codes_and_the_job(self):
+        self.assertEqual(self.run_cli('delete', '--job', str(self.job_id)),
+                         (0, "Deleted 12 codes and their image files.\n"))
+        self.assertEqual(self.codes(), [])
+        self.assertEqual(self.generated_files(), [])
+        self.assertIsNone(db_utils.load_batch_job(self.job_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
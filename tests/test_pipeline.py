@@ -0,0 +1,78 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import run_pipeline  # noqa: E402
+
+
+def counting_source(count, produced):
+    for item in range(count):
+        produced.append(item)
+        yield item
+
+
+def slow_stage(items, delay=0.002):
+    for item in items:
+        time.sleep(delay)
+        yield item
+
+
+class RunPipelineTest(unittest.TestCase):
+
+    def tearDown(self):
+        alive = [thread.name for thread in threading.enumerate() if thread.name.startswith('pipeline-')]
+        self.assertEqual(alive, [])
+
+    def test_items_pass_every_stage_in_order(self):
+        stages = [lambda items: (item * 2 for item in items), lambda items: (item + 1 for item in items)]
+        self.assertEqual(list(run_pipeline(range(500), stages, queue_size=4)), [item * 2 + 1 for item in range(500)])
+
+    def test_backpressure_bounds_the_items_in_flight(self):
+        produced = []
+        results = run_pipeline(counting_source(10000, produced), [lambda items: items], queue_size=3)
+        self.assertEqual(next(results), 0)
+        time.sleep(0.3)
+        # Two queues of 3, plus one item held by the producer and the stage thread each
+        self.assertLessEqual(len(produced), 1 + 2 * 3 + 2)
+        results.close()
+
+    def test_cancel_drops_the_items_the_first_stage_has_not_taken(self):
+        produced, taken = [], []
+        cancel_event = threading.Event()
+
+        def render(items):
+            for item in items:
+                taken.append(item)
+                yield from slow_stage([item])
+
+        results = run_pipeline(counting_source(1000, produced), [render, slow_stage], queue_size=8,
+                               cancel_event=cancel_event)
+        outputs = [next(results)]
+        cancel_event.set()
+        outputs.extend(results)
+
+        self.assertEqual(outputs, list(range(len(outputs))))
+        self.assertEqual(outputs, taken)  # everything the first stage produced still came out
+        self.assertLess(len(taken), 30)
+        self.assertLess(len(produced), 1000)
+
+    def test_stage_errors_reach_the_consumer(self):
+        def failing(items):
+            for item in items:
+                if item == 5:
+                    raise ValueError("bad item")
+                yield item
+
+        outputs = []
+        with self.assertRaisesRegex(ValueError, "bad item"):
+            for item in run_pipeline(range(100), [failing], queue_size=2):
+                outputs.append(item)
+        self.assertEqual(outputs, [0, 1, 2, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
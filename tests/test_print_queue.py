@@ -0,0 +1,199 @@
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from print_queue import CANCELLED, DONE, FAILED, FINISHED_STATES, QUEUED, PrintQueue  # noqa: E402
+
+
+class FakeSpooler:
+    """Stands in for the OS spooler: records every call and fails the first `failures` per file."""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = []  # (file_path, printer, monotonic time)
+        self.active = {}
+        self.peak = {}
+        self.peak_total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, file_path, printer):
+        with self._lock:
+            self.calls.append((file_path, printer, time.monotonic()))
+            self.active[printer] = self.active.get(printer, 0) + 1
+            self.peak[printer] = max(self.peak.get(printer, 0), self.active[printer])
+            self.peak_total = max(self.peak_total, sum(self.active.values()))
+            attempt = sum(1 for call in self.calls if call[0] == file_path)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active[printer] -= 1
+        if attempt <= self.failures:
+            return False, f"spooler error {attempt}"
+        return True, "sent"
+
+
+class PrintQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.saved = []
+        self._ids = iter(range(1, 1000))
+        self.queues = []
+
+    def tearDown(self):
+        for queue in self.queues:
+            queue.shutdown()
+        shutil.rmtree(self.tmp)
+
+    def make_file(self, name='label.png'):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as f:
+            f.write(b'image')
+        return path
+
+    def make_queue(self, print_func, **kwargs):
+        queue = PrintQueue(print_func, lambda file_path, printer: next(self._ids),
+                           lambda *state: self.saved.append(state), **kwargs)
+        self.queues.append(queue)
+        return queue
+
+    def wait_finished(self, queue, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            jobs = queue.snapshot()
+            if jobs and all(job[3] in FINISHED_STATES for job in jobs):
+                return {job[0]: job for job in jobs}
+            time.sleep(0.01)
+        self.fail(f"print jobs did not finish: {queue.snapshot()}")
+
+    def test_retries_until_success(self):
+        spooler = FakeSpooler(failures=2)
+        queue = self.make_queue(spooler, max_attempts=3, retry_delay=0.05)
+        job_id = queue.submit(self.make_file(), 'Printer A')
+
+        job = self.wait_finished(queue)[job_id]
+        self.assertEqual(job[3], DONE)
+        self.assertEqual(job[4], 3)
+        self.assertIsNone(job[5])
+        self.assertEqual(self.saved[-1], (job_id, DONE, 3, None))
+
+    def test_backoff_doubles_between_attempts(self):
+        spooler = FakeSpooler(failures=2)
+        queue = self.make_queue(spooler, max_attempts=3, retry_delay=0.1)
+        queue.submit(self.make_file(), 'Printer A')
+        self.wait_finished(queue)
+
+        times = [call[2] for call in spooler.calls]
+        self.assertGreaterEqual(times[1] - times[0], 0.1)
+        self.assertGreaterEqual(times[2] - times[1], 0.2)
+
+    def test_fails_after_max_attempts(self):
+        spooler = FakeSpooler(failures=10)
+        queue = self.make_queue(spooler, max_attempts=2, retry_delay=0.01)
+        job_id = queue.submit(self.make_file(), 'Printer A')
+
+        job = self.wait_finished(queue)[job_id]
+        self.assertEqual(job[3], FAILED)
+        self.assertEqual(job[4], 2)
+        self.assertEqual(job[5], "spooler error 2")
+        self.assertEqual(len(spooler.calls), 2)
+
+    def test_missing_file_is_not_retried(self):
+        spooler = FakeSpooler()
+        queue = self.make_queue(spooler, max_attempts=3, retry_delay=0.01)
+        job_id = queue.submit(os.path.join(self.tmp, 'missing.png'), 'Printer A')
+
+        job = self.wait_finished(queue)[job_id]
+        self.assertEqual(job[3], FAILED)
+        self.assertEqual(job[4], 1)
+        self.assertEqual(spooler.calls, [])
+
+    def test_per_printer_limit(self):
+        spooler = FakeSpooler(delay=0.05)
+        queue = self.make_queue(spooler, workers=4, per_printer=1)
+        for index in range(4):
+            queue.submit(self.make_file(f'a{index}.png'), 'Printer A')
+            queue.submit(self.make_file(f'b{index}.png'), 'Printer B')
+
+        jobs = self.wait_finished(queue)
+        self.assertTrue(all(job[3] == DONE for job in jobs.values()))
+        self.assertEqual(spooler.peak, {'Printer A': 1, 'Printer B': 1})
+        self.assertEqual(spooler.peak_total, 2)
+
+    def test_cancel_and_retry_queued_job(self):
+        release = threading.Event()
+        queue = self.make_queue(lambda file_path, printer: (release.wait(5), "sent"), workers=1)
+        first = queue.submit(self.make_file('first.png'), 'Printer A')
+        second = queue.submit(self.make_file('second.png'), 'Printer A')
+
+        self.assertTrue(queue.cancel(second))
+        self.assertFalse(queue.cancel(second))
+        release.set()
+        jobs = self.wait_finished(queue)
+        self.assertEqual(jobs[first][3], DONE)
+        self.assertEqual(jobs[second][3], CANCELLED)
+
+        self.assertTrue(queue.retry(second))
+        self.assertEqual(queue.snapshot()[0][3:5], (QUEUED, 0))
+        self.assertEqual(self.wait_finished(queue)[second][3], DONE)
+
+
+@unittest.skipUnless(sys.platform == 'darwin' or sys.platform.startswith('linux'), "uses the lpr spooler path")
+class FakeLprTest(unittest.TestCase):
+    """Runs the queue against db_utils.print_file_os with `lpr_command` pointed at a script."""
+
+    def setUp(self):
+        import db_utils
+        self.db_utils = db_utils
+        self.tmp = tempfile.mkdtemp()
+        self.log = os.path.join(self.tmp, 'lpr.log')
+        script = os.path.join(self.tmp, 'fake-lpr')
+        # Fails the first time it sees a file, then logs its arguments and succeeds
+        with open(script, 'w') as f:
+            f.write('#!/bin/sh\n'
+                    'for last; do :; done\n'
+                    'if [ ! -e "$last.seen" ]; then touch "$last.seen"; echo "paper jam" >&2; exit 1; fi\n'
+                    f'echo "$@" >> "{self.log}"\n')
+        os.chmod(script, os.stat(script).st_mode | stat.S_IXUSR)
+        config_file = os.path.join(self.tmp, 'config.ini')
+        with open(config_file, 'w') as f:
+            f.write(f'[printing]\nlpr_command = {script}\n')
+
+        patcher = mock.patch.object(db_utils, 'CONFIG_FILE', config_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(db_utils.invalidate_config_cache)
+        db_utils.invalidate_config_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_retry_through_spooler(self):
+        path = os.path.join(self.tmp, 'label.png')
+        with open(path, 'wb') as f:
+            f.write(b'image')
+        saved = []
+        queue = PrintQueue(self.db_utils.print_file_os, lambda file_path, printer: 1,
+                           lambda *state: saved.append(state), max_attempts=3, retry_delay=0.01)
+        self.addCleanup(queue.shutdown)
+        queue.submit(path, 'Office')
+
+        deadline = time.monotonic() + 10
+        while queue.snapshot()[0][3] not in FINISHED_STATES and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(queue.snapshot()[0][3:], (DONE, 2, None))
+        self.assertIn((1, QUEUED, 1, "Printing failed (lpr error): paper jam\n"), saved)
+        with open(self.log) as f:
+            self.assertEqual(f.read(), f"-P Office {path}\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from support import WorkdirTestCase
+
+import db_utils
+from print_queue import DONE, FAILED, PRINTING, QUEUED
+from storage import DuplicateImagePathsError, SQLiteStorage
+
+
+def schema_version(backend):
+    with backend.cursor() as cursor:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        return cursor.fetchone()[0]
+
+
+class MigrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.backend = SQLiteStorage(os.path.join(self.tmp, 'codes.db'))
+        self.addCleanup(self.backend.close)
+
+    def migrate_to(self, version):
+        steps = [step for step in self.backend.migrations() if step[0] <= version]
+        with mock.patch.object(self.backend, 'migrations', return_value=steps):
+            return self.backend.migrate()
+
+    def insert_rows(self, rows):
+        with self.backend.cursor() as cursor:
+            cursor.executemany("INSERT INTO created_codes (type, data, image_path, date_created) VALUES (?, ?, ?, ?)",
+                               rows)
+
+    def test_fresh_database_gets_every_migration_once(self):
+        self.assertEqual(self.backend.migrate(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.backend.migrate(), [])
+        with self.backend.cursor() as cursor:
+            self.assertIn('committed_through', self.backend.table_columns(cursor, 'batch_jobs'))
+            self.assertTrue(self.backend.index_exists(cursor, 'created_codes', 'uq_created_codes_image_path'))
+
+    def test_duplicate_image_paths_stop_the_migration_without_deleting(self):
+        self.assertEqual(self.migrate_to(2), [1, 2])
+        now = datetime.datetime.now()
+        self.insert_rows([('QR', 'old', 'codes_generated/a_QR.png', now),
+                          ('QR', 'new', 'codes_generated/a_QR.png', now),
+                          ('QR', 'other', 'codes_generated/b_QR.png', now)])
+
+        with self.assertRaises(DuplicateImagePathsError) as caught:
+            self.backend.migrate()
+        self.assertEqual(caught.exception.duplicates, [('codes_generated/a_QR.png', 2)])
+        self.assertEqual(schema_version(self.backend), 2)
+        self.assertEqual(self.backend.count_duplicate_image_paths(), 1)
+        self.assertEqual(len(list(self.backend.iter_codes())), 3)
+
+        self.assertEqual(self.backend.remove_duplicate_image_paths(), 1)
+        self.assertEqual(self.backend.migrate(), [3, 4, 5, 6])
+        self.assertEqual([row[2] for row in self.backend.iter_codes()], ['new', 'other'])
+
+
+class SchemaErrorTest(WorkdirTestCase):
+
+    setup_schema = False
+
+    def test_get_storage_reports_duplicates_and_removal_needs_a_backup(self):
+        # The database as it was before migration 3, holding two records for one image
+        backend = SQLiteStorage('codes.db')
+        steps = [step for step in backend.migrations() if step[0] <= 2]
+        with mock.patch.object(backend, 'migrations', return_value=steps):
+            backend.migrate()
+        now = datetime.datetime.now()
+        with backend.cursor() as cursor:
+            cursor.executemany("INSERT INTO created_codes (type, data, image_path, date_created) VALUES (?, ?, ?, ?)",
+                               [('QR', 'old', 'p.png', now), ('QR', 'new', 'p.png', now)])
+        backend.close()
+
+        self.assertIn("1 image paths are used by more than one code record", db_utils.schema_error())
+        self.assertEqual(db_utils.count_duplicate_codes(), 1)
+
+        with mock.patch.object(db_utils, 'backup_database', return_value=(False, "disk full")):
+            success, message = db_utils.remove_duplicate_codes()
+        self.assertFalse(success)
+        self.assertEqual(db_utils.count_duplicate_codes(), 1)
+
+        success, message = db_utils.remove_duplicate_codes()
+        self.assertTrue(success, message)
+        self.assertIsNone(db_utils.schema_error())
+        self.assertEqual([row[2] for row in self.codes()], ['new'])
+        self.assertTrue(any(name.startswith('code_manager_backup_') for name in os.listdir('.')))
+
+
+class PrintJobStorageTest(WorkdirTestCase):
+
+    def test_unfinished_jobs_are_restored_past_one_page(self):
+        now = datetime.datetime.now()
+        for index in range(23):
+            status = (QUEUED, PRINTING, DONE)[index % 3]
+            self.storage.insert_print_job(f"label{index}.png", 'Office', status, now)
+
+        page = self.storage.list_print_jobs(statuses=(QUEUED,), limit=3)
+        older = self.storage.list_print_jobs(statuses=(QUEUED,), limit=3, before_id=page[-1][0])
+        self.assertEqual([row[0] for row in page + older], [22, 19, 16, 13, 10, 7])
+
+        restored = []
+        queue = mock.Mock(restore=restored.append)
+        self.assertEqual(db_utils.restore_print_jobs(queue, history=2, page_size=4), 8)
+        statuses = [job.status for job in restored]
+        self.assertEqual(statuses.count(QUEUED), 8)
+        self.assertEqual(statuses.count(FAILED), 8)  # were printing when the app stopped
+        self.assertEqual(statuses.count(DONE), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+
+class ThumbnailCache:
+    """
+    Two-tier cache of resized code images for previews. Decoded thumbnails are
+    kept in an in-memory LRU bounded by `max_bytes`, and written to `disk_dir`
+    keyed by source path, source mtime and thumbnail size (width, height), so
+    a source image is only decoded and resized once until it changes. The disk tier is bounded by
+    `disk_max_bytes`: once over budget, the files used least recently (by
+    mtime, which is refreshed on every hit) are removed down to
+    DISK_LOW_WATER of it.
+    """
+
+    DISK_LOW_WATER = 0.8
+
+    def __init__(self, disk_dir, max_bytes, disk_max_bytes=64 * 1024 * 1024):
+        self.disk_dir = disk_dir
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.used_bytes = 0
+        self.disk_used_bytes = None  # measured on the first write
+        self._entries = OrderedDict()  # key -> (image, size in bytes)
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+
+    @staticmethod
+    def _image_bytes(img):
+        return img.width * img.height * len(img.getbands())
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.png")
+
+    def get(self, path, size):
+        """
+        Returns `path` resized to `size` as a PIL image. Raises OSError if the
+        source image cannot be read.
+        """
+        key = (os.path.abspath(path), os.stat(path).st_mtime_ns, size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        disk_path = self._disk_path(key)
+        try:
+            with Image.open(disk_path) as cached:
+                img = cached.copy()
+            try:
+                os.utime(disk_path)  # Marks the file as recently used for eviction
+            except OSError:
+                pass
+        except OSError:
+            with Image.open(path) as source:
+                img = source.resize(size, Image.LANCZOS)
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                img.save(disk_path)
+                self._account_disk(os.path.getsize(disk_path))
+            except OSError:
+                pass  # The memory tier still works without a writable disk cache
+
+        self._remember(key, img)
+        return img
+
+    def _disk_files(self):
+        """Returns (mtime, file size in bytes, path) of every file in the disk tier."""
+        files = []
+        with os.scandir(self.disk_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.png'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _account_disk(self, added_bytes):
+        with self._disk_lock:
+            if self.disk_used_bytes is None:
+                # The new file is already on disk, so the scan counts it
+                self.disk_used_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self.disk_used_bytes += added_bytes
+            if self.disk_used_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        files = sorted(self._disk_files())
+        used = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * self.DISK_LOW_WATER
+        for _, size, path in files:
+            if used <= target:
+                break
+            try:
+                os.remove(path)
+                used -= size
+            except OSError:
+                pass
+        self.disk_used_bytes = used
+
+    def _remember(self, key, img):
+        img_bytes = self._image_bytes(img)
+        if img_bytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (img, img_bytes)
+            self.used_bytes += img_bytes
+            while self.used_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.used_bytes -= evicted_bytes
+
+    def clear(self):
+        """Drops the memory tier (the disk tier is keyed by mtime and self-invalidates)."""
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0